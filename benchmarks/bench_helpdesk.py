@@ -0,0 +1,249 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from src.backend import helpdesk, reports, shards
+
+# benchmark suite for the ticket store and web routes
+# generates synthetic ticket files in the data/helpdesk.csv format, times the backend and
+# the main Flask routes against them, and writes JSON so releases can be compared:
+#
+#   python -m benchmarks.bench_helpdesk --sizes 1000,100000 --output bench.json
+#   python -m benchmarks.bench_helpdesk --sizes 1000 --compare bench.json
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+TITLES = [
+    "Broken Printer", "Cannot Sign Into Email", "Password Reset Request", "Cannot Connect to VPN",
+    "Laptop Running Slow", "Wifi Keeps Dropping", "Microphone Not Working", "Software Install Request",
+    "Account Locked", "Camera Not Detected", "Network Drive Missing", "Outlook Crashing",
+]
+ASSIGNEES = ["Olivia Davis", "Ryan Collins", "Jacob Nguyen", "Benjamin Jackson"]
+SEVERITIES = ["Low", "Medium", "High"]
+STATUSES = ["Open", "In Progress", "Closed"]
+CATEGORIES = ["Hardware", "Software", "Network", "Security"]
+
+
+def generate_tickets_csv(path, rows, seed=42):
+    """Write a synthetic ticket file with the same columns as data/helpdesk.csv"""
+    rng = random.Random(seed)  # same seed = same data, so runs are comparable
+    start = datetime(2023, 1, 1)
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=helpdesk.FIELDNAMES)
+        writer.writeheader()
+        for i in range(rows):
+            submitted = start + timedelta(minutes=i * 7)
+            status = rng.choice(STATUSES)
+            closed = submitted + timedelta(hours=rng.randint(1, 96)) if status == "Closed" else None
+            comments = []
+            if rng.random() < 0.3:
+                comments.append({
+                    "Author": rng.choice(ASSIGNEES),
+                    "Date": submitted.strftime("%d/%m/%Y"),
+                    "Time": submitted.strftime("%H:%M:%S"),
+                    "Content": "Looking into this now.",
+                })
+            writer.writerow({
+                "ID": 100 + i,
+                "Title": rng.choice(TITLES),
+                "Description": "Synthetic ticket generated for benchmarking.",
+                "Assignee": rng.choice(ASSIGNEES),
+                "Severity": rng.choice(SEVERITIES),
+                "Status": status,
+                "Category": rng.choice(CATEGORIES),
+                "Submission DateTime": submitted.strftime("%d/%m/%Y %H:%M:%S"),
+                "Comments": json.dumps(comments),
+                "Version": 1,
+                "Closed DateTime": closed.strftime("%d/%m/%Y %H:%M:%S") if closed else "",
+            })
+
+
+def time_call(func, repeats):
+    """Run func several times and summarise the timings in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "repeats": repeats,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
+
+
+def check_status(response, expected=(200, 302)):
+    """Fail the benchmark loudly rather than timing an error page"""
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}")
+
+
+def run_size(rows, repeats, work_dir, include_routes=True):
+    """Benchmark one dataset size, returning a list of result dicts"""
+    data_file = Path(work_dir) / f"helpdesk_{rows}.csv"
+    generate_tickets_csv(data_file, rows)
+    results = []
+
+    def record(name, func, count=repeats):
+        results.append({"benchmark": name, "rows": rows, **time_call(func, count)})
+
+    with patch.object(helpdesk, "DATA_FILE", data_file):
+        record("load_tickets", lambda: helpdesk.load_tickets(workers=1))
+        cores = os.cpu_count() or 1
+        if cores > 1:
+            record(f"load_tickets ({cores} workers)", lambda: helpdesk.load_tickets(workers=cores))
+
+        loaded = helpdesk.load_tickets()
+        record("save_tickets", lambda: helpdesk.save_tickets(loaded))
+
+        # a sharded store only rewrites the shard holding the changed ticket
+        with patch.object(shards, "SHARD_BY", "id"):
+            shards.start(loaded)
+            try:
+                ticket_id = next(iter(loaded))
+
+                def save_one_change():
+                    helpdesk.update_ticket_fields(loaded, ticket_id, {"Title": f"Benchmark {time.perf_counter()}"})
+                    helpdesk.save_tickets(loaded)
+
+                record("save_tickets (sharded, one change)", save_one_change)
+            finally:
+                shards.reset()
+
+        record("build_reports", lambda: reports.build_from_csv(data_file))
+
+        titles = [ticket["Title"] for ticket in loaded.values()]
+        record("predict_category", lambda: [helpdesk.predict_category(title) for title in titles])
+
+        if include_routes:
+            from src.backend import similarity, views, workload
+            from src.web import display, web_app
+
+            # swapping the loaded tickets into the shared store the routes read from - marked as loaded and
+            # with the SLA scheduler off, so no change feed, archive pass or SLA thread starts in the temp folder
+            original = dict(helpdesk.tickets)
+            with helpdesk.store_lock:
+                helpdesk.tickets.clear()
+                helpdesk.tickets.update(loaded)
+                helpdesk.snapshot_cache.clear()
+            try:
+                with patch.object(helpdesk, "store_loaded", True), patch.object(helpdesk, "store_signature", None), \
+                        patch.object(web_app, "SLA_SCHEDULER_ENABLED", False):
+                    run_routes(web_app.app, loaded, rows, record, results)
+            finally:
+                with helpdesk.store_lock:
+                    helpdesk.tickets.clear()
+                    helpdesk.tickets.update(original)
+                    helpdesk.snapshot_cache.clear()
+                # CS - the listeners the routes started were built from the benchmark tickets
+                for module in (display, views, similarity, workload, reports):
+                    module.reset()
+
+    helpdesk.snapshot_cache.pop(id(loaded), None)  # CS - don't keep a million rows alive between sizes
+    data_file.unlink()
+    return results
+
+
+def run_routes(app, loaded, rows, record, results):
+    """Time the main pages and a comment against the swapped in store"""
+    from src.web import display
+
+    client = app.test_client()
+    ticket_id = next(iter(loaded))
+    record("GET /", lambda: check_status(client.get("/")))
+    # the list page shows every row - cold is the first render after start up, when no display rows are cached
+    record("GET /tickets (cold display rows)", lambda: (display.reset(), check_status(client.get("/tickets"))))
+    results[-1]["ms_per_10k_rows"] = round(results[-1]["median_ms"] * 10_000 / rows, 3)
+    record("GET /tickets", lambda: check_status(client.get("/tickets")))
+    results[-1]["ms_per_10k_rows"] = round(results[-1]["median_ms"] * 10_000 / rows, 3)
+    record("GET /ticket/<id>", lambda: check_status(client.get(f"/ticket/{ticket_id}")))
+    record("POST /comment/<id>", lambda: check_status(
+        client.post(f"/comment/{ticket_id}", data={"comment": "Benchmark comment"})
+    ))
+
+
+def measure_import(module, repeats):
+    """Time importing a module in a fresh interpreter (what a worker or test run pays at startup)"""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    project_root = Path(__file__).resolve().parent.parent
+
+    def run():
+        subprocess.run([sys.executable, "-c", code], cwd=project_root, check=True, capture_output=True)
+
+    return {"benchmark": f"import {module}", "rows": 0, **time_call(run, repeats)}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeats=5, include_routes=True):
+    """Run every benchmark for every size and return the JSON-ready report"""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [measure_import(module, repeats) for module in ("src.backend.helpdesk", "src.cli.cli_helpdesk", "src.web.web_app")],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in sizes:
+            print(f"benchmarking {rows} rows...", file=sys.stderr)
+            report["results"].extend(run_size(rows, repeats, work_dir, include_routes))
+    return report
+
+
+def compare_reports(baseline, current, threshold):
+    """List benchmarks whose median got slower than threshold x the baseline"""
+    old = {(r["benchmark"], r["rows"]): r["median_ms"] for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = old.get((result["benchmark"], result["rows"]))
+        if before and result["median_ms"] > before * threshold:
+            regressions.append({
+                "benchmark": result["benchmark"],
+                "rows": result["rows"],
+                "baseline_ms": before,
+                "current_ms": result["median_ms"],
+                "ratio": round(result["median_ms"] / before, 2),
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the helpdesk ticket store and web routes")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated row counts")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--no-routes", action="store_true", help="only benchmark the backend functions")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_benchmarks(sizes, args.repeats, include_routes=not args.no_routes)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare_reports(json.load(f), report, args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    return 1 if report.get("regressions") else 0  # CS - non zero exit so CI can fail on a regression
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+import argparse
+import csv
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from benchmarks.bench_helpdesk import ASSIGNEES, SEVERITIES, generate_tickets_csv
+from src.backend import helpdesk, shards
+
+# load test for the web app as it runs in production - gunicorn with several workers
+# seeds a synthetic ticket file, starts gunicorn on it, then drives a weighted mix of reads, comments,
+# updates, escalations and new tickets from many threads for a fixed time
+# the "ai" operation runs the CLI's OpenAI suggestion against a local fake endpoint with set latency
+#
+# afterwards the saved ticket file is checked: every comment and ticket the app acknowledged must be
+# in it, and no ID may appear twice
+#
+#   python -m benchmarks.load_helpdesk --workers 4 --concurrency 16 --duration 30
+#   python -m benchmarks.load_helpdesk --mix read=50,comment=30,update=20 --output load.json
+
+DEFAULT_MIX = {"read": 65, "comment": 15, "update": 8, "escalate": 5, "create": 2, "ai": 5}
+OPERATIONS = list(DEFAULT_MIX)
+FAKE_AI_ANSWER = "Network, High"  # CS - not the CLI's fallback answer, so a fallback is easy to spot
+STARTUP_TIMEOUT = 30  # seconds to wait for gunicorn to answer
+REQUEST_TIMEOUT = 30
+
+
+def parse_mix(text):
+    """Operation weights from 'read=70,comment=20,...' (ValueError for unknown operations)"""
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation '{name}' (use {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("the mix needs at least one operation with a weight above 0")
+    return mix
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of a list of numbers (0 if it's empty)"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# fake OpenAI endpoint - answers every chat completion with FAKE_AI_ANSWER after latency (+ up to jitter) seconds
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        with server.count_lock:
+            server.requests += 1
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.dumps({
+            "id": "chatcmpl-load-test",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": FAKE_AI_ANSWER}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # CS - thousands of lines of access log would bury the report
+
+
+def start_fake_openai(latency=0.5, jitter=0.0):
+    """Run the fake endpoint on a free local port in a background thread"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency, server.jitter = latency, jitter
+    server.requests, server.count_lock = 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_gunicorn(port, workers, data_file, log_file, threads=1):
+    """Start the web app under gunicorn on data_file and wait until it answers (its output goes to log_file)"""
+    env = dict(os.environ, HELPDESK_DATA_FILE=str(data_file), HELPDESK_SLA_SCHEDULER="0")
+    project_root = Path(__file__).resolve().parent.parent
+    with open(log_file, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--threads", str(threads),
+             "--bind", f"127.0.0.1:{port}", "--graceful-timeout", "10", "src.web.web_app:create_app()"],
+            cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited on start: {Path(log_file).read_text(errors='replace')[-2000:]}")
+        try:
+            if send("127.0.0.1", port, "GET", "/")[0] == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_gunicorn(process)
+    raise RuntimeError(f"gunicorn didn't answer within {STARTUP_TIMEOUT} seconds")
+
+
+def stop_gunicorn(process):
+    """Stop gunicorn gracefully, so workers finish their requests (and saves) first"""
+    process.terminate()
+    try:
+        process.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def send(host, port, method, path, form=None, headers=None):
+    """One HTTP request, returning (status, headers) - redirects aren't followed"""
+    connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+    try:
+        body = urlencode(form) if form is not None else None
+        headers = dict(headers or {})
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, response.headers
+    finally:
+        connection.close()
+
+
+class LoadRun:
+    """Drives the operation mix against one running app and keeps what it needs for the checks"""
+
+    def __init__(self, port, seeded, mix, seed=42):
+        self.port = port
+        self.seeded = seeded  # ticket_id -> seeded ticket (for the fields an update form sends)
+        self.names = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.names]
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in OPERATIONS}  # operation -> [(seconds, outcome)]
+        self.acknowledged_comments = []  # (ticket_id, text) the app redirected after saving
+        self.acknowledged_tickets = []  # (ticket_id, title) of tickets the app created
+        self.counter = 0
+
+    def next_number(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def request(self, method, path, form=None, headers=None):
+        return send("127.0.0.1", self.port, method, path, form, headers)
+
+    def current_version(self, ticket_id):
+        """Read a ticket first, the way a browser does before posting a form (its version is the ETag)"""
+        status, headers = self.request("GET", f"/ticket/{ticket_id}")
+        return headers.get("ETag", "").strip('"') if status == 200 else ""
+
+    def op_read(self, rng):
+        if rng.random() < 0.2:
+            return self.request("GET", "/tickets")[0]
+        return self.request("GET", f"/ticket/{rng.choice(list(self.seeded))}")[0]
+
+    def op_comment(self, rng):
+        ticket_id = rng.choice(list(self.seeded))
+        text = f"load test comment {self.next_number()}"
+        status, _ = self.request("POST", f"/comment/{ticket_id}", {"comment": text})
+        if status == 302:
+            with self.lock:
+                self.acknowledged_comments.append((ticket_id, text))
+        return status
+
+    def op_update(self, rng):
+        ticket_id = rng.choice(list(self.seeded))
+        ticket = self.seeded[ticket_id]
+        version = self.current_version(ticket_id)
+        return self.request("POST", f"/update/{ticket_id}", {
+            "title": f"{ticket['Title']} (load test edit {self.next_number()})",
+            "description": ticket["Description"],
+            "assignee": ticket["Assignee"],
+            "severity": rng.choice(SEVERITIES),
+            "status": ticket["Status"],
+            "category": ticket["Category"],
+            "version": version,
+        })[0]
+
+    def op_escalate(self, rng):
+        ticket_id = rng.choice(list(self.seeded))
+        version = self.current_version(ticket_id)
+        return self.request("POST", f"/escalate/{ticket_id}", {"assignee": rng.choice(ASSIGNEES), "version": version})[0]
+
+    def op_create(self, rng):
+        title = f"Load Test Ticket {self.next_number()}"
+        status, headers = self.request("POST", "/add", {
+            "title": title, "description": "Created by the load test.", "assignee": rng.choice(ASSIGNEES),
+            "severity": rng.choice(SEVERITIES), "status": "Open", "confirm_duplicate": "1",
+        })
+        if status == 302:
+            ticket_id = headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+            with self.lock:
+                self.acknowledged_tickets.append((int(ticket_id) if ticket_id.isdigit() else None, title))
+        return status
+
+    def op_ai(self, rng):
+        from src.cli import cli_helpdesk
+
+        ticket = self.seeded[rng.choice(list(self.seeded))]
+        suggestion = cli_helpdesk.ai_suggest_category_severity(ticket["Title"], ticket["Description"])
+        return 200 if ", ".join(suggestion) == FAKE_AI_ANSWER else "fallback"
+
+    def worker(self, number, deadline):
+        rng = random.Random(self.seed + number)
+        while time.monotonic() < deadline:
+            name = rng.choices(self.names, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                outcome = getattr(self, f"op_{name}")(rng)
+            except (OSError, http.client.HTTPException) as e:
+                outcome = type(e).__name__
+            with self.lock:
+                self.samples[name].append((time.perf_counter() - start, outcome))
+
+    def run(self, concurrency, duration):
+        """Run the mix from concurrency threads for duration seconds, returning the elapsed time"""
+        deadline = time.monotonic() + duration
+        threads = [threading.Thread(target=self.worker, args=(number, deadline)) for number in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def classify(outcome):
+    """'ok', 'conflict' (409 - the app refusing a stale edit, as it should) or 'error'"""
+    if outcome == 409:
+        return "conflict"
+    if isinstance(outcome, int) and outcome < 400:
+        return "ok"
+    return "error"
+
+
+def summarise(samples, elapsed):
+    """Throughput, latency percentiles and error rates per operation and overall"""
+    def stats(entries):
+        outcomes = Counter(classify(outcome) for _, outcome in entries)
+        latencies = [seconds * 1000 for seconds, _ in entries]
+        return {
+            "requests": len(entries),
+            "throughput_per_s": round(len(entries) / elapsed, 2) if elapsed else 0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "errors": outcomes["error"],
+            "conflicts": outcomes["conflict"],
+            "error_rate": round(outcomes["error"] / len(entries), 4) if entries else 0,
+            "outcomes": dict(Counter(str(outcome) for _, outcome in entries)),
+        }
+
+    operations = {name: stats(entries) for name, entries in samples.items() if entries}
+    return {"total": stats([entry for entries in samples.values() for entry in entries]), "operations": operations}
+
+
+def check_integrity(data_file, acknowledged_comments, acknowledged_tickets):
+    """Compare the saved ticket file(s) with what the app acknowledged"""
+    ids, comments, titles = Counter(), {}, set()
+    with patch.object(helpdesk, "DATA_FILE", Path(data_file)):
+        paths = shards.data_files()
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                # CS - reading the raw rows, load_tickets would quietly drop a duplicate ID
+                ticket_id = row.get("ID", "").strip()
+                ids[ticket_id] += 1
+                comments[ticket_id] = comments.get(ticket_id, "") + (row.get("Comments") or "")
+                titles.add(row.get("Title", ""))
+
+    lost_comments = [
+        {"ticket_id": ticket_id, "comment": text}
+        for ticket_id, text in acknowledged_comments if text not in comments.get(str(ticket_id), "")
+    ]
+    lost_tickets = [{"ticket_id": ticket_id, "title": title} for ticket_id, title in acknowledged_tickets if title not in titles]
+    created_ids = Counter(ticket_id for ticket_id, _ in acknowledged_tickets)
+    result = {
+        "rows": sum(ids.values()),
+        "duplicate_ids": sorted((ticket_id for ticket_id, total in ids.items() if total > 1), key=lambda ticket_id: int(ticket_id) if ticket_id.isdigit() else 0),
+        "ids_given_twice": sorted(ticket_id for ticket_id, total in created_ids.items() if ticket_id is not None and total > 1),
+        "comments_acknowledged": len(acknowledged_comments),
+        "lost_comments": lost_comments,
+        "tickets_acknowledged": len(acknowledged_tickets),
+        "lost_tickets": lost_tickets,
+    }
+    result["ok"] = not (result["duplicate_ids"] or result["ids_given_twice"] or lost_comments or lost_tickets)
+    return result
+
+
+def run_load_test(workers=2, concurrency=8, duration=10, tickets=1000, mix=DEFAULT_MIX, ai_latency=0.5, ai_jitter=0.0, threads=1, seed=42, log_dir=None):
+    """Seed a ticket file, run the mix against gunicorn and return the JSON-ready report (log_dir keeps gunicorn's log)"""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {"workers": workers, "threads": threads, "concurrency": concurrency, "duration_s": duration,
+                   "tickets": tickets, "mix": mix, "ai_latency_s": ai_latency, "ai_jitter_s": ai_jitter},
+    }
+    fake_ai = start_fake_openai(ai_latency, ai_jitter)
+    # the CLI sets up its openai client from these
+    ai_env = {"OPENAI_API_KEY": "load-test", "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_ai.server_address[1]}/v1"}
+
+    try:
+        with tempfile.TemporaryDirectory() as work_dir, patch.dict(os.environ, ai_env):
+            data_file = Path(work_dir) / "helpdesk.csv"
+            generate_tickets_csv(data_file, tickets, seed)
+            with open(data_file, newline="", encoding="utf-8") as f:
+                seeded = {int(row["ID"]): row for row in csv.DictReader(f)}
+
+            port = free_port()
+            print(f"starting gunicorn with {workers} workers on port {port}...", file=sys.stderr)
+            log_file = Path(log_dir or work_dir) / "gunicorn.log"
+            process = start_gunicorn(port, workers, data_file, log_file, threads)
+            load = LoadRun(port, seeded, mix, seed)
+            try:
+                print(f"running for {duration}s from {concurrency} threads...", file=sys.stderr)
+                elapsed = load.run(concurrency, duration)
+            finally:
+                stop_gunicorn(process)
+
+            report.update(summarise(load.samples, elapsed))
+            report["elapsed_s"] = round(elapsed, 2)
+            report["fake_openai_requests"] = fake_ai.requests
+            report["integrity"] = check_integrity(data_file, load.acknowledged_comments, load.acknowledged_tickets)
+    finally:
+        fake_ai.shutdown()
+        fake_ai.server_close()
+    return report
+
+
+def print_summary(report):
+    """A short table of the report for the terminal"""
+    lines = [f"{'operation':<10} {'requests':>9} {'per s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'conflicts':>9}"]
+    for name, stats in [*report["operations"].items(), ("total", report["total"])]:
+        lines.append(f"{name:<10} {stats['requests']:>9} {stats['throughput_per_s']:>8} {stats['p50_ms']:>9} {stats['p99_ms']:>9} "
+                     f"{stats['error_rate']:>7.1%} {stats['conflicts']:>9}")
+    integrity = report["integrity"]
+    lines.append(f"fake OpenAI requests: {report['fake_openai_requests']}")
+    lines.append(f"integrity: {'ok' if integrity['ok'] else 'FAILED'} - {len(integrity['lost_comments'])}/{integrity['comments_acknowledged']} comments lost, "
+                 f"{len(integrity['lost_tickets'])}/{integrity['tickets_acknowledged']} new tickets lost, "
+                 f"{len(integrity['duplicate_ids'])} duplicate IDs in the file, {len(integrity['ids_given_twice'])} IDs given out twice")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the helpdesk web app under gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="threads per gunicorn worker")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads sending requests")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run for")
+    parser.add_argument("--tickets", type=int, default=1000, help="tickets in the seeded file")
+    parser.add_argument("--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+                        help=f"operation weights, from {', '.join(OPERATIONS)}")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="seconds the fake OpenAI endpoint takes to answer")
+    parser.add_argument("--ai-jitter", type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the data and the mix")
+    parser.add_argument("--log-dir", help="keep gunicorn's log (with any tracebacks) in this folder")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    report = run_load_test(args.workers, args.concurrency, args.duration, args.tickets, mix,
+                           args.ai_latency, args.ai_jitter, args.threads, args.seed, args.log_dir)
+    print_summary(report)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    return 0 if report["integrity"]["ok"] else 1  # CS - non zero exit so CI can fail on lost writes
+
+
+if __name__ == "__main__":
+    sys.exit(main())
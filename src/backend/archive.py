@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import threading
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from src.backend import helpdesk
+
+# archive tier for old closed tickets - the hot store (and helpdesk.csv) only holds open tickets and
+# recently closed ones, so memory use and save cost follow the active workload instead of all history
+#
+# archived tickets are written in zlib compressed blocks appended to helpdesk.archive, with an index
+# (helpdesk.archive.idx) of where each ticket is plus a few fields for listing and search
+# a block is only read and decompressed when one of its tickets is viewed
+#
+# loading the store never archives - run a pass by hand, or daily from cron, with: python -m src.backend.archive
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("HELPDESK_ARCHIVE_AFTER_DAYS", "90"))  # 0 turns archiving off
+BLOCK_TICKETS = 256  # tickets compressed together - bigger blocks compress better but cost more to read one
+INDEX_FIELDS = ["Title", "Category", "Assignee", "Closed DateTime"]  # kept in the index for listing and search
+
+archive_lock = threading.RLock()
+index = {}  # ticket_id -> [offset, length, *INDEX_FIELDS]
+index_loaded = False
+
+
+def archive_file():
+    return helpdesk.DATA_FILE.with_suffix(".archive")
+
+
+def index_file():
+    return helpdesk.DATA_FILE.with_suffix(".archive.idx")
+
+
+def load_index(reload=False):
+    """Read the archive index (once, unless reload - another process may have archived since) and tell the engine which IDs are taken"""
+    global index_loaded
+    with archive_lock:
+        if index_loaded and not reload:
+            return
+        try:
+            with open(index_file(), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        index.clear()
+        index.update((int(ticket_id), entry) for ticket_id, entry in saved.get("tickets", {}).items())
+        helpdesk.archived_ids.update(index)
+        index_loaded = True
+
+
+def save_index():
+    """Write the index (the block file is only ever appended to, so this is what commits a pass)"""
+    with archive_lock:
+        state = {"tickets": {str(ticket_id): entry for ticket_id, entry in index.items()}}
+    path = index_file()
+    with helpdesk.replacing_file(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+@lru_cache(maxsize=32)
+def read_block(path, offset, length):
+    """Decompress one block of archived tickets (recently read blocks are kept)"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tickets = json.loads(zlib.decompress(f.read(length)))
+    return {ticket["ID"]: ticket for ticket in tickets}
+
+
+def get_archived_ticket(ticket_id):
+    """Load one archived ticket from its block (None if it isn't archived)"""
+    load_index()
+    entry = index.get(ticket_id)
+    if entry is None:
+        return None
+    return read_block(str(archive_file()), entry[0], entry[1]).get(ticket_id)
+
+
+def get_ticket(ticket_id):
+    """A ticket from the hot store, or from the archive if it has been moved there"""
+    ticket = helpdesk.get_tickets().get(ticket_id)
+    return ticket if ticket is not None else get_archived_ticket(ticket_id)
+
+
+def search_archive(text, limit=100):
+    """Archived tickets whose ID or index fields contain text, newest first (no blocks are read)"""
+    load_index()
+    text = text.strip().lower()
+    with archive_lock:
+        matches = [
+            {"ID": ticket_id, **dict(zip(INDEX_FIELDS, entry[2:]))}
+            for ticket_id, entry in index.items()
+            if text in str(ticket_id) or any(text in str(value).lower() for value in entry[2:])
+        ]
+    matches.sort(key=lambda ticket: ticket["ID"], reverse=True)
+    return matches[:limit]
+
+
+def iter_archived():
+    """Every archived ticket, a block at a time (used by reports)"""
+    load_index()
+    with archive_lock:
+        blocks = sorted({(entry[0], entry[1]) for entry in index.values()})
+    path = str(archive_file())
+    for offset, length in blocks:
+        for ticket_id, ticket in read_block(path, offset, length).items():
+            if index.get(ticket_id, [None])[0] == offset:  # CS - skipping older copies of re-archived tickets
+                yield ticket
+
+
+def closed_before(ticket, cutoff):
+    """Whether a ticket is closed and was closed (or, if unknown, submitted) before cutoff"""
+    if ticket["Status"] != "Closed":
+        return False
+    closed = helpdesk.parse_datetime(ticket.get("Closed DateTime")) or helpdesk.parse_datetime(ticket.get("Submission DateTime"))
+    return closed is not None and closed < cutoff
+
+
+def archive_closed_tickets(tickets, older_than_days=None, now=None):
+    """Move closed tickets older than the cut off from the hot store into the archive"""
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    if days <= 0:
+        return []
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    load_index()
+
+    # CS - one transaction, so a web worker saving meanwhile can't bring archived tickets back (or lose its change)
+    with helpdesk.store_transaction(tickets), helpdesk.store_lock:
+        moving = [ticket for ticket in tickets.values() if closed_before(ticket, cutoff)]
+        if not moving:
+            return []
+
+        # writing the blocks and index first - if we stop half way the hot copy still wins on the next load
+        with archive_lock, open(archive_file(), "ab") as f:
+            offset = f.tell()
+            for start in range(0, len(moving), BLOCK_TICKETS):
+                block = moving[start:start + BLOCK_TICKETS]
+                data = zlib.compress(json.dumps(block).encode("utf-8"), 6)
+                f.write(data)
+                for ticket in block:
+                    index[ticket["ID"]] = [offset, len(data)] + [ticket.get(field, "") for field in INDEX_FIELDS]
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+            save_index()
+
+        for ticket in moving:
+            del tickets[ticket["ID"]]
+            helpdesk.ticket_history.pop(ticket["ID"], None)
+            helpdesk.archived_ids.add(ticket["ID"])
+            helpdesk.mark_changed(tickets, "archived", ticket["ID"], ticket, None)
+
+        helpdesk.save_tickets(tickets)  # CS - the shared store is saved when the transaction ends
+    return [ticket["ID"] for ticket in moving]
+
+
+def reset():
+    """Forget the loaded index so the next call reads it again (used by tests)"""
+    global index_loaded
+    with helpdesk.store_lock, archive_lock:
+        index.clear()
+        helpdesk.archived_ids.clear()
+        read_block.cache_clear()
+        index_loaded = False
+
+
+# archiving by hand
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    moved = archive_closed_tickets(helpdesk.get_tickets(), days)
+    print(f"archived {len(moved)} closed tickets older than {days} days ({len(index)} in the archive)")
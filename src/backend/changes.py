@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from itertools import islice
+
+from src.backend import helpdesk
+
+# change data capture - every ticket change (from the web app or either CLI, they all go through
+# helpdesk.mark_changed) is appended to a durable, numbered feed that other systems can follow
+#
+# the feed is a folder of JSON lines files next to the data file (helpdesk.changes/), each holding
+# SEGMENT_EVENTS events and named after its first sequence number - sequence numbers have no gaps, so
+# reading from a cursor opens one file and skips to a line number, however long the history is
+#
+# several processes (gunicorn workers, the CLIs) can append to one feed - each append holds feed.lock
+# and first catches up with events other processes wrote, so sequence numbers stay unique and in order
+#
+# events are held back until the change is in the data file (helpdesk.save_listeners), so a failed save
+# never leaves the feed with a change that didn't happen
+#
+# web: /changes?cursor=N (a batch as JSON) and /changes/stream (server-sent events, resumable with Last-Event-ID)
+# tail from the command line with: python -m src.backend.changes --cursor 0 --follow
+
+SEGMENT_EVENTS = 10_000  # events per file
+BATCH_LIMIT = 500  # most events returned by one read
+POLL_SECONDS = 1.0  # how often the CLI tail and streams check for events written by other processes
+TAIL_BLOCK = 64 * 1024  # bytes read at a time when looking for the last event in a segment
+
+feed_lock = threading.RLock()
+new_events = threading.Condition(feed_lock)  # notified after every append, for streams in this process
+last_seq = 0  # newest event this process has seen on disk (see catch_up)
+segment = None  # open file the next event is appended to
+segment_start = 0
+segment_count = 0
+segment_size = 0  # bytes in the last segment as of our last write, so a write by another process shows up
+pending = []  # events for changes not saved yet, numbered and written by flush once they are
+started = False
+
+# functions called as listener(event) after an event is written (e.g. to wake async streams)
+feed_listeners = []
+
+
+def feed_dir():
+    return helpdesk.DATA_FILE.with_suffix(".changes")
+
+
+def segment_file(start):
+    return feed_dir() / f"{start:012d}.jsonl"
+
+
+def lock_file():
+    """Held by whichever process is appending to the feed"""
+    return feed_dir() / "feed.lock"
+
+
+def segment_starts():
+    """First sequence number of every segment, oldest first"""
+    if not feed_dir().is_dir():
+        return []
+    return sorted(int(path.stem) for path in feed_dir().glob("*.jsonl") if path.stem.isdigit())
+
+
+def read_tail(path):
+    """(sequence number of the last complete event, bytes up to the end of it) in a segment - (None, 0) if it has none"""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        # CS - reading back from the end a block at a time, a segment can be megabytes
+        while position > 0:
+            step = min(TAIL_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            end = data.rfind(b"\n")  # CS - a half written last line has no newline yet
+            if end == -1:
+                continue
+            line_start = data.rfind(b"\n", 0, end) + 1
+            if line_start or position == 0:
+                return json.loads(data[line_start:end])["seq"], position + end + 1
+    return None, 0
+
+
+def latest_sequence():
+    """Sequence number of the newest complete event on disk (0 if there are none)"""
+    starts = segment_starts()
+    if not starts:
+        return 0
+    seq, _ = read_tail(segment_file(starts[-1]))
+    return starts[-1] - 1 if seq is None else seq
+
+
+def recover():
+    """Find the last sequence number on disk, cutting off an event that was only half written when its writer stopped
+    (call while holding the feed file lock)"""
+    global last_seq, segment_start, segment_count, segment_size
+    starts = segment_starts()
+    if not starts:
+        last_seq, segment_start, segment_count, segment_size = 0, 0, 0, 0
+        return
+    path = segment_file(starts[-1])
+    seq, size = read_tail(path)
+    if path.stat().st_size != size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+    segment_start = starts[-1]
+    last_seq = segment_start - 1 if seq is None else seq
+    segment_count = last_seq - segment_start + 1
+    segment_size = size
+
+
+def catch_up():
+    """Make sure last_seq is the newest event on disk - another process may have appended since (call holding the feed file lock)"""
+    if segment_start:
+        try:
+            size = os.stat(segment_file(segment_start)).st_size
+        except FileNotFoundError:
+            size = None
+        # CS - nobody else wrote if our segment is the size we left it and, when full, nobody started the next one
+        if size == segment_size and (segment_count < SEGMENT_EVENTS or not segment_file(last_seq + 1).exists()):
+            return
+    recover()
+
+
+def append(event):
+    """Write one event at the end of the feed (call while holding feed_lock and the feed file lock)"""
+    global segment, segment_start, segment_count, segment_size
+    if not segment_start or segment_count >= SEGMENT_EVENTS:
+        segment_start, segment_count, segment_size = event["seq"], 0, 0  # CS - otherwise carrying on in the last segment
+    path = segment_file(segment_start)
+    if segment is None or segment.name != str(path):
+        if segment is not None:
+            segment.close()
+        feed_dir().mkdir(parents=True, exist_ok=True)
+        segment = open(path, "ab")  # CS - append mode, so writes land at the end whoever wrote last
+    line = (json.dumps(event) + "\n").encode("utf-8")
+    segment.write(line)
+    segment.flush()  # CS - handed to the OS straight away, so a crash of the app doesn't lose it
+    segment_count += 1
+    segment_size += len(line)
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - keeping the change as an event to record once it is saved"""
+    with feed_lock:
+        if helpdesk.reloading:
+            # CS - another process saved this change and already recorded it, and anything still held
+            # back here was never saved - the reload has replaced it
+            pending.clear()
+            return
+        old, new = before or {}, after or {}
+        pending.append({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "kind": kind,
+            "ticket_id": ticket_id,
+            "version": new.get("Version", old.get("Version")),
+            "changed": [field for field in helpdesk.FIELDNAMES if old.get(field) != new.get(field)],
+            "ticket": after,  # None once a ticket is deleted or archived
+        })
+
+
+def flush():
+    """Save listener - recording the saved changes as the next events in the feed"""
+    global last_seq
+    with feed_lock:
+        if not pending:
+            return
+        with helpdesk.file_lock(lock_file()):
+            catch_up()
+            events = [{"seq": last_seq + number, **event} for number, event in enumerate(pending, 1)]
+            pending.clear()
+            for event in events:
+                append(event)
+                last_seq = event["seq"]
+        new_events.notify_all()
+        for event in events:
+            for listener in feed_listeners:
+                listener(event)
+
+
+def start():
+    """Pick up the feed where it was left and record every change from now on (first call only)"""
+    global started
+    if started:
+        return
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, feed_lock:
+        if started:
+            return
+        if feed_dir().is_dir():  # CS - a new feed is created by its first event, loading alone writes nothing
+            with helpdesk.file_lock(lock_file()):
+                recover()
+        helpdesk.change_listeners.append(on_ticket_change)
+        helpdesk.save_listeners.append(flush)
+        started = True
+
+
+def read_changes(cursor=0, limit=BATCH_LIMIT):
+    """Events after the cursor (the last sequence number the reader has seen), oldest first"""
+    starts = segment_starts()
+    found = []
+    first = max(bisect_right(starts, cursor + 1) - 1, 0)
+    for start in starts[first:]:
+        with open(segment_file(start), encoding="utf-8") as f:
+            for line in islice(f, max(cursor + 1 - start, 0), None):
+                if not line.endswith("\n"):
+                    return found  # CS - still being written by the app
+                found.append(json.loads(line))
+                if len(found) >= limit:
+                    return found
+    return found
+
+
+def wait_for_changes(cursor, timeout):
+    """Block until there may be events after cursor (True) or timeout runs out (False) - woken at once by
+    events from this process, other processes' events are noticed within POLL_SECONDS"""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        with new_events:
+            if new_events.wait_for(lambda: last_seq > cursor, min(max(remaining, 0), POLL_SECONDS)):
+                return True
+        if latest_sequence() > cursor:
+            return True
+        if remaining <= POLL_SECONDS:
+            return False
+
+
+def reset():
+    """Stop recording and close the feed so the next start picks it up again (used by tests)"""
+    global started, segment, last_seq, segment_start, segment_count, segment_size
+    with helpdesk.store_lock, feed_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        if flush in helpdesk.save_listeners:
+            helpdesk.save_listeners.remove(flush)
+        pending.clear()
+        if segment is not None:
+            segment.close()
+        segment = None
+        last_seq, segment_start, segment_count, segment_size = 0, 0, 0, 0
+        started = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print helpdesk ticket changes as JSON lines")
+    parser.add_argument("--cursor", type=int, default=0, help="last sequence number already seen")
+    parser.add_argument("--from-end", action="store_true", help="skip the history and only show new changes")
+    parser.add_argument("--follow", action="store_true", help="keep waiting for new changes")
+    parser.add_argument("--limit", type=int, default=BATCH_LIMIT, help="events read per batch")
+    args = parser.parse_args(argv)
+
+    cursor = args.cursor
+    if args.from_end:
+        cursor = latest_sequence()
+    try:
+        while True:
+            events = read_changes(cursor, args.limit)
+            for event in events:
+                sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+            if events:
+                cursor = events[-1]["seq"]
+            elif args.follow:
+                time.sleep(POLL_SECONDS)
+            else:
+                return 0
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
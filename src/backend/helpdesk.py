@@ -2,62 +2,328 @@ from pathlib import Path
 from datetime import datetime  
 import json
 from json import JSONDecodeError
+import ast
 import csv
-
-# defining where ticket data and logs are stored
+import io
+import mmap
+import os
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # CS - Windows has no flock, run a single process against a data file there
+    fcntl = None
+
+from src.backend import archive, changes, metrics, shards, similarity, workload
+
+# the ticket engine shared by both CLIs and the web app - loading, validating, changing and saving tickets
+# ticket IDs are always ints, comments are always stored as JSON
+
+# defining where ticket data and logs are stored (HELPDESK_DATA_FILE can point somewhere else, e.g. for tests)
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DATA_FILE = BASE_DIR / "data" / "helpdesk.csv"
+DATA_FILE = Path(os.environ.get("HELPDESK_DATA_FILE") or BASE_DIR / "data" / "helpdesk.csv")
 LOG_FILE = BASE_DIR / "logs" / "error.log"
-print("DATA FILE PATH:", DATA_FILE)
 
+FIELDNAMES = ["ID", "Title", "Description", "Assignee", "Severity", "Status", "Category", "Submission DateTime", "Comments", "Version", "Closed DateTime"]
+REQUIRED_FIELDS = ["Title", "Description", "Assignee", "Severity", "Status", "Category", "Submission DateTime"]
+
+CATEGORIES = ["Hardware", "Software", "Network", "Security"]
+SEVERITIES = ["Low", "Medium", "High"]
+STATUSES = ["Open", "In Progress", "Closed"]
+
+# loading big files on a process pool - HELPDESK_LOAD_WORKERS=1 turns it off, 0 means one per CPU
+LOAD_WORKERS = int(os.environ.get("HELPDESK_LOAD_WORKERS", "0"))
+PARALLEL_LOAD_MIN_BYTES = 32 * 1024 * 1024
+
+DATETIME_FORMAT = "%d/%m/%Y %H:%M:%S"  # format used for Submission DateTime and Closed DateTime
+# other formats found in older files, tried in order when a date isn't in DATETIME_FORMAT
+OLD_DATETIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M", "%d/%m/%Y", "%Y-%m-%d"]
+
+# recent field changes per ticket, used to merge edits made from an older copy
+# ticket_id -> {"since": oldest version we can rebuild, "changes": [(version, field, old value), ...]}
+ticket_history = {}
+HISTORY_LIMIT = 50
+
+# writers hold store_lock while changing tickets, saves hold save_lock while writing the file
+# readers never take save_lock, so a slow save never blocks page loads
+store_lock = threading.RLock()
+save_lock = threading.Lock()
+
+# several processes (gunicorn workers, the CLIs) can share one data file - a change to the shared store
+# is a transaction: take the data file lock, reload if another process saved since we last read the file,
+# change, save, let go (see store_transaction) - lock order is write_lock, data file lock, save_lock, store_lock
+write_lock = threading.RLock()  # one transaction at a time in this process, the data file lock covers the others
+transaction_depth = 0  # nested transactions only lock, reload and save in the outermost one
+store_signature = None  # the data file as this process last loaded or saved it (see file_signature)
+unsaved = False  # the shared store has changes the data file doesn't have yet
+reloading = False  # set while changes saved by another process are applied, so listeners can tell
+
+# point-in-time copies of each ticket dict, id(tickets) -> (tickets, tuple of tickets)
+snapshot_cache = {}
+
+# functions called as listener(kind, ticket_id, before, after) after every change
+# kind is "created", "updated", "commented", "deleted" or "archived" (moved to archive.py) - listeners run under store_lock so keep them quick
+change_listeners = []
+
+# functions called as listener() after the store has been written to disk, e.g. the change feed, which
+# only records a change once it is saved
+save_listeners = []
+
+
+class TicketNotFound(Exception):
+    """Raised when a change finds the ticket gone (deleted or archived, possibly by another process)"""
+
+    def __init__(self, ticket_id):
+        super().__init__(f"Ticket {ticket_id} not found.")
+        self.ticket_id = ticket_id
+
+
+class TicketClosed(Exception):
+    """Raised when a change that needs an open ticket finds it closed"""
+
+    def __init__(self, ticket_id):
+        super().__init__(f"Ticket {ticket_id} has been closed.")
+        self.ticket_id = ticket_id
+
+
+class VersionConflict(Exception):
+    """Raised when a ticket was changed by someone else since it was read"""
+
+    def __init__(self, ticket_id, current_version, fields):
+        super().__init__(f"Ticket {ticket_id} was changed by someone else (now at version {current_version}).")
+        self.ticket_id = ticket_id
+        self.current_version = current_version
+        self.fields = fields  # fields both sides changed
 
-def load_tickets():
-    """Load tickets from the CSV file into memory"""
+
+def load_tickets(workers=None):
+    """Load tickets from the CSV file (or its shards) into memory, in parallel for big files (see LOAD_WORKERS)"""
     tickets = {}  # storing tickets in a dictionary for fast lookup by ID
 
-    if not DATA_FILE.exists():
+    paths = [path for path in shards.data_files() if path.exists()]
+    if not paths:
         print(f"No data file found at {DATA_FILE}. Starting empty.")
         return tickets  # CS - avoid crashing if the file does not exist
 
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # CS - ensure the log folder exists
+    start = time.perf_counter()
+    errors = []  # CS - written to the log in one go instead of reopening it for every bad row
 
-    with open(DATA_FILE, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)  # reading each row as a dictionary for clarity
-        for row in reader:
-            ticket_id = row.get("ID", "").strip()  # CS - clean input to avoid errors
+    if workers is None:
+        workers = LOAD_WORKERS or (os.cpu_count() or 1)
+        if sum(path.stat().st_size for path in paths) < PARALLEL_LOAD_MIN_BYTES:
+            workers = 1  # starting processes costs more than it saves on small files
 
-            if not ticket_id.isdigit():
-                log_error(f"Invalid or missing ID: {ticket_id} - row skipped")  # CS - skip invalid IDs
+    if workers > 1 and paths == [DATA_FILE]:
+        chunks, rows_read = load_parallel(workers, errors)  # one big file, split on record boundaries
+    else:
+        if workers > 1:
+            # CS - shards are already split, so each one is parsed whole on the pool
+            with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+                results = list(pool.map(load_file, map(str, paths)))
+        else:
+            results = [load_file(path) for path in paths]
+        chunks = [chunk for chunk, _ in results]
+        for _, file_errors in results:
+            errors.extend(file_errors)
+        rows_read = sum(len(chunk) for chunk in chunks)
+
+    # merging in file order, so the first copy of a duplicated ID wins whichever way it was loaded
+    for chunk in chunks:
+        for ticket in chunk:
+            if ticket is None:
                 continue
 
-            if ticket_id in tickets:
-                log_error(f"Duplicate ID {ticket_id} - row skipped")  # CS - prevent duplicate tickets
+            if ticket["ID"] in tickets:
+                errors.append(f"Duplicate ID {ticket['ID']} - row skipped")  # CS - prevent duplicate tickets
                 continue
 
-            # checking required fields exist
-            required_fields = ["Title", "Description", "Assignee", "Severity", "Status", "Category", "Submission DateTime"]
-            missing = [field for field in required_fields if not row.get(field)]
-            if missing:
-                log_error(f"Ticket {ticket_id} missing fields: {missing} - row skipped")  # CS - skip incomplete tickets
-                continue
+            tickets[ticket["ID"]] = ticket  # saving the ticket using its ID
 
-            if row["Severity"].lower() not in ["low", "medium", "high"]:
-                log_error(f"Ticket {ticket_id} has invalid severity - row skipped")  # CS - ensure valid severity
-                continue
+    log_errors(errors)
+    metrics.observe("helpdesk_store_load_seconds", time.perf_counter() - start)
+    metrics.inc("helpdesk_store_rows_loaded_total", len(tickets))
+    metrics.inc("helpdesk_store_rows_rejected_total", rows_read - len(tickets))
+    return tickets 
 
-            if row["Status"].lower() not in ["open", "in progress", "closed"]:
-                log_error(f"Ticket {ticket_id} has invalid status - row skipped")  # CS - ensure valid status
-                continue
 
-            try:
-                row["Comments"] = json.loads(row.get("Comments", "[]"))
-            except JSONDecodeError:
-                row["Comments"] = []
+def find_record_boundaries(data, count):
+    """Split points that fall between CSV records (never inside a quoted field with a line break)"""
+    # a newline ends a record only when an even number of quotes come before it ("" escapes count twice)
+    boundaries = [find_record_end(data, 0, 0)]  # end of the header
+    step = max(len(data) // count, 1)
+    for target in range(step, len(data), step):
+        if target <= boundaries[-1]:
+            continue
+        quotes = count_quotes(data, boundaries[-1], target) % 2  # the last boundary had an even count
+        boundary = find_record_end(data, target, quotes)
+        if boundary >= len(data):
+            break
+        boundaries.append(boundary)
+    boundaries.append(len(data))
+    return boundaries
 
 
-            tickets[ticket_id] = row  # saving the ticket using its ID
+def find_record_end(data, position, quotes):
+    """Offset just after the first record-ending newline at or after position"""
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return len(data)
+        quotes = (quotes + count_quotes(data, position, newline)) % 2
+        if quotes == 0:
+            return newline + 1
+        position = newline + 1
+
+
+def count_quotes(data, start, end, block=16 * 1024 * 1024):
+    """Number of quote characters in data[start:end], a block at a time (mmap has no count)"""
+    total = 0
+    for position in range(start, end, block):
+        total += data[position:min(position + block, end)].count(b'"')  # CS - bytes.count runs at memory speed
+    return total
+
+
+def load_parallel(workers, errors):
+    """Parse the data file in chunks on a process pool, returning the chunks in file order"""
+    with open(DATA_FILE, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        boundaries = find_record_boundaries(data, workers * 4)  # CS - a few chunks per worker evens out slow ones
+        header = next(csv.reader([data[:boundaries[0]].decode("utf-8")]), [])
+
+    ranges = list(zip(boundaries, boundaries[1:]))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(load_chunk, [str(DATA_FILE)] * len(ranges), [header] * len(ranges), ranges))
+
+    chunks = []
+    rows_read = 0
+    for chunk, chunk_errors in results:
+        chunks.append(chunk)
+        errors.extend(chunk_errors)
+        rows_read += len(chunk)
+    return chunks, rows_read
+
+
+def load_file(path):
+    """Parse a whole ticket file (runs in a worker process when shards load in parallel)"""
+    errors = []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)  # reading each row as a dictionary for clarity
+        return [parse_row(row, errors) for row in reader], errors
 
-    return tickets 
+
+def load_chunk(path, header, byte_range):
+    """Parse one chunk of the data file (runs in a worker process)"""
+    start, end = byte_range
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    errors = []
+    rows = csv.DictReader(io.StringIO(text, newline=""), fieldnames=header)
+    return [parse_row(row, errors) for row in rows], errors
+
+
+def parse_row(row, errors=None):
+    """Validate one CSV row and turn it into a ticket (None if the row is unusable)"""
+    report = errors.append if errors is not None else log_error  # CS - bulk loads collect errors to log at the end
+    ticket_id = (row.get("ID") or "").strip()  # CS - clean input to avoid errors
+
+    if not ticket_id.isdigit():
+        report(f"Invalid or missing ID: {ticket_id} - row skipped")  # CS - skip invalid IDs
+        return None
+
+    ticket_id = int(ticket_id)
+
+    # files written by the old CLI may have separate date and time columns
+    if not row.get("Submission DateTime"):
+        row["Submission DateTime"] = f"{row.get('Submission Date', '')} {row.get('Submission Time', '')}".strip()
+
+    # checking required fields exist
+    missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing:
+        report(f"Ticket {ticket_id} missing fields: {missing} - row skipped")  # CS - skip incomplete tickets
+        return None
+
+    try:
+        checked = normalise_fields({"Severity": row["Severity"], "Status": row["Status"]})
+    except ValueError as e:
+        report(f"Ticket {ticket_id} {e} - row skipped")  # CS - ensure valid severity and status
+        return None
+
+    version = (row.get("Version") or "").strip()
+
+    ticket = {field: row[field] for field in REQUIRED_FIELDS}
+    ticket.update(checked)
+    ticket["ID"] = ticket_id
+    ticket["Comments"] = parse_comments(row.get("Comments"))
+    ticket["Version"] = int(version) if version.isdigit() else 1  # CS - older files have no version column
+    ticket["Closed DateTime"] = (row.get("Closed DateTime") or "").strip()  # CS - unknown for tickets closed before it was recorded
+    return {field: ticket[field] for field in FIELDNAMES}  # keeping the usual column order
+
+
+def parse_comments(text):
+    """Read the Comments column (JSON, or the Python list format the old CLI wrote)"""
+    if not text:
+        return []
+    try:
+        comments = json.loads(text)
+    except JSONDecodeError:
+        try:
+            comments = ast.literal_eval(text)  # CS - literal_eval only reads plain values, it never runs code
+        except (ValueError, SyntaxError):
+            return []
+    return comments if isinstance(comments, list) else []
+
+
+def normalise_fields(fields):
+    """Tidy up severity and status values, raising ValueError if they are not allowed"""
+    fields = dict(fields)
+
+    if "Severity" in fields:
+        severity = str(fields["Severity"]).strip().title()
+        if severity not in SEVERITIES:
+            raise ValueError(f"has invalid severity '{fields['Severity']}'")
+        fields["Severity"] = severity
+
+    if "Status" in fields:
+        status = str(fields["Status"]).strip().replace("-", " ").title()  # "In-progress" -> "In Progress"
+        if status not in STATUSES:
+            raise ValueError(f"has invalid status '{fields['Status']}'")
+        fields["Status"] = status
+
+    return fields
+
+
+def parse_datetime(text):
+    """Read a date in DATETIME_FORMAT or one of the older formats (None if it is none of them)"""
+    text = (text or "").strip()
+    if len(text) == 19 and text[2] == "/" and text[5] == "/":
+        # CS - the usual format, sliced by hand as strptime is slow over a whole file
+        try:
+            return datetime(int(text[6:10]), int(text[3:5]), int(text[0:2]), int(text[11:13]), int(text[14:16]), int(text[17:19]))
+        except ValueError:
+            return None
+    for date_format in OLD_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def make_comment(author, content):
+    """Build a comment in the one format every interface uses"""
+    now = datetime.now()
+    return {
+        "Author": author,
+        "Date": now.strftime("%d/%m/%Y"),
+        "Time": now.strftime("%H:%M:%S"),
+        "Content": content
+    }
 
 
 def log_error(message):
@@ -68,24 +334,405 @@ def log_error(message):
         # CS - keeps a record of problems for review
 
 
+def log_errors(messages):
+    """Write a batch of errors to the log file in one go"""
+    if not messages:
+        return
+    stamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(LOG_FILE, "a", encoding="utf-8") as log:
+        log.writelines(f"[{stamp}] {message}\n" for message in messages)
+
+
+def snapshot_tickets(tickets):
+    """Get a tuple of tickets that is safe to iterate while other threads write"""
+    cached = snapshot_cache.get(id(tickets))
+    if cached and cached[0] is tickets:
+        metrics.inc("helpdesk_cache_requests_total", cache="snapshot", result="hit")
+        return cached[1]
+
+    metrics.inc("helpdesk_cache_requests_total", cache="snapshot", result="miss")
+
+    with store_lock:
+        snapshot = tuple(tickets.values())
+        snapshot_cache[id(tickets)] = (tickets, snapshot)
+    return snapshot
+
+
+def mark_changed(tickets, kind, ticket_id, before, after):
+    """Drop the cached snapshot and tell listeners about a change (call while holding store_lock)"""
+    global unsaved
+    snapshot_cache.pop(id(tickets), None)
+    if tickets is shared_tickets:
+        unsaved = True
+    for listener in change_listeners:
+        listener(kind, ticket_id, before, after)
+
+
 def save_tickets(tickets):
-    """Save all tickets back to the CSV file"""
-    fieldnames = ["ID", "Title", "Description", "Assignee", "Severity", "Status", "Category", "Submission DateTime", "Comments"]
+    """Save all tickets back to the CSV file (or just the changed shards, see shards.py)"""
+    if syncs_with_file(tickets):
+        with store_transaction(tickets):
+            pass  # CS - the transaction saves on the way out, only if something changed
+        return
+    write_store(tickets)
+
 
+def write_store(tickets):
+    """Write the store to the CSV file or its dirty shards"""
+    global store_signature, unsaved
     DATA_FILE.parent.mkdir(parents=True, exist_ok=True)  # CS - ensure the data folder exists
 
-    with open(DATA_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames) 
+    with save_lock, metrics.timer("helpdesk_store_save_seconds"):
+        if tickets is shared_tickets:
+            unsaved = False  # CS - cleared before the snapshot, so a change made while writing is saved next time
+        try:
+            if shards.started:
+                shards.save_shards(tickets)
+            else:
+                # taking the snapshot after getting save_lock so the last save always has the newest data
+                write_ticket_file(DATA_FILE, snapshot_tickets(tickets))
+        except BaseException:
+            if tickets is shared_tickets:
+                unsaved = True  # CS - still only in memory, the next save tries again
+            raise
+        if tickets is shared_tickets:
+            store_signature = file_signature()
+        for listener in save_listeners:
+            listener()
+
+
+def syncs_with_file(tickets):
+    """Whether changes to tickets are transactions against the data file (only the loaded shared store)"""
+    return tickets is shared_tickets and store_loaded
+
+
+def file_signature():
+    """Identifies what is saved right now - it changes whenever any process saves (a save swaps in a new file)"""
+    return path_signature(shards.index_file() if shards.enabled() else DATA_FILE)
+
+
+def path_signature(path):
+    """Identifies the file at path right now (files saved with replacing_file get a new one on every save)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (str(path), None)
+    return (str(path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def changed_on_disk():
+    """Whether another process saved the data file since this one last loaded or saved it"""
+    current = file_signature()
+    # CS - a different path means DATA_FILE was pointed somewhere else, that isn't someone else's save
+    return store_signature is not None and current[1] is not None and current[0] == store_signature[0] and current != store_signature
+
+
+def lock_file_path():
+    return DATA_FILE.with_name(DATA_FILE.name + ".lock")
+
+
+def open_lock_file(path, blocking=True):
+    """Open path and lock it against other processes (None if blocking is False and another process has it)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    f = open(path, "a+b")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f  # CS - closing the file lets go of the lock
+
+
+@contextmanager
+def file_lock(path):
+    """Hold the lock on path for a with block"""
+    f = open_lock_file(path)
+    try:
+        yield
+    finally:
+        f.close()
+
+
+@contextmanager
+def store_transaction(tickets):
+    """Change the store with no other thread or process changing it in between, saving on the way out"""
+    global transaction_depth
+    if not syncs_with_file(tickets):
+        with store_lock:
+            yield
+        return
+
+    with write_lock:
+        outermost = transaction_depth == 0
+        lock = open_lock_file(lock_file_path()) if outermost else None
+        transaction_depth += 1
+        try:
+            if outermost and changed_on_disk():
+                reload_store()
+            yield
+        finally:
+            transaction_depth -= 1
+            try:
+                if outermost and unsaved:
+                    write_store(tickets)  # CS - saved even if the change failed half way, memory and file never drift
+            finally:
+                if lock is not None:
+                    lock.close()
+
+
+def sync_store():
+    """Pick up changes other processes saved since this one last read the data file (just a stat when there are none)"""
+    if store_loaded and changed_on_disk():
+        with store_transaction(shared_tickets):
+            pass
+
+
+def reload_store():
+    """Replace the shared store with what is saved, telling listeners about every ticket that differs (hold the data file lock)"""
+    global store_signature, unsaved, reloading
+    signature = file_signature()
+    fresh = load_tickets()
+    archive.load_index(reload=True)  # CS - tickets archived by the other process must not come back as deleted
+
+    with store_lock:
+        reloading = True
+        try:
+            for ticket_id in [ticket_id for ticket_id in shared_tickets if ticket_id not in fresh]:
+                before = shared_tickets.pop(ticket_id)
+                ticket_history.pop(ticket_id, None)
+                mark_changed(shared_tickets, "archived" if ticket_id in archived_ids else "deleted", ticket_id, before, None)
+            for ticket_id, ticket in fresh.items():
+                before = shared_tickets.get(ticket_id)
+                if before == ticket:
+                    continue
+                if before is None:
+                    kind = "created"
+                elif {**before, "Comments": ticket["Comments"], "Version": ticket["Version"]} == ticket:
+                    kind = "commented"
+                else:
+                    kind = "updated"
+                shared_tickets[ticket_id] = ticket
+                record_reloaded_history(before, ticket)
+                mark_changed(shared_tickets, kind, ticket_id, before, ticket)
+        finally:
+            reloading = False
+        unsaved = False
+        store_signature = signature
+    metrics.inc("helpdesk_store_reloads_total")
+
+
+@contextmanager
+def replacing_file(path, mode="w", **open_args):
+    """Write path through a temp file of its own in the same folder, swapped in when the with block ends"""
+    # CS - a unique name per write, so two threads or processes saving at once never share (or delete) a temp file
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        try:
+            os.chmod(temp_name, stat.S_IMODE(os.stat(path).st_mode))  # CS - mkstemp files are private, keep the old mode
+        except FileNotFoundError:
+            os.chmod(temp_name, 0o644)
+        with open(fd, mode, **open_args) as f:
+            yield f
+        os.replace(temp_name, path)  # CS - swap in the new file in one step so it is never half written
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_ticket_file(path, rows):
+    """Write tickets to a CSV file through a temp file"""
+    with replacing_file(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()  # writing the column titles first
-        for ticket in tickets.values():
+        for ticket in rows:
             ticket_copy = ticket.copy()
             ticket_copy["Comments"] = json.dumps(ticket_copy.get("Comments", []))
+            ticket_copy.setdefault("Version", 1)
             writer.writerow(ticket_copy)
             # CS - ensures the file stays consistent and readable
-
-
-tickets = load_tickets()
-# CS - reduces repeated file access
+        f.flush()
+        metrics.inc("helpdesk_store_bytes_written_total", os.fstat(f.fileno()).st_size)  # before the swap, the name is still ours
+
+
+def ticket_matches(ticket, filters, since=None, until=None):
+    """Whether a ticket's fields equal filters and it was submitted between since and until"""
+    if any(ticket.get(field) != value for field, value in filters.items()):
+        return False
+    if since or until:
+        submitted = parse_datetime(ticket.get("Submission DateTime"))
+        if submitted is None or (since and submitted < since) or (until and submitted > until):
+            return False
+    return True
+
+
+def find_tickets(tickets, filters, since=None, until=None):
+    """Tickets matching filters (e.g. {"Status": "Open"}) - a sharded store only scans shards that can match"""
+    if shards.started:
+        return shards.select(tickets, filters, since, until)
+    return [ticket for ticket in snapshot_tickets(tickets) if ticket_matches(ticket, filters, since, until)]
+
+
+def insert_ticket(tickets, ticket):
+    """Add a ticket to the store (its ID must not already be taken)"""
+    ticket = normalise_fields(ticket)
+    if ticket.get("Status") == "Closed" and not ticket.get("Closed DateTime"):
+        ticket["Closed DateTime"] = ticket.get("Submission DateTime", "")  # added already closed
+    with store_transaction(tickets), store_lock:
+        if ticket["ID"] in tickets:
+            raise ValueError(f"Ticket {ticket['ID']} already exists")
+        if ticket["ID"] in archived_ids:
+            raise ValueError(f"Ticket {ticket['ID']} already exists in the archive")
+        tickets[ticket["ID"]] = ticket
+        mark_changed(tickets, "created", ticket["ID"], None, ticket)
+    return ticket
+
+
+def create_ticket(tickets, fields):
+    """Add a new ticket using the next free ID"""
+    with store_transaction(tickets), store_lock:
+        # CS - picking the ID in the transaction so two requests (or processes) never get the same one
+        ticket_id = max(max(tickets.keys(), default=100), max(archived_ids, default=100)) + 1
+        return insert_ticket(tickets, {"ID": ticket_id, **fields, "Comments": [], "Version": 1})
+
+
+def require_ticket(tickets, ticket_id):
+    """The ticket to change, raising TicketNotFound if it is gone (call inside store_transaction)"""
+    ticket = tickets.get(ticket_id)
+    if ticket is None:
+        raise TicketNotFound(ticket_id)  # CS - checked after the reload, another process may have deleted it
+    return ticket
+
+
+def delete_ticket_record(tickets, ticket_id, expected_version=None):
+    """Remove a ticket, refusing if it changed since the caller's version"""
+    with store_transaction(tickets), store_lock:
+        ticket = require_ticket(tickets, ticket_id)
+        if expected_version is not None and expected_version != ticket.get("Version", 1):
+            raise VersionConflict(ticket_id, ticket.get("Version", 1), [])
+        del tickets[ticket_id]
+        ticket_history.pop(ticket_id, None)
+        mark_changed(tickets, "deleted", ticket_id, ticket, None)
+    return ticket
+
+
+def record_reloaded_history(before, after):
+    """Add a change another process saved to the ticket's history, so edits made from before it can still merge"""
+    if before is None:
+        return
+    old_version = before.get("Version", 1)
+    changed = [field for field in FIELDNAMES if field != "Version" and before.get(field) != after.get(field)]
+    # CS - only exact when it is one version on (or only comments, which edits never touch) - otherwise
+    # the versions in between are unknown, so forgetting the history makes older edits conflict instead
+    if after.get("Version", 1) == old_version + 1 or changed == ["Comments"]:
+        history = get_ticket_history(before["ID"], old_version)
+        history["changes"].extend((after.get("Version", 1), field, before.get(field)) for field in changed)
+    else:
+        ticket_history.pop(before["ID"], None)
+
+
+def get_ticket_history(ticket_id, current_version):
+    """Get (or start) the change history kept for a ticket"""
+    return ticket_history.setdefault(ticket_id, {"since": current_version, "changes": []})
+
+
+def update_ticket_fields(tickets, ticket_id, changes, expected_version=None, require_open=False):
+    """Apply field changes to a ticket, merging with edits saved since the caller's version
+    (require_open raises TicketClosed instead of changing a closed ticket)"""
+    changes = normalise_fields(changes)
+    with store_transaction(tickets), store_lock:
+        ticket = require_ticket(tickets, ticket_id)
+        if require_open and ticket.get("Status") == "Closed":
+            raise TicketClosed(ticket_id)  # CS - checked under the lock, it may have been closed since the caller looked
+        current_version = ticket.get("Version", 1)
+        history = get_ticket_history(ticket_id, current_version)
+
+        if expected_version is not None and expected_version != current_version:
+            # someone saved first - working out what each field held at the caller's version
+            if not history["since"] <= expected_version < current_version:
+                raise VersionConflict(ticket_id, current_version, list(changes))  # CS - too old to merge safely
+
+            base_values = {}
+            for version, field, old_value in reversed(history["changes"]):
+                if version > expected_version:
+                    base_values[field] = old_value
+
+            clashes = []
+            for field, value in list(changes.items()):
+                if field not in base_values:
+                    continue  # nobody else touched it
+                if value == base_values[field]:
+                    del changes[field]  # caller left it alone - keep the newer value
+                elif value != ticket.get(field):
+                    clashes.append(field)  # both sides changed it differently
+
+            if clashes:
+                raise VersionConflict(ticket_id, current_version, clashes)  # CS - never silently overwrite another edit
+
+        # ignoring fields that already hold the requested value
+        changes = {field: value for field, value in changes.items() if ticket.get(field) != value}
+        if not changes:
+            return ticket
+
+        # recording when a ticket is closed (and forgetting it if the ticket is reopened) for reports
+        if "Status" in changes and (changes["Status"] == "Closed" or ticket.get("Status") == "Closed"):
+            changes["Closed DateTime"] = datetime.now().strftime(DATETIME_FORMAT) if changes["Status"] == "Closed" else ""
+
+        new_version = current_version + 1
+        for field, value in changes.items():
+            history["changes"].append((new_version, field, ticket.get(field)))
+
+        if len(history["changes"]) > HISTORY_LIMIT:
+            # forgetting the oldest changes, stale edits from before them will conflict
+            history["since"] = history["changes"][-HISTORY_LIMIT][0]
+            history["changes"] = [change for change in history["changes"] if change[0] > history["since"]]
+
+        # replacing the ticket instead of editing it, so readers holding the old one see a consistent copy
+        updated = {**ticket, **changes, "Version": new_version}
+        tickets[ticket_id] = updated
+        mark_changed(tickets, "updated", ticket_id, ticket, updated)
+
+    return updated
+
+
+def add_ticket_comment(tickets, ticket_id, comment):
+    """Append a comment to a ticket (comments never conflict, they only add)"""
+    with store_transaction(tickets), store_lock:
+        ticket = require_ticket(tickets, ticket_id)
+        get_ticket_history(ticket_id, ticket.get("Version", 1))
+        updated = {**ticket, "Comments": ticket.get("Comments", []) + [comment], "Version": ticket.get("Version", 1) + 1}
+        tickets[ticket_id] = updated
+        mark_changed(tickets, "commented", ticket_id, ticket, updated)
+
+    return updated
+
+
+# the shared ticket store - filled from the CSV on first use (see get_tickets) so importing is cheap
+tickets = {}
+shared_tickets = tickets  # the same dict, for functions whose tickets argument hides it
+archived_ids = set()  # IDs of tickets moved to the archive (see archive.py), so they are never reused
+store_loaded = False
+
+
+def get_tickets():
+    """Get the shared ticket store, loading it from the CSV the first time"""
+    global store_loaded, store_signature
+    if not store_loaded:
+        with write_lock, store_lock:
+            if not store_loaded:  # CS - another thread may have loaded it while we waited
+                store_signature = file_signature()  # CS - before reading, so a save that lands meanwhile is reloaded
+                tickets.update(load_tickets())
+                snapshot_cache.pop(id(tickets), None)
+                store_loaded = True
+                shards.start(tickets)
+                changes.start()  # every change from here on goes to the change feed
+                archive.load_index()  # CS - archiving itself is a separate pass (python -m src.backend.archive), never part of loading
+    return tickets
+    # CS - reduces repeated file access
 
 def predict_category(title):
     """Guess ticket category using keywords"""
@@ -107,32 +754,52 @@ def add_ticket():
         ticket_id = input("Enter unique numeric ID: ").strip()  # CS - clean input
         if not ticket_id.isdigit():
             print("ID must be numeric.")  # CS - prevent invalid ID
-        elif ticket_id in tickets:
+        elif int(ticket_id) in tickets or int(ticket_id) in archived_ids:
             print("ID already exists.")  # CS - prevent duplicates
         else:
+            ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
             break
 
     title = input("Enter ticket title: ").strip() 
     description = input("Enter description: ").strip()
-    assignee = input("Assign to (Olivia, Ryan, Jacob, Benjamin): ").strip()
+
+    duplicates = similarity.find_duplicates(title, description)
+    if duplicates:
+        print("Possible duplicates of open tickets:")  # CS - saves triaging the same problem twice
+        for duplicate_id, score in duplicates:
+            duplicate = tickets.get(duplicate_id)
+            if duplicate:
+                print(f"  {duplicate_id} | {duplicate['Title']} | {duplicate['Status']} | {score:.0%} similar")
+        if input("Add this ticket anyway? (y/n): ").strip().lower() != "y":
+            print("Ticket not added.")
+            return
+    assignee = input(f"Assign to ({', '.join(workload.get_roster())}) or leave blank to auto-assign: ").strip()
     severity = input("Severity (High, Medium, Low): ").strip().title()
     status = input("Status (Open, In Progress, Closed): ").strip().title()
 
     category = predict_category(title).title() 
 
-    submission_datetime = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-    tickets[ticket_id] = {  # adding ticket to memory
-        "ID": ticket_id,
-        "Title": title,
-        "Description": description,
-        "Assignee": assignee,
-        "Severity": severity,
-        "Status": status,
-        "Category": category,
-        "Submission DateTime": submission_datetime,
-        "Comments": [] 
-    }
+    if not assignee:
+        assignee = workload.pick_assignee(category) or "Unassigned"  # CS - least loaded agent for this category
+
+    submission_datetime = datetime.now().strftime(DATETIME_FORMAT)
+
+    try:
+        insert_ticket(tickets, {  # adding ticket to memory
+            "ID": ticket_id,
+            "Title": title,
+            "Description": description,
+            "Assignee": assignee,
+            "Severity": severity,
+            "Status": status,
+            "Category": category,
+            "Submission DateTime": submission_datetime,
+            "Comments": [],
+            "Version": 1
+        })
+    except ValueError as e:
+        print(f"Ticket {e}.")  # CS - reject invalid severity or status
+        return
 
     save_tickets(tickets)
     print(f"Ticket added! Predicted category: {category}")  
@@ -147,7 +814,9 @@ def view_ticket_details(tickets):
         print("Invalid Ticket ID.")  # CS - prevent invalid input
         return
 
-    found_ticket = tickets.get(ticket_id) 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
+    found_ticket = tickets.get(ticket_id) or archive.get_archived_ticket(ticket_id)  # CS - old closed tickets are archived
     if not found_ticket:
         print("Ticket not found.")  # CS - avoid errors
         return
@@ -175,6 +844,8 @@ def delete_ticket(tickets):
         print("Invalid Ticket ID.")
         return
 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
     found_ticket = tickets.get(ticket_id) 
     if not found_ticket:
         print("Ticket not found.")
@@ -188,7 +859,11 @@ def delete_ticket(tickets):
         print("Deletion cancelled.")  # CS - prevent accidental deletion
         return
 
-    del tickets[ticket_id] 
+    try:
+        delete_ticket_record(tickets, ticket_id)
+    except TicketNotFound:
+        print("Ticket not found.")  # CS - deleted somewhere else while we were asking
+        return
     save_tickets(tickets) 
     print("Ticket deleted successfully.")
 
@@ -201,6 +876,8 @@ def update_ticket(tickets):
         print("Invalid Ticket ID.")
         return
 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
     ticket = tickets.get(ticket_id)  
     if not ticket:
         print("Ticket not found.")
@@ -216,8 +893,8 @@ def update_ticket(tickets):
 
     field = input("Field to update (Title, Description, Assignee, Severity, Status, Category): ").strip().title()
 
-    if field == "ID":
-        print("ID cannot be changed.")  # CS - prevent altering primary identifier
+    if field in ("ID", "Version"):
+        print(f"{field} cannot be changed.")  # CS - prevent altering primary identifier
         return
 
     if field not in ticket:
@@ -244,7 +921,11 @@ def update_ticket(tickets):
         print("AI Suggestion: Consider escalating this ticket.") 
 
     old_value = ticket[field]  # remembering old value for tracking
-    ticket[field] = new_value  # updating the field
+    try:
+        update_ticket_fields(tickets, ticket_id, {field: new_value})  # updating the field
+    except TicketNotFound:
+        print("Ticket not found.")  # CS - deleted somewhere else while we were asking
+        return
     save_tickets(tickets)  # keeping the changes
 
     log_entry = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Ticket {ticket_id}: {field} changed from '{old_value}' to '{new_value}'\n"
@@ -263,6 +944,8 @@ def add_comment(tickets):
         print("Invalid Ticket ID.")
         return
 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
     ticket = tickets.get(ticket_id)
     if not ticket:
         print("Ticket not found.")
@@ -277,14 +960,11 @@ def add_comment(tickets):
         print("AI Warning: Comment may contain sensitive information.")
 
     # store comment as a dict (like in web version)
-    comment_dict = {
-        "Author": "CLI User",
-        "Date": datetime.now().strftime("%d/%m/%Y"),
-        "Time": datetime.now().strftime("%H:%M:%S"),
-        "Content": comment_text
-    }
-
-    ticket.setdefault("Comments", []).append(comment_dict)  # append dict, not string
+    try:
+        add_ticket_comment(tickets, ticket_id, make_comment("CLI User", comment_text))
+    except TicketNotFound:
+        print("Ticket not found.")  # CS - deleted somewhere else while we were asking
+        return
 
     save_tickets(tickets)  # save changes
     print("Comment added successfully.")
@@ -300,6 +980,8 @@ def close_ticket(tickets):
         # CS - only allows valid number IDs
         return
 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
     ticket = tickets.get(ticket_id)  
 
     if not ticket:
@@ -312,7 +994,11 @@ def close_ticket(tickets):
 
         return  
 
-    ticket["Status"] = "Closed"  
+    try:
+        update_ticket_fields(tickets, ticket_id, {"Status": "Closed"})
+    except TicketNotFound:
+        print("Ticket not found.")  # CS - deleted somewhere else while we were asking
+        return
 
     save_tickets(tickets)  
 
@@ -329,6 +1015,8 @@ def escalate_ticket(tickets):
         # CS - ensures valid ID format
         return
 
+    ticket_id = int(ticket_id)  # CS - IDs are stored as numbers
+
     ticket = tickets.get(ticket_id)  
 
     if not ticket:
@@ -341,17 +1029,31 @@ def escalate_ticket(tickets):
         # CS - prevents changes to completed tickets
         return  
 
-    new_assignee = input("Enter new assignee: ").strip()
+    new_assignee = input("Enter new assignee (leave blank to auto-assign): ").strip()
+    if not new_assignee:
+        new_assignee = workload.pick_assignee(ticket["Category"], exclude={ticket["Assignee"]})
+        if not new_assignee:
+            print("Nobody else on the roster can take this ticket.")
+            return
 
     if ticket["Severity"].lower() == "high":
         print("AI Suggestion: High severity tickets should be assigned to senior staff.")
 
     old_assignee = ticket["Assignee"]
 
-    ticket["Assignee"] = new_assignee
-    ticket["Severity"] = "High"  
-    ticket["Status"] = "In Progress"
-    # updating related fields together to keep data consistent
+    try:
+        update_ticket_fields(tickets, ticket_id, {
+            "Assignee": new_assignee,
+            "Severity": "High",
+            "Status": "In Progress"
+        }, require_open=True)
+        # updating related fields together to keep data consistent
+    except TicketClosed:
+        print("Cannot escalate a closed ticket.")  # CS - closed somewhere else while we were asking
+        return
+    except TicketNotFound:
+        print("Ticket not found.")  # CS - deleted somewhere else while we were asking
+        return
 
     save_tickets(tickets)
 
@@ -371,7 +1073,9 @@ def view_all_tickets(tickets):
 
 def main_menu():
     """Main menu navigation for the user"""
+    get_tickets()  # load tickets at startup
     while True:
+        sync_store()  # CS - picks up tickets saved by the web app or another CLI since
         print("\n=== Helpdesk Main Menu ===")
         print("1. Submit New Ticket")
         print("2. Edit Ticket")
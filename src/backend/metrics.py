@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# lightweight metrics kept in memory and shown in the Prometheus text format on /metrics
+# (no client library needed - counters, gauges and histograms are all we use)
+#
+# the registry belongs to one process - under gunicorn each worker counts only the requests it served,
+# and /metrics shows the numbers of whichever worker answered (run one worker with threads when totals matter)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+metrics_lock = threading.Lock()
+
+# name -> {"type": ..., "help": ..., "buckets": ..., "values": {labels tuple: value}}
+registry = {}
+
+
+def describe(name, metric_type, help_text, buckets=DEFAULT_BUCKETS):
+    """Register a metric so it shows up with its HELP and TYPE lines"""
+    with metrics_lock:
+        registry.setdefault(name, {"type": metric_type, "help": help_text, "buckets": buckets, "values": {}})
+
+
+def label_key(labels):
+    """Turn keyword labels into a hashable, sorted key"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter"""
+    with metrics_lock:
+        values = registry[name]["values"]
+        key = label_key(labels)
+        values[key] = values.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its current value"""
+    with metrics_lock:
+        registry[name]["values"][label_key(labels)] = value
+
+
+def observe(name, value, **labels):
+    """Record one value (usually seconds) in a histogram"""
+    with metrics_lock:
+        metric = registry[name]
+        key = label_key(labels)
+        # bucket counts, then sum, then count
+        entry = metric["values"].setdefault(key, [0] * len(metric["buckets"]) + [0.0, 0])
+        for i, bound in enumerate(metric["buckets"]):
+            if value <= bound:
+                entry[i] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time a block of code into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def format_labels(key, extra=()):
+    """Format a label key as {name="value",...}"""
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render():
+    """Build the /metrics page in the Prometheus text format"""
+    lines = []
+    with metrics_lock:
+        for name, metric in sorted(registry.items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric["values"].items()):
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{format_labels(key)} {value}")
+                    continue
+                for bound, count in zip(metric["buckets"], value):
+                    lines.append(f"{name}_bucket{format_labels(key, [('le', str(bound))])} {count}")
+                lines.append(f"{name}_bucket{format_labels(key, [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{format_labels(key)} {value[-2]}")
+                lines.append(f"{name}_count{format_labels(key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Clear every recorded value (used by tests)"""
+    with metrics_lock:
+        for metric in registry.values():
+            metric["values"].clear()
+
+
+# metrics shared by the backend, the CLI and the web app
+describe("helpdesk_store_load_seconds", "histogram", "Time taken to load tickets from the CSV file")
+describe("helpdesk_store_rows_loaded_total", "counter", "Ticket rows loaded from the CSV file")
+describe("helpdesk_store_rows_rejected_total", "counter", "Ticket rows skipped by validation while loading")
+describe("helpdesk_store_save_seconds", "histogram", "Time taken to write tickets to the CSV file")
+describe("helpdesk_store_bytes_written_total", "counter", "Bytes written to the CSV file by saves")
+describe("helpdesk_store_shard_writes_total", "counter", "Shard files rewritten (or removed) by saves of a sharded store")
+describe("helpdesk_store_reloads_total", "counter", "Reloads of the ticket store after another process saved the data file")
+describe("helpdesk_cache_requests_total", "counter", "Cache lookups by cache name and result (hit or miss)")
+describe("helpdesk_http_request_seconds", "histogram", "Web request latency by route")
+describe("helpdesk_http_requests_total", "counter", "Web requests by route, method and status code")
+describe("helpdesk_sla_queue_size", "gauge", "Open tickets waiting on an SLA deadline")
+describe("helpdesk_sla_breaches_total", "counter", "Tickets that breached their SLA by severity")
+describe("helpdesk_duplicate_lookup_seconds", "histogram", "Time taken to find possible duplicates of a new ticket")
+describe("helpdesk_template_render_seconds", "histogram", "Jinja template render time by template")
+describe("helpdesk_http_compressed_bytes_total", "counter", "Response bytes before and after compression by encoding")
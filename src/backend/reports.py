@@ -0,0 +1,251 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import threading
+from collections import Counter
+
+from src.backend import archive, helpdesk, shards
+
+# reporting - rollup tables of tickets opened/closed per category, time to close per assignee and
+# severity trends, bucketed by hour, day, week and month
+#
+# offline: streams the CSV once without loading comments or building the ticket store
+#   python -m src.backend.reports --report category --period week --format csv
+# live (web app): built from the store once, then kept up to date from change_listeners
+# archived tickets (see archive.py) are counted too, so moving a ticket to the archive changes no report
+
+PERIODS = ["hour", "day", "week", "month"]
+REPORTS = ["category", "time-to-close", "severity"]
+TABLE_NAMES = ["opened", "closed", "close_seconds", "close_count", "severity"]
+
+report_lock = threading.RLock()
+facts = {}  # ticket_id -> (submitted, closed, category, severity, assignee) counted in the tables
+tables = {}  # period -> {"opened": Counter, "closed": Counter, "close_seconds": Counter, "close_count": Counter, "severity": Counter}
+started = False
+
+
+def bucket(moment, period):
+    """The label of the hour/day/week/month a datetime falls in (labels sort in time order)"""
+    if period == "hour":
+        return f"{moment.year:04d}-{moment.month:02d}-{moment.day:02d} {moment.hour:02d}:00"
+    if period == "day":
+        return f"{moment.year:04d}-{moment.month:02d}-{moment.day:02d}"
+    if period == "week":
+        year, week, _ = moment.isocalendar()
+        return f"{year:04d}-W{week:02d}"
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def ticket_facts(ticket):
+    """The few fields the reports need, with the dates parsed (None if the ticket can't be counted)"""
+    submitted = helpdesk.parse_datetime(ticket.get("Submission DateTime"))
+    if submitted is None:
+        return None
+    closed = helpdesk.parse_datetime(ticket.get("Closed DateTime")) if ticket.get("Status") == "Closed" else None
+    return submitted, closed, ticket.get("Category", ""), ticket.get("Severity", ""), ticket.get("Assignee", "")
+
+
+def empty_tables():
+    return {period: {name: Counter() for name in TABLE_NAMES} for period in PERIODS}
+
+
+def apply(tables, fact, sign=1):
+    """Add a ticket's facts to the tables (sign=-1 takes them back out)"""
+    submitted, closed, category, severity, assignee = fact
+    for period, table in tables.items():
+        opened_in = bucket(submitted, period)
+        table["opened"][(opened_in, category)] += sign
+        table["severity"][(opened_in, severity)] += sign
+        if closed:
+            closed_in = bucket(closed, period)
+            table["closed"][(closed_in, category)] += sign
+            table["close_seconds"][(closed_in, assignee)] += sign * max((closed - submitted).total_seconds(), 0)
+            table["close_count"][(closed_in, assignee)] += sign
+
+
+def stream_csv(path):
+    """Yield the report fields of each valid row in a ticket file, reading it once"""
+    seen = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        column = {name: i for i, name in enumerate(header)}
+        wanted = ["ID", "Severity", "Status", "Category", "Assignee", "Submission DateTime", "Closed DateTime", "Submission Date", "Submission Time"]
+        positions = [column.get(name) for name in wanted]
+
+        for values in reader:
+            # CS - plain lists are much faster than a dict per row, and comments are never looked at
+            row = {name: values[i] for name, i in zip(wanted, positions) if i is not None and i < len(values)}
+            ticket_id = row.get("ID", "").strip()
+            if not ticket_id.isdigit() or ticket_id in seen:
+                continue  # CS - same rules as load_tickets, bad and duplicate IDs are skipped
+            seen.add(ticket_id)
+            if not row.get("Submission DateTime"):
+                row["Submission DateTime"] = f"{row.get('Submission Date', '')} {row.get('Submission Time', '')}".strip()
+            try:
+                row.update(helpdesk.normalise_fields({"Severity": row.get("Severity", ""), "Status": row.get("Status", "")}))
+            except ValueError:
+                continue
+            fact = ticket_facts(row)
+            if fact:
+                yield int(ticket_id), fact
+
+
+def stream_files(paths):
+    """The report fields of every valid row in the app's ticket file, or each of its shards"""
+    for path in paths:
+        if path.exists():
+            yield from stream_csv(path)
+
+
+def with_archived(rows):
+    """The app's ticket file rows followed by the archived tickets that aren't also still in it"""
+    seen = set()
+    for ticket_id, fact in rows:
+        seen.add(ticket_id)
+        yield ticket_id, fact
+    for ticket in archive.iter_archived():
+        fact = ticket_facts(ticket)
+        if fact and ticket["ID"] not in seen:  # CS - the hot copy wins if an archive pass stopped half way
+            yield ticket["ID"], fact
+
+
+def build_from_csv(path=None):
+    """Offline rollup tables for a whole ticket file (and the archive, for the app's own file)"""
+    rows = stream_csv(path) if path else with_archived(stream_files(shards.data_files()))
+    # counting by hour first, then rolling the (far fewer) hours up into every period
+    hourly = {name: Counter() for name in TABLE_NAMES}
+    for _, (submitted, closed, category, severity, assignee) in rows:
+        opened_in = submitted.replace(minute=0, second=0, microsecond=0)
+        hourly["opened"][(opened_in, category)] += 1
+        hourly["severity"][(opened_in, severity)] += 1
+        if closed:
+            closed_in = closed.replace(minute=0, second=0, microsecond=0)
+            hourly["closed"][(closed_in, category)] += 1
+            hourly["close_seconds"][(closed_in, assignee)] += max((closed - submitted).total_seconds(), 0)
+            hourly["close_count"][(closed_in, assignee)] += 1
+
+    result = empty_tables()
+    labels = {}
+    for name, counter in hourly.items():
+        for (hour, key), value in counter.items():
+            if hour not in labels:
+                labels[hour] = [(period, bucket(hour, period)) for period in PERIODS]
+            for period, label in labels[hour]:
+                result[period][name][(label, key)] += value
+    return result
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - moving a changed ticket from its old buckets to its new ones"""
+    if kind in ("commented", "archived"):
+        return  # CS - archived tickets stay in the tables, they've only moved
+    fact = ticket_facts(after) if after else None
+    with report_lock:
+        old = facts.pop(ticket_id, None)
+        if old == fact:
+            if fact:
+                facts[ticket_id] = fact
+            return
+        if old:
+            apply(tables, old, -1)
+        if fact:
+            apply(tables, fact)
+            facts[ticket_id] = fact
+
+
+def ensure_started():
+    """Build the live tables from the ticket store and follow changes (first call only)"""
+    global started
+    if started:
+        return
+    store = helpdesk.get_tickets()
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, report_lock:
+        if started:
+            return
+        tables.clear()
+        tables.update(empty_tables())
+        facts.clear()
+        for ticket_id, ticket in store.items():
+            fact = ticket_facts(ticket)
+            if fact:
+                facts[ticket_id] = fact
+                apply(tables, fact)
+        for ticket in archive.iter_archived():
+            fact = ticket_facts(ticket)
+            if fact and ticket["ID"] not in facts:
+                facts[ticket["ID"]] = fact
+                apply(tables, fact)
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+
+
+def report_rows(report, period, source=None):
+    """Rows for one report, oldest bucket first (source defaults to the live tables)"""
+    if source is None:
+        ensure_started()
+        source = tables
+    with report_lock:
+        table = source[period]
+        if report == "category":
+            keys = set(table["opened"]) | set(table["closed"])
+            rows = [{"period": key[0], "category": key[1], "opened": table["opened"][key], "closed": table["closed"][key]}
+                    for key in keys if table["opened"][key] or table["closed"][key]]
+        elif report == "time-to-close":
+            rows = [{"period": key[0], "assignee": key[1], "closed": count,
+                     "mean_hours_to_close": round(table["close_seconds"][key] / count / 3600, 2)}
+                    for key, count in table["close_count"].items() if count]
+        elif report == "severity":
+            rows = [{"period": key[0], "severity": key[1], "opened": count} for key, count in table["severity"].items() if count]
+        else:
+            raise ValueError(f"unknown report '{report}'")
+    return sorted(rows, key=lambda row: (row["period"], str(list(row.values())[1])))
+
+
+def export(rows, output_format):
+    """Rows as CSV or JSON text"""
+    if output_format == "json":
+        return json.dumps(rows, indent=2) + "\n"
+    output = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return output.getvalue()
+
+
+def reset():
+    """Forget the live tables so the next call builds them again (used by tests)"""
+    global started
+    with helpdesk.store_lock, report_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        tables.clear()
+        facts.clear()
+        started = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Helpdesk ticket reports")
+    parser.add_argument("--report", choices=REPORTS, default="category", help="which report to build")
+    parser.add_argument("--period", choices=PERIODS, default="week", help="bucket size")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv", help="output format")
+    parser.add_argument("--data-file", help="ticket file to report on (defaults to the app's data file)")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    rows = report_rows(args.report, args.period, build_from_csv(args.data_file))
+    text = export(rows, args.format)
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
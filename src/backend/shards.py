@@ -0,0 +1,245 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+
+from src.backend import helpdesk, metrics
+
+# partitioned ticket store - instead of one helpdesk.csv, tickets are kept in shard files under
+# data/helpdesk.shards/, split by ID range (HELPDESK_SHARD_BY=id) or submission month (=month)
+#
+# every shard has its own file, a summary in index.json (ID range, submission dates, how many tickets
+# have each status/severity/category) and a dirty flag set by change_listeners, so a save only
+# rewrites the shards that changed and a query only scans the shards whose summary can match
+#
+# turning it on for an existing helpdesk.csv splits it into shards on the first load (the CSV is left alone)
+# show the shard summaries with: python -m src.backend.shards
+
+SHARD_BY = os.environ.get("HELPDESK_SHARD_BY", "")  # "", "id" or "month" - empty keeps the single CSV
+SHARD_SIZE = int(os.environ.get("HELPDESK_SHARD_SIZE", "10000"))  # IDs per shard when sharding by ID
+COUNTED_FIELDS = ["Status", "Severity", "Category"]  # fields the summaries count, so filters on them can skip shards
+
+shard_lock = threading.RLock()
+members = {}  # shard key -> set of ticket IDs
+summaries = {}  # shard key -> {"rows", "min_id", "max_id", "first", "last", "Status": Counter, ...}
+dirty = set()  # shard keys changed since the last save
+started = False
+
+
+def enabled():
+    return SHARD_BY in ("id", "month")
+
+
+def shard_dir():
+    return helpdesk.DATA_FILE.with_suffix(".shards")
+
+
+def index_file():
+    return shard_dir() / "index.json"
+
+
+def shard_file(key):
+    return shard_dir() / f"{key}.csv"
+
+
+def shard_files():
+    """The shard files on disk, in key order"""
+    return sorted(shard_dir().glob("*.csv")) if shard_dir().is_dir() else []
+
+
+def data_files():
+    """The files the ticket store is saved in - the shards if sharding is on and they exist, otherwise the CSV"""
+    if enabled() and shard_dir().is_dir():
+        return shard_files()
+    return [helpdesk.DATA_FILE]
+
+
+def shard_key(ticket):
+    """Which shard a ticket belongs in"""
+    if SHARD_BY == "month":
+        submitted = helpdesk.parse_datetime(ticket.get("Submission DateTime"))
+        return f"{submitted.year:04d}-{submitted.month:02d}" if submitted else "undated"
+    start = ticket["ID"] // SHARD_SIZE * SHARD_SIZE
+    return f"id-{start:09d}"
+
+
+def empty_summary():
+    return {"rows": 0, "min_id": None, "max_id": None, "first": None, "last": None, **{field: Counter() for field in COUNTED_FIELDS}}
+
+
+def count(key, ticket, sign):
+    """Add a ticket to (sign=1) or take it out of (sign=-1) its shard's summary"""
+    summary = summaries.setdefault(key, empty_summary())
+    summary["rows"] += sign
+    for field in COUNTED_FIELDS:
+        summary[field][ticket.get(field, "")] += sign
+    if sign > 0:
+        # CS - ranges only ever widen between saves, a wider range just means a shard is scanned when it needn't be
+        ticket_id = ticket["ID"]
+        summary["min_id"] = ticket_id if summary["min_id"] is None else min(summary["min_id"], ticket_id)
+        summary["max_id"] = ticket_id if summary["max_id"] is None else max(summary["max_id"], ticket_id)
+        submitted = helpdesk.parse_datetime(ticket.get("Submission DateTime"))
+        if submitted:
+            summary["first"] = submitted if summary["first"] is None else min(summary["first"], submitted)
+            summary["last"] = submitted if summary["last"] is None else max(summary["last"], submitted)
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - moving the ticket between shard summaries and flagging the shards to save"""
+    with shard_lock:
+        if before:
+            old_key = shard_key(before)
+            members.get(old_key, set()).discard(ticket_id)
+            count(old_key, before, -1)
+            dirty.add(old_key)
+        if after:
+            new_key = shard_key(after)
+            members.setdefault(new_key, set()).add(ticket_id)
+            count(new_key, after, 1)
+            dirty.add(new_key)
+
+
+def start(tickets):
+    """Split the loaded store into shards and follow changes (first call only)"""
+    global started
+    if started or not enabled():
+        return
+    with helpdesk.store_lock, shard_lock:
+        if started:
+            return
+        members.clear()
+        summaries.clear()
+        for ticket_id, ticket in tickets.items():
+            key = shard_key(ticket)
+            members.setdefault(key, set()).add(ticket_id)
+            count(key, ticket, 1)
+
+        # CS - a first run, or a change of HELPDESK_SHARD_BY/SIZE, rewrites every shard (files for keys that
+        # no longer exist are removed when saved)
+        on_disk = {path.stem for path in shard_files()}
+        if saved_layout() != layout():
+            dirty.update(members)
+            dirty.update(on_disk)
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+    if dirty:
+        helpdesk.save_tickets(tickets)
+
+
+def layout():
+    return {"shard_by": SHARD_BY, "shard_size": SHARD_SIZE if SHARD_BY == "id" else None}
+
+
+def saved_layout():
+    try:
+        with open(index_file(), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {"shard_by": saved.get("shard_by"), "shard_size": saved.get("shard_size")}
+
+
+def save_shards(tickets):
+    """Rewrite only the dirty shards (called by save_tickets, which holds save_lock)"""
+    with helpdesk.store_lock, shard_lock:
+        keys = sorted(dirty)
+        dirty.clear()
+        contents = {}
+        for key in keys:
+            rows = [tickets[ticket_id] for ticket_id in sorted(members.get(key, ())) if ticket_id in tickets]
+            contents[key] = rows
+            # the exact ranges, now that the shard's tickets are in hand
+            summaries[key] = empty_summary()
+            for ticket in rows:
+                count(key, ticket, 1)
+            if not rows:
+                summaries.pop(key, None)
+                members.pop(key, None)
+        state = index_state()
+
+    shard_dir().mkdir(parents=True, exist_ok=True)
+    try:
+        for key, rows in contents.items():
+            if rows:
+                helpdesk.write_ticket_file(shard_file(key), rows)
+            else:
+                shard_file(key).unlink(missing_ok=True)
+            metrics.inc("helpdesk_store_shard_writes_total")
+    except OSError:
+        with shard_lock:
+            dirty.update(keys)  # CS - tried again on the next save
+        raise
+
+    with helpdesk.replacing_file(index_file(), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    return keys
+
+
+def index_state():
+    """The shard summaries as JSON ready values"""
+    def plain(summary):
+        entry = {name: summary[name] for name in ("rows", "min_id", "max_id")}
+        entry["first"] = summary["first"].strftime(helpdesk.DATETIME_FORMAT) if summary["first"] else None
+        entry["last"] = summary["last"].strftime(helpdesk.DATETIME_FORMAT) if summary["last"] else None
+        for field in COUNTED_FIELDS:
+            entry[field] = {value: total for value, total in summary[field].items() if total > 0}
+        return entry
+
+    return {**layout(), "shards": {key: plain(summary) for key, summary in sorted(summaries.items())}}
+
+
+def could_match(summary, filters, since, until):
+    """Whether a shard might hold a ticket matching the filters (False means it can be skipped)"""
+    if not summary["rows"]:
+        return False
+    for field, value in filters.items():
+        if field in COUNTED_FIELDS and summary[field][value] <= 0:
+            return False
+    if since and summary["last"] and summary["last"] < since:
+        return False
+    if until and summary["first"] and summary["first"] > until:
+        return False
+    return True
+
+
+def matching_shards(filters, since=None, until=None):
+    """Keys of the shards a query has to scan"""
+    with shard_lock:
+        return [key for key, summary in sorted(summaries.items()) if could_match(summary, filters, since, until)]
+
+
+def select(tickets, filters, since=None, until=None):
+    """Tickets whose fields equal filters and that were submitted between since and until, scanning matching shards only"""
+    found = []
+    with helpdesk.store_lock, shard_lock:
+        for key in matching_shards(filters, since, until):
+            for ticket_id in sorted(members.get(key, ())):
+                ticket = tickets.get(ticket_id)
+                if ticket is not None and helpdesk.ticket_matches(ticket, filters, since, until):
+                    found.append(ticket)
+    return found
+
+
+def reset():
+    """Forget the shard state so the next start builds it again (used by tests)"""
+    global started
+    with helpdesk.store_lock, shard_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        members.clear()
+        summaries.clear()
+        dirty.clear()
+        started = False
+
+
+# printing the saved shard summaries
+if __name__ == "__main__":
+    try:
+        with open(index_file(), encoding="utf-8") as f:
+            saved = json.load(f)
+    except OSError:
+        sys.exit(f"no shard index at {index_file()} (set HELPDESK_SHARD_BY=id or month and start the app once)")
+    print(f"sharded by {saved['shard_by']}" + (f" ({saved['shard_size']} IDs each)" if saved.get("shard_size") else ""))
+    for key, entry in saved["shards"].items():
+        print(f"{key}: {entry['rows']} tickets, IDs {entry['min_id']}-{entry['max_id']}, submitted {entry['first']} to {entry['last']}, {entry['Status']}")
@@ -0,0 +1,195 @@
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from functools import lru_cache
+from operator import eq
+
+from src.backend import helpdesk, metrics
+
+# duplicate ticket detection - MinHash signatures of each open ticket's title + description words,
+# bucketed with LSH so a new ticket only gets compared with tickets that share a bucket
+# (during an outage twenty "Cannot Connect to VPN" tickets land in the same buckets,
+# while the rest of the backlog is never looked at)
+#
+# bulk clustering of the open backlog: python -m src.backend.similarity
+
+NUM_HASHES = 64
+BANDS = 16  # 16 bands of 4 rows - tickets sharing about half their words usually meet in a bucket
+ROWS = NUM_HASHES // BANDS
+SIMILARITY_THRESHOLD = 0.5  # estimated Jaccard similarity counted as a possible duplicate
+MAX_CANDIDATES = 5
+WORD_CACHE_SIZE = 20_000  # hash rows kept for the most used words (512 bytes each)
+
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# fixed (a, b) pairs so signatures are the same in every process and after every restart
+HASH_PARAMS = [((i * 0x9E3779B1 + 0x7F4A7C15) % PRIME | 1, (i * 0x85EBCA77 + 0x165667B1) % PRIME) for i in range(1, NUM_HASHES + 1)]
+
+STOP_WORDS = {"a", "an", "the", "to", "is", "it", "i", "my", "and", "or", "of", "on", "in", "for", "not", "with", "me", "can", "be", "this", "that", "at"}
+
+similarity_lock = threading.RLock()
+signatures = {}  # ticket_id -> MinHash signature (open tickets only)
+buckets = {}  # (band, rows) -> set of ticket IDs
+started = False
+
+
+def shingles(title, description):
+    """Set of meaningful lower case words in the title and description"""
+    words = re.findall(r"[a-z0-9]+", f"{title} {description}".lower())
+    return {word for word in words if word not in STOP_WORDS}
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def word_hashes(word):
+    """All NUM_HASHES hashes of one word (ticket text reuses a small vocabulary, so these are cached)"""
+    h = zlib.crc32(word.encode("utf-8"))
+    return array("Q", [((a * h + b) % PRIME) & MAX_HASH for a, b in HASH_PARAMS])
+
+
+def signature(words):
+    """MinHash signature - for each hash function, the smallest hash of any word"""
+    if not words:
+        return None
+    return tuple(map(min, zip(*[word_hashes(word) for word in words])))
+
+
+def band_keys(sig):
+    """The LSH bucket keys for a signature, one per band"""
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity - the share of hash functions where both agree"""
+    return sum(map(eq, sig_a, sig_b)) / NUM_HASHES
+
+
+def is_open(ticket):
+    return ticket is not None and ticket["Status"] != "Closed"
+
+
+def remove(ticket_id):
+    """Drop a ticket from the index"""
+    sig = signatures.pop(ticket_id, None)
+    if sig is None:
+        return
+    for key in band_keys(sig):
+        bucket = buckets.get(key)
+        if bucket:
+            bucket.discard(ticket_id)
+            if not bucket:
+                del buckets[key]
+
+
+def add(ticket_id, ticket):
+    """Put an open ticket in the index"""
+    sig = signature(shingles(ticket["Title"], ticket["Description"]))
+    if sig is None:
+        return
+    signatures[ticket_id] = sig
+    for key in band_keys(sig):
+        buckets.setdefault(key, set()).add(ticket_id)
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - keeps the index to the open tickets' current text"""
+    if kind == "commented":
+        return  # comments don't change the title or description
+    with similarity_lock:
+        if is_open(before) and is_open(after) and (before["Title"], before["Description"]) == (after["Title"], after["Description"]):
+            return
+        remove(ticket_id)
+        if is_open(after):
+            add(ticket_id, after)
+
+
+def ensure_started():
+    """Index the open tickets and start following changes (first call only)"""
+    global started
+    if started:
+        return
+    store = helpdesk.get_tickets()
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, similarity_lock:
+        if started:
+            return
+        signatures.clear()
+        buckets.clear()
+        for ticket_id, ticket in store.items():
+            if is_open(ticket):
+                add(ticket_id, ticket)
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+
+
+def find_duplicates(title, description, exclude=None, limit=MAX_CANDIDATES):
+    """Open tickets that look like the same problem, as (ticket_id, similarity) best first"""
+    ensure_started()
+    with metrics.timer("helpdesk_duplicate_lookup_seconds"):
+        sig = signature(shingles(title, description))
+        if sig is None:
+            return []
+        with similarity_lock:
+            candidates = set()
+            for key in band_keys(sig):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(exclude)
+            scored = [(ticket_id, estimate_similarity(sig, signatures[ticket_id])) for ticket_id in candidates]
+    matches = [(ticket_id, score) for ticket_id, score in scored if score >= SIMILARITY_THRESHOLD and ticket_id in helpdesk.tickets]
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches[:limit]
+
+
+def cluster_open_tickets():
+    """Group the open backlog into clusters of likely duplicates (largest first)"""
+    ensure_started()
+    with similarity_lock:
+        parent = {ticket_id: ticket_id for ticket_id in signatures}
+
+        def find(ticket_id):
+            while parent[ticket_id] != ticket_id:
+                parent[ticket_id] = parent[parent[ticket_id]]
+                ticket_id = parent[ticket_id]
+            return ticket_id
+
+        # only tickets sharing a bucket are compared, and each one just with the clusters already
+        # found in that bucket (not every other member), so an outage's big bucket stays cheap
+        for bucket in buckets.values():
+            leaders = []
+            for ticket_id in sorted(bucket):
+                for leader in leaders:
+                    if estimate_similarity(signatures[leader], signatures[ticket_id]) >= SIMILARITY_THRESHOLD:
+                        root, other = find(leader), find(ticket_id)
+                        if root != other:
+                            parent[other] = root
+                        break
+                else:
+                    leaders.append(ticket_id)
+
+        clusters = {}
+        for ticket_id in signatures:
+            clusters.setdefault(find(ticket_id), []).append(ticket_id)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+
+
+def reset():
+    """Forget the index so the next call builds it again (used by tests)"""
+    global started
+    with helpdesk.store_lock, similarity_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        signatures.clear()
+        buckets.clear()
+        started = False
+
+
+# printing clusters of likely duplicate open tickets
+if __name__ == "__main__":
+    start = time.perf_counter()
+    clusters = cluster_open_tickets()
+    for ids in clusters:
+        lead = helpdesk.tickets[ids[0]]
+        print(f"{len(ids)} tickets like #{ids[0]} '{lead['Title']}': {', '.join(f'#{ticket_id}' for ticket_id in ids)}")
+    print(f"{len(clusters)} clusters from {len(signatures)} open tickets in {time.perf_counter() - start:.2f}s", file=sys.stderr)
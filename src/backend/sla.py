@@ -0,0 +1,223 @@
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from src.backend import helpdesk, metrics
+
+# SLA scheduler - keeps open tickets in a heap ordered by SLA deadline and fires when one is due
+# deadlines come from severity + submission time, so the heap is rebuilt from the tickets on start;
+# only "which tickets already fired" is saved, so a restart doesn't alert (or escalate) twice.
+# an open ticket fires at most once - closing (or deleting) it clears that
+#
+# ticket changes arrive through helpdesk.change_listeners, so nothing ever rescans the whole store
+#
+# only one process runs the scheduler for a data file (whichever holds sla_state.lock), so several web
+# workers and CLIs sharing the file alert once per breach - the others try to take over now and then
+
+SLA_HOURS = {"High": 4, "Medium": 24, "Low": 72}  # time allowed before a ticket counts as breached
+MAX_WAIT_SECONDS = 60  # CS - re-checking now and then copes with the system clock jumping
+AUTO_ESCALATE = os.environ.get("HELPDESK_SLA_ESCALATE") == "1"  # raise breached tickets to High severity
+TAKEOVER_SECONDS = 30  # how often a process without the scheduler checks whether the one running it has gone
+
+clock = time.time  # tests swap this for a fake clock (see start())
+
+condition = threading.Condition(threading.RLock())
+queue = []  # heap of (deadline, ticket_id)
+scheduled = {}  # ticket_id -> deadline of its live heap entry (older entries are skipped)
+fired = {}  # ticket_id -> deadline it fired at, saved to the state file
+breach_handlers = []  # handler(ticket, deadline) called when a ticket breaches its SLA
+worker = None
+running = False
+scheduler_lock = None  # open sla_state.lock while this process runs the scheduler
+next_takeover = 0  # time.monotonic() before which start() doesn't try the lock again
+
+
+def state_file():
+    """Where the fired deadlines are kept (next to the ticket data)"""
+    return helpdesk.DATA_FILE.with_name("sla_state.json")
+
+
+def lock_file():
+    """Held by the one process running the scheduler for the data file"""
+    return helpdesk.DATA_FILE.with_name("sla_state.lock")
+
+
+def deadline_for(ticket):
+    """Timestamp the ticket is due by, or None if it is closed or has no usable date"""
+    if ticket is None or ticket["Status"] == "Closed" or ticket["Severity"] not in SLA_HOURS:
+        return None
+    hours = SLA_HOURS[ticket["Severity"]]
+    submitted = helpdesk.parse_datetime(ticket["Submission DateTime"])
+    if submitted is None:
+        return None  # CS - rows with an unreadable date are left alone
+    return submitted.timestamp() + hours * 3600
+
+
+def schedule(ticket_id, ticket):
+    """Put a ticket in the queue at its current deadline (cheap no-op if it hasn't moved)"""
+    deadline = deadline_for(ticket)
+    with condition:
+        if deadline is None:
+            scheduled.pop(ticket_id, None)  # CS - the old heap entry is skipped when it comes up
+            forgotten = fired.pop(ticket_id, None) is not None
+        else:
+            forgotten = False
+            if ticket_id not in fired and scheduled.get(ticket_id) != deadline:
+                scheduled[ticket_id] = deadline
+                heapq.heappush(queue, (deadline, ticket_id))
+                condition.notify()  # waking the worker in case this is now the earliest deadline
+        metrics.set_gauge("helpdesk_sla_queue_size", len(scheduled))
+    if forgotten:
+        save_state()  # a closed or deleted ticket can breach again if it is ever reopened
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - keeps the queue in step with the ticket store"""
+    schedule(ticket_id, after)
+
+
+def load_state():
+    """Read the fired deadlines saved by an earlier run"""
+    try:
+        with open(state_file(), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {int(ticket_id): deadline for ticket_id, deadline in saved.get("fired", {}).items()}
+
+
+def save_state():
+    """Write the fired deadlines so a restart doesn't fire them again"""
+    with condition:
+        state = {"fired": {str(ticket_id): deadline for ticket_id, deadline in fired.items()}}
+    path = state_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with helpdesk.replacing_file(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def run_due(now=None):
+    """Fire every ticket whose deadline has passed, returning their IDs"""
+    now = clock() if now is None else now
+    due = []
+    with condition:
+        while queue and queue[0][0] <= now:
+            deadline, ticket_id = heapq.heappop(queue)
+            if scheduled.get(ticket_id) == deadline and ticket_id not in fired:
+                scheduled.pop(ticket_id)
+                fired[ticket_id] = deadline
+                due.append((ticket_id, deadline))
+        metrics.set_gauge("helpdesk_sla_queue_size", len(scheduled))
+
+    if not due:
+        return []
+    save_state()  # CS - saving before the handlers run so a crash can't make them fire twice
+
+    # handlers run without our lock held, as they may change the ticket (which calls back into schedule)
+    for ticket_id, deadline in due:
+        ticket = helpdesk.tickets.get(ticket_id)
+        if ticket is None:
+            continue
+        metrics.inc("helpdesk_sla_breaches_total", severity=ticket["Severity"])
+        for handler in breach_handlers:
+            try:
+                handler(ticket, deadline)
+            except Exception as e:
+                helpdesk.log_error(f"SLA handler failed for ticket {ticket_id}: {e}")
+    return [ticket_id for ticket_id, _ in due]
+
+
+def log_breach(ticket, deadline):
+    """Default handler - records the breach in the log"""
+    due = datetime.fromtimestamp(deadline).strftime(helpdesk.DATETIME_FORMAT)
+    helpdesk.log_error(f"Ticket {ticket['ID']} ({ticket['Severity']}) breached its SLA - was due {due}")
+
+
+def escalate_breach(ticket, deadline):
+    """Optional handler - raises a breached ticket to High severity, like a manual escalation"""
+    if ticket["Severity"] == "High":
+        return
+    try:
+        helpdesk.update_ticket_fields(helpdesk.tickets, ticket["ID"], {"Severity": "High"}, ticket["Version"])
+    except (helpdesk.VersionConflict, helpdesk.TicketNotFound):
+        return  # CS - someone changed or deleted it first, their edit wins
+    helpdesk.save_tickets(helpdesk.tickets)
+    helpdesk.log_error(f"Ticket {ticket['ID']} escalated to High severity after breaching its SLA")
+
+
+def run_worker():
+    """Background thread - sleeps until the earliest deadline, then fires it"""
+    while True:
+        helpdesk.sync_store()  # CS - tickets other processes added, changed or closed reach the queue through the listener
+        with condition:
+            if not running:
+                return
+            delay = queue[0][0] - clock() if queue else MAX_WAIT_SECONDS
+            if delay > 0:
+                condition.wait(min(delay, MAX_WAIT_SECONDS))
+                continue
+        run_due()
+
+
+def start(clock_func=None, background=True):
+    """Build the queue from the ticket store and start firing deadlines, unless another process already does
+    (safe to call more than once, returns whether this process runs the scheduler)"""
+    global clock, worker, running, scheduler_lock, next_takeover
+    store = helpdesk.get_tickets()
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, condition:
+        if running:
+            return True
+        if time.monotonic() < next_takeover:
+            return False
+        scheduler_lock = helpdesk.open_lock_file(lock_file(), blocking=False)
+        if scheduler_lock is None:
+            next_takeover = time.monotonic() + TAKEOVER_SECONDS
+            return False
+        clock = clock_func or time.time
+        entries = [(deadline_for(ticket), ticket_id) for ticket_id, ticket in store.items()]
+        helpdesk.change_listeners.append(on_ticket_change)
+
+        open_ids = {ticket_id for deadline, ticket_id in entries if deadline is not None}
+        fired.clear()
+        fired.update((ticket_id, deadline) for ticket_id, deadline in load_state().items() if ticket_id in open_ids)
+
+        queue[:] = [entry for entry in entries if entry[0] is not None and entry[1] not in fired]
+        heapq.heapify(queue)  # O(n) once at start up, O(log n) per change after that
+        scheduled.clear()
+        scheduled.update((ticket_id, deadline) for deadline, ticket_id in queue)
+        if log_breach not in breach_handlers:
+            breach_handlers.insert(0, log_breach)
+        if AUTO_ESCALATE and escalate_breach not in breach_handlers:
+            breach_handlers.append(escalate_breach)
+        running = True
+        metrics.set_gauge("helpdesk_sla_queue_size", len(scheduled))
+
+        if background:
+            worker = threading.Thread(target=run_worker, name="helpdesk-sla", daemon=True)
+            worker.start()
+    return True
+
+
+def stop():
+    """Stop the background thread and stop following ticket changes"""
+    global worker, running, scheduler_lock, next_takeover
+    with condition:
+        running = False
+        condition.notify()
+    if worker:
+        worker.join()
+        worker = None
+    with helpdesk.store_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+    with condition:
+        queue.clear()  # CS - rebuilt by start(), a stopped scheduler never fires
+        scheduled.clear()
+        if scheduler_lock is not None:
+            scheduler_lock.close()  # CS - lets another process take over
+            scheduler_lock = None
+        next_takeover = 0
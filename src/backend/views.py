@@ -0,0 +1,307 @@
+import json
+import shlex
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from src.backend import helpdesk, shards
+
+# ticket filters and saved views for the /tickets page
+#
+# a query is a list of filters, all of which must match, e.g.
+#   status:open severity:high,medium assignee:"Olivia Davis" since:2026-01-01 until:2026-01-31 vpn
+# (words without a filter name are searched for in the title and description)
+#
+# status, severity, assignee and category have in-memory indexes kept up to date from change_listeners,
+# so a query starts from the smallest matching index set and only checks dates and words on those tickets
+# saved views that are opened often are materialised - their results are kept and updated on every change,
+# so opening one costs the size of its result, not of the store
+#
+# views.json is shared by every process using the data file (e.g. gunicorn workers) - each one reloads it
+# when another has saved it, and changes it under a file lock so no process saves over another's view
+
+INDEXED_FIELDS = {"status": "Status", "severity": "Severity", "assignee": "Assignee", "category": "Category"}
+DATE_FILTERS = ["since", "until"]
+MATERIALISE_AFTER = 3  # opens before a saved view's results are kept
+MAX_MATERIALISED = 20  # CS - every kept view is checked on every change, so only the busiest are kept
+
+views_lock = threading.RLock()
+indexes = {field: {} for field in INDEXED_FIELDS.values()}  # field -> lower case value -> set of ticket IDs
+saved_views = {}  # name -> {"query": text, "uses": times opened}
+materialised = {}  # name -> (compiled query, set of matching ticket IDs)
+views_signature = None  # views.json as this process last read or wrote it (see helpdesk.path_signature)
+started = False
+
+
+def views_file():
+    return helpdesk.DATA_FILE.with_name("views.json")
+
+
+def lock_file():
+    return helpdesk.DATA_FILE.with_name("views.json.lock")
+
+
+def parse_date(name, value):
+    """A since/until date (a date alone means the start of that day for since, the end of it for until)"""
+    moment = helpdesk.parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"has an invalid {name} date '{value}'")
+    if name == "until" and len(value.strip()) <= 10:
+        moment += timedelta(days=1, microseconds=-1)
+    return moment
+
+
+def compile_query(text):
+    """Turn query text into filters (ValueError if a filter name or value isn't allowed)"""
+    try:
+        tokens = shlex.split(text or "")
+    except ValueError:
+        raise ValueError("has an unmatched quote") from None
+
+    terms, words, dates = {}, [], {}
+    for token in tokens:
+        name, sep, value = token.partition(":")
+        name = name.lower()
+        if not sep or not name.isalpha():
+            words.append(token.lower())  # CS - e.g. "error:404" is searched for as text
+            continue
+        if name in DATE_FILTERS:
+            dates[name] = parse_date(name, value)
+            continue
+        if name not in INDEXED_FIELDS:
+            raise ValueError(f"has an unknown filter '{name}' (use {', '.join([*INDEXED_FIELDS, *DATE_FILTERS])})")
+
+        field = INDEXED_FIELDS[name]
+        values = set()
+        for item in filter(None, (item.strip() for item in value.split(","))):
+            if field in ("Status", "Severity"):
+                item = helpdesk.normalise_fields({field: item})[field]
+            elif field == "Category" and item.title() not in helpdesk.CATEGORIES:
+                raise ValueError(f"has invalid category '{item}'")
+            values.add(item.lower())
+        if not values:
+            raise ValueError(f"has no value for '{name}'")
+        terms[field] = terms[field] & values if field in terms else values  # CS - repeating a filter narrows it
+
+    return {"text": text or "", "terms": terms, "since": dates.get("since"), "until": dates.get("until"), "words": words}
+
+
+def matches(query, ticket):
+    """Whether a ticket passes every filter in a compiled query"""
+    for field, values in query["terms"].items():
+        if str(ticket.get(field, "")).lower() not in values:
+            return False
+    if (query["since"] or query["until"]) and not helpdesk.ticket_matches(ticket, {}, query["since"], query["until"]):
+        return False
+    if query["words"]:
+        text = f"{ticket.get('Title', '')} {ticket.get('Description', '')}".lower()
+        return all(word in text for word in query["words"])
+    return True
+
+
+def plan(query):
+    """The index sets a query starts from, smallest first, as (field, ticket IDs)"""
+    steps = []
+    for field, values in query["terms"].items():
+        index = indexes[field]
+        ids = set().union(*(index.get(value, ()) for value in values))
+        steps.append((field, ids))
+    steps.sort(key=lambda step: len(step[1]))
+    return steps
+
+
+def explain(query):
+    """The plan in words, e.g. 'Severity index (12) > Status index (340) > check dates, words'"""
+    with views_lock:
+        steps = [f"{field} index ({len(ids)})" for field, ids in plan(query)]
+    checks = [name for name in ("since", "until") if query[name]] + (["words"] if query["words"] else [])
+    if not steps:
+        steps = ["scan matching shards" if shards.started and (query["since"] or query["until"]) else "scan all tickets"]
+    return " > ".join(steps + ([f"check {', '.join(checks)}"] if checks else []))
+
+
+def run(query, tickets):
+    """Tickets matching a compiled query, by ID"""
+    ensure_started()
+    with helpdesk.store_lock, views_lock:
+        steps = plan(query)
+        if steps:
+            ids = set(steps[0][1])
+            for _, other in steps[1:]:
+                ids &= other  # CS - intersecting from the smallest set keeps each step short
+            candidates = [tickets[ticket_id] for ticket_id in ids if ticket_id in tickets]
+        elif query["since"] or query["until"]:
+            candidates = helpdesk.find_tickets(tickets, {}, query["since"], query["until"])  # a sharded store skips other months
+        else:
+            candidates = helpdesk.snapshot_tickets(tickets)
+        found = [ticket for ticket in candidates if matches(query, ticket)]
+    found.sort(key=lambda ticket: ticket["ID"])
+    return found
+
+
+def search(text, tickets=None):
+    """Tickets matching query text"""
+    return run(compile_query(text), helpdesk.tickets if tickets is None else tickets)
+
+
+def index_ticket(ticket_id, ticket, sign):
+    """Add a ticket to (sign=1) or remove it from (sign=-1) the field indexes"""
+    for field, index in indexes.items():
+        value = str(ticket.get(field, "")).lower()
+        if sign > 0:
+            index.setdefault(value, set()).add(ticket_id)
+        elif value in index:
+            index[value].discard(ticket_id)
+            if not index[value]:
+                del index[value]
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - keeping the indexes and materialised views up to date"""
+    if kind == "commented":
+        return  # comments aren't filtered on
+    with views_lock:
+        if before:
+            index_ticket(ticket_id, before, -1)
+        if after:
+            index_ticket(ticket_id, after, 1)
+        for query, ids in materialised.values():
+            if after and matches(query, after):
+                ids.add(ticket_id)
+            else:
+                ids.discard(ticket_id)
+
+
+def load_views():
+    try:
+        with open(views_file(), encoding="utf-8") as f:
+            saved = json.load(f).get("views", {})
+    except (OSError, ValueError):
+        saved = {}
+    saved_views.clear()
+    saved_views.update(saved)
+
+
+def save_views():
+    global views_signature
+    with views_lock:
+        state = {"views": dict(saved_views)}
+        path = views_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with helpdesk.replacing_file(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        views_signature = helpdesk.path_signature(path)
+
+
+def sync_views():
+    """Reload the saved views if another process saved them since this one read them (call under views_lock)"""
+    global views_signature
+    signature = helpdesk.path_signature(views_file())
+    if signature == views_signature:
+        return
+    queries = {name: view["query"] for name, view in saved_views.items()}
+    views_signature = signature  # CS - taken before reading, a save in between just means one more reload
+    load_views()
+    for name in list(materialised):
+        if saved_views.get(name, {}).get("query") != queries.get(name):
+            del materialised[name]  # deleted or changed by the other process
+
+
+@contextmanager
+def views_transaction():
+    """Change the saved views with no other process saving them in between, saving on the way out"""
+    with helpdesk.file_lock(lock_file()), views_lock:
+        sync_views()
+        yield
+        save_views()
+
+
+def ensure_started():
+    """Index the store, load the saved views and start following changes (first call only)"""
+    global started
+    if started:
+        return
+    store = helpdesk.get_tickets()
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, views_lock:
+        if started:
+            return
+        for index in indexes.values():
+            index.clear()
+        for ticket_id, ticket in store.items():
+            index_ticket(ticket_id, ticket, 1)
+        materialised.clear()
+        sync_views()
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+
+
+def get_views():
+    """Saved views as (name, query text), by name"""
+    ensure_started()
+    with views_lock:
+        sync_views()
+        return sorted((name, view["query"]) for name, view in saved_views.items())
+
+
+def save_view(name, text):
+    """Save (or replace) a view, checking its query first"""
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("needs a name")
+    compile_query(text)
+    ensure_started()
+    with views_transaction():
+        saved_views[name] = {"query": text.strip(), "uses": 0}
+        materialised.pop(name, None)
+
+
+def delete_view(name):
+    """Remove a saved view (False if there was no such view)"""
+    ensure_started()
+    with views_transaction():
+        if saved_views.pop(name, None) is None:
+            return False
+        materialised.pop(name, None)
+    return True
+
+
+def open_view(name, tickets=None):
+    """Tickets in a saved view - from its kept results once it is used often (KeyError if there is no such view)"""
+    ensure_started()
+    tickets = helpdesk.tickets if tickets is None else tickets
+    with helpdesk.store_lock, views_lock:
+        sync_views()
+        view = saved_views[name]
+        view["uses"] += 1
+        if name in materialised:
+            ids = materialised[name][1]
+            return sorted((tickets[ticket_id] for ticket_id in ids if ticket_id in tickets), key=lambda ticket: ticket["ID"])
+
+        query = compile_query(view["query"])
+        found = run(query, tickets)
+        if view["uses"] >= MATERIALISE_AFTER and len(materialised) < MAX_MATERIALISED:
+            materialised[name] = (query, {ticket["ID"] for ticket in found})
+            keep = True
+        else:
+            keep = False
+        uses = view["uses"]
+    if keep:
+        with views_transaction():  # CS - remembering the use count, so a restart keeps the busy views
+            if name in saved_views:
+                saved_views[name]["uses"] = max(saved_views[name]["uses"], uses)
+    return found
+
+
+def reset():
+    """Forget the indexes and views so the next call builds them again (used by tests)"""
+    global started, views_signature
+    with helpdesk.store_lock, views_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        for index in indexes.values():
+            index.clear()
+        saved_views.clear()
+        materialised.clear()
+        views_signature = None
+        started = False
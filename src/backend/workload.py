@@ -0,0 +1,223 @@
+import heapq
+import json
+import threading
+from contextlib import contextmanager
+
+from src.backend import helpdesk
+
+# assignee workload - live open-ticket load per assignee (weighted by severity), kept in heaps so
+# the least loaded agent for a category is found in O(log n) instead of counting every ticket
+#
+# the roster (who can be assigned, and optionally which categories they take) lives in
+# assignees.json next to the ticket data and can be changed while the app is running - every process
+# using the data file (e.g. gunicorn workers) reloads it when another has saved it, and changes it under
+# a file lock so no process saves over another's change
+
+SEVERITY_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+ALL_CATEGORIES = "*"  # heap holding everyone on the roster, for tickets of any category
+AUTO_ASSIGN = "auto"  # form value meaning "pick the least loaded agent"
+
+workload_lock = threading.RLock()
+roster = {}  # name -> categories they take ([] = all of them)
+loads = {}  # assignee -> weighted open tickets (for everyone, on the roster or not)
+heaps = {}  # category -> heap of (load, name), stale entries are skipped when they reach the top
+roster_signature = None  # assignees.json as this process last read or wrote it (see helpdesk.path_signature)
+started = False
+
+
+def roster_file():
+    """Where the roster is kept (next to the ticket data)"""
+    return helpdesk.DATA_FILE.with_name("assignees.json")
+
+
+def lock_file():
+    return helpdesk.DATA_FILE.with_name("assignees.json.lock")
+
+
+def ticket_load(ticket):
+    """How much an open ticket adds to its assignee's load"""
+    if ticket is None or ticket["Status"] == "Closed":
+        return 0
+    return SEVERITY_WEIGHTS.get(ticket["Severity"], 1)
+
+
+def load_roster():
+    """Read the roster file (an empty roster if there is none yet)"""
+    try:
+        with open(roster_file(), encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {entry["Name"]: list(entry.get("Categories", [])) for entry in entries if entry.get("Name")}
+
+
+def save_roster():
+    """Write the roster back to its file"""
+    global roster_signature
+    with workload_lock:
+        entries = [{"Name": name, "Categories": categories} for name, categories in roster.items()]
+        path = roster_file()
+        with helpdesk.replacing_file(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        roster_signature = helpdesk.path_signature(path)
+
+
+def sync_roster():
+    """Reload the roster if another process saved it since this one read it (call under workload_lock)"""
+    global roster_signature
+    signature = helpdesk.path_signature(roster_file())
+    if signature == roster_signature:
+        return
+    roster_signature = signature  # CS - taken before reading, a save in between just means one more reload
+    roster.clear()
+    roster.update(load_roster())
+    for category in [ALL_CATEGORIES] + helpdesk.CATEGORIES:
+        rebuild_heap(category)
+
+
+@contextmanager
+def roster_transaction():
+    """Change the roster with no other process saving it in between, saving on the way out"""
+    with helpdesk.file_lock(lock_file()), workload_lock:
+        sync_roster()
+        yield
+        save_roster()
+
+
+def push(name):
+    """Add an entry for name at its current load to every heap it belongs to"""
+    for category in [ALL_CATEGORIES] + (roster[name] or helpdesk.CATEGORIES):
+        heap = heaps.setdefault(category, [])
+        heapq.heappush(heap, (loads.get(name, 0), name))
+        if len(heap) > 2 * len(roster) + 16:
+            rebuild_heap(category)  # CS - stops stale entries piling up on a busy server
+
+
+def rebuild_heap(category):
+    """Replace a heap with one fresh entry per eligible agent"""
+    heap = [(loads.get(name, 0), name) for name in roster if is_eligible(name, category)]
+    heapq.heapify(heap)
+    heaps[category] = heap
+
+
+def is_eligible(name, category):
+    """Whether name is on the roster and takes this category"""
+    return name in roster and (category == ALL_CATEGORIES or not roster[name] or category in roster[name])
+
+
+def is_current(entry, category):
+    """Whether a heap entry still matches the agent's real load and roster membership"""
+    load, name = entry
+    return is_eligible(name, category) and loads.get(name, 0) == load
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - moving load between assignees as tickets change"""
+    changed = {}
+    for ticket, sign in ((before, -1), (after, 1)):
+        weight = ticket_load(ticket)
+        if weight:
+            changed[ticket["Assignee"]] = changed.get(ticket["Assignee"], 0) + sign * weight
+    with workload_lock:
+        for name, delta in changed.items():
+            if delta:
+                loads[name] = loads.get(name, 0) + delta
+                if name in roster:
+                    push(name)
+
+
+def ensure_started():
+    """Count the current load and start following changes (first call only)"""
+    global started
+    if started:
+        return
+    store = helpdesk.get_tickets()
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, workload_lock:
+        if started:
+            return
+        loads.clear()
+        for ticket in store.values():
+            weight = ticket_load(ticket)
+            if weight:
+                loads[ticket["Assignee"]] = loads.get(ticket["Assignee"], 0) + weight
+        sync_roster()
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+
+
+def get_roster():
+    """Names of everyone who can be assigned tickets"""
+    ensure_started()
+    with workload_lock:
+        sync_roster()
+        return list(roster)
+
+
+def get_workload():
+    """Roster entries with each agent's categories and current weighted load"""
+    ensure_started()
+    with workload_lock:
+        sync_roster()
+        return [{"Name": name, "Categories": list(categories), "Load": loads.get(name, 0)} for name, categories in roster.items()]
+
+
+def set_assignee(name, categories=()):
+    """Add someone to the roster (or change their categories) and save it"""
+    name = name.strip()
+    if not name:
+        raise ValueError("assignee name is required")
+    unknown = [category for category in categories if category not in helpdesk.CATEGORIES]
+    if unknown:
+        raise ValueError(f"has invalid categories {unknown}")
+    ensure_started()
+    with roster_transaction():
+        roster[name] = list(categories)
+        for category in [ALL_CATEGORIES] + helpdesk.CATEGORIES:
+            rebuild_heap(category)  # CS - their categories may have changed, so start clean
+
+
+def remove_assignee(name):
+    """Take someone off the roster (their tickets keep them as assignee) and save it"""
+    ensure_started()
+    with roster_transaction():
+        if roster.pop(name, None) is None:
+            return False
+        # their old heap entries are skipped as they are no longer on the roster
+    return True
+
+
+def pick_assignee(category=None, exclude=()):
+    """The least loaded agent who takes this category (None if nobody does)"""
+    ensure_started()
+    category = category if category in helpdesk.CATEGORIES else ALL_CATEGORIES
+    with workload_lock:
+        sync_roster()
+        heap = heaps.get(category, [])
+        skipped = []
+        picked = None
+        while heap:
+            entry = heap[0]
+            if not is_current(entry, category):
+                heapq.heappop(heap)  # stale - the agent's load moved or they left the roster
+            elif entry[1] in exclude:
+                skipped.append(heapq.heappop(heap))
+            else:
+                picked = entry[1]
+                break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return picked
+
+
+def reset():
+    """Forget all state so the next call starts again (used by tests)"""
+    global started, roster_signature
+    with helpdesk.store_lock, workload_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        roster.clear()
+        loads.clear()
+        heaps.clear()
+        roster_signature = None
+        started = False
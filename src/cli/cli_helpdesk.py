@@ -1,78 +1,61 @@
 import sys
 import os
-import csv
 from datetime import datetime
-import openai  # using OpenAI to suggest ticket categories and severity
-from dotenv import load_dotenv
-import ast
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# build absolute path to project root
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-CSV_FILE = os.path.join(BASE_DIR, "data", "helpdesk.csv")
+from src.backend import archive, similarity, sla, workload
+from src.backend.helpdesk import (
+    tickets, get_tickets, sync_store, save_tickets, create_ticket, update_ticket_fields, add_ticket_comment,
+    delete_ticket_record, make_comment, TicketNotFound, CATEGORIES, SEVERITIES, DATETIME_FORMAT
+)
 
-# tickets dictionary (loaded from csv at startup)
-tickets = {}
+# tickets dictionary - the shared store from the backend engine (loaded from csv at startup)
 
-load_dotenv()  # loads .env from project root
-# set up OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# openai and dotenv are only imported when first needed, so importing this module stays fast
+settings_loaded = False
+openai_client = None  # (api key, base url, client) - one client, so its connections are reused between calls
 
-# warning if the key isn’t set
-if not openai.api_key:
-    print("warning: OPENAI_API_KEY not set. AI suggestions will default to 'Software' category and 'Low' severity.")
+def load_settings():
+    """loading .env from project root once (python-dotenv is optional)"""
+    global settings_loaded
+    if settings_loaded:
+        return
+    settings_loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return  # fall back to real environment variables
+    load_dotenv()
 
-# defining available categories and severities
-CATEGORIES = ["Hardware", "Software", "Network", "Security"]
-SEVERITIES = ["Low", "Medium", "High"]
+def get_openai():
+    """importing and setting up the openai client only when an api key is configured"""
+    global openai_client
+    load_settings()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    base_url = os.getenv("OPENAI_BASE_URL")  # optional - another endpoint, e.g. a proxy or the load test's fake
+    if openai_client is None or openai_client[:2] != (api_key, base_url):
+        from openai import OpenAI  # using OpenAI to suggest ticket categories and severity
+        openai_client = (api_key, base_url, OpenAI(api_key=api_key, base_url=base_url))
+    return openai_client[2]
 
-# csv load + save functions
+# csv load + save functions (the backend engine does the real work)
 def load_tickets_from_csv():
     """loading tickets from csv at app start up"""
-    global tickets
-    if not os.path.exists(CSV_FILE):
-        return
-    with open(CSV_FILE, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                ticket_id = int(row["ID"])
-            except ValueError:
-                continue  # skip rows with invalid ID
-            # safely parse comments from csv string to list
-            comments = ast.literal_eval(row["Comments"]) if row.get("Comments") else []  # eval converts string to actual list
-            # handle old csv files that might have separate date and time columns
-            submission_dt = row.get("Submission DateTime") or f"{row.get('Submission Date', '')} {row.get('Submission Time', '')}".strip()
-
-            tickets[ticket_id] = {
-                "ID": ticket_id,
-                "Title": row["Title"],
-                "Description": row["Description"],
-                "Assignee": row.get("Assignee", ""),  # default empty string if missing
-                "Severity": row.get("Severity", "Low"),  # default low severity
-                "Status": row.get("Status", "Open"),  # default status open
-                "Category": row.get("Category", "Software"),  # default software
-                "Submission DateTime": submission_dt,
-                "Comments": comments  # store as list
-            }
+    get_tickets()
 
 def save_tickets_to_csv():
     """saving tickets dictionary to csv file"""
-    with open(CSV_FILE, "w", newline="") as f:
-        fieldnames = ["ID", "Title", "Description", "Assignee", "Severity", "Status", "Category", "Submission DateTime", "Comments"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for t in tickets.values():
-            row = t.copy()
-            row["Comments"] = str(row.get("Comments", []))  # convert comments list back to string for csv
-            writer.writerow(row)
+    save_tickets(tickets)
     print("tickets saved to csv.")  # tells user that changes are saved
 
 # ai category and severity function
 def ai_suggest_category_severity(title, description):
     """getting ai suggestion for ticket category and severity, suppressing errors"""
-    if not openai.api_key:
+    client = get_openai()
+    if not client:
         return "Software", "Low"  # default if no api key
     prompt = f"""
     suggest the most appropriate category and severity for a helpdesk ticket.
@@ -84,7 +67,7 @@ def ai_suggest_category_severity(title, description):
     example: Software, High
     """
     try:
-        response = openai.ChatCompletion.create(
+        response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0
@@ -98,30 +81,47 @@ def ai_suggest_category_severity(title, description):
         # silently suppress AI errors
         return "Software", "Low"  # fallback if api fails
 
+# duplicate check function
+def check_duplicates(title, description):
+    """showing open tickets that look like this one, returning False if the user would rather stop"""
+    duplicates = [(tickets[ticket_id], score) for ticket_id, score in similarity.find_duplicates(title, description) if ticket_id in tickets]
+    if not duplicates:
+        return True
+    print("possible duplicates of open tickets:")
+    for t, score in duplicates:
+        print(f"  {t['ID']}: {t['Title']} - {t['Status']}, {t['Assignee']} ({score:.0%} similar)")
+    return input("add this ticket anyway? (y/n): ").strip().lower() == "y"
+
 # add ticket function
 def add_ticket_ai():
     """getting ticket info from user, getting ai suggestions, saving ticket and csv"""
     title = input("enter ticket title: ").strip()
     description = input("enter ticket description: ").strip()
+    if not check_duplicates(title, description):
+        print("ticket not added.")
+        return
     suggested_category, suggested_severity = ai_suggest_category_severity(title, description)
     print(f"ai suggests category: {suggested_category}, severity: {suggested_severity}")
     category = input(f"enter category or press enter to accept [{suggested_category}]: ").strip() or suggested_category
     severity = input(f"enter severity or press enter to accept [{suggested_severity}]: ").strip() or suggested_severity
-    assignee = input("enter assignee (optional): ").strip()
-    new_id = max(tickets.keys()) + 1 if tickets else 100
-    tickets[new_id] = {
-        "ID": new_id,
-        "Title": title,
-        "Description": description,
-        "Assignee": assignee,
-        "Severity": severity,
-        "Status": "Open",
-        "Category": category,
-        "Submission DateTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # record current date/time
-        "Comments": []
-    }
+    roster = ", ".join(workload.get_roster())
+    # blank picks whoever on the roster has the lightest load for this category
+    assignee = input(f"enter assignee ({roster}) or press enter to auto-assign: ").strip() or workload.pick_assignee(category) or "Unassigned"
+    try:
+        ticket = create_ticket(tickets, {
+            "Title": title,
+            "Description": description,
+            "Assignee": assignee,
+            "Severity": severity,
+            "Status": "Open",
+            "Category": category,
+            "Submission DateTime": datetime.now().strftime(DATETIME_FORMAT),  # record current date/time
+        })
+    except ValueError as e:
+        print(f"ticket {e}.")
+        return
     save_tickets_to_csv()
-    print(f"ticket {new_id} added successfully!")
+    print(f"ticket {ticket['ID']} added successfully!")
 
 # update ticket function
 def update_ticket_ai(tickets):
@@ -139,7 +139,14 @@ def update_ticket_ai(tickets):
         category = input(f"enter category or press enter to accept [{suggested_category}]: ").strip() or suggested_category
         severity = input(f"enter severity or press enter to accept [{suggested_severity}]: ").strip() or suggested_severity
         assignee = input(f"enter assignee or press enter to keep current [{tickets[ticket_id]['Assignee']}]: ").strip() or tickets[ticket_id]['Assignee']
-        tickets[ticket_id].update({"Title": title, "Description": description, "Category": category, "Severity": severity, "Assignee": assignee})
+        try:
+            update_ticket_fields(tickets, ticket_id, {"Title": title, "Description": description, "Category": category, "Severity": severity, "Assignee": assignee})
+        except TicketNotFound:
+            print("ticket id not found.")  # CS - deleted somewhere else while we were asking
+            return
+        except ValueError as e:
+            print(f"ticket {e}.")
+            return
         save_tickets_to_csv()
         print(f"ticket {ticket_id} updated successfully!")
     else:
@@ -153,12 +160,13 @@ def close_ticket(tickets):
     except ValueError:
         print("please enter a valid number")
         return
-    if ticket_id in tickets:
-        tickets[ticket_id]['Status'] = 'Closed'
-        save_tickets_to_csv()
-        print(f"ticket {ticket_id} closed.")
-    else:
+    try:
+        update_ticket_fields(tickets, ticket_id, {"Status": "Closed"})
+    except TicketNotFound:
         print("ticket id not found.")
+        return
+    save_tickets_to_csv()
+    print(f"ticket {ticket_id} closed.")
 
 # escalate ticket function
 def escalate_ticket_ai(tickets):
@@ -173,7 +181,11 @@ def escalate_ticket_ai(tickets):
         description = tickets[ticket_id]["Description"]
         _, suggested_severity = ai_suggest_category_severity(title, description)
         if suggested_severity == "High":
-            tickets[ticket_id]['Severity'] = "High"
+            try:
+                update_ticket_fields(tickets, ticket_id, {"Severity": "High"})
+            except TicketNotFound:
+                print("ticket id not found.")  # CS - deleted somewhere else while the ai was answering
+                return
             save_tickets_to_csv()
             print(f"ticket {ticket_id} escalated to high severity by ai.")
         else:
@@ -192,13 +204,11 @@ def comment_ticket(tickets):
     if ticket_id in tickets:
         author = input("enter your name: ").strip()
         comment = input("enter comment: ").strip()
-        now = datetime.now()
-        tickets[ticket_id]['Comments'].append({
-            "Author": author,
-            "Date": now.strftime("%Y-%m-%d"),  # record date
-            "Time": now.strftime("%H:%M:%S"),  # record time
-            "Content": comment
-        })
+        try:
+            add_ticket_comment(tickets, ticket_id, make_comment(author, comment))
+        except TicketNotFound:
+            print("ticket id not found.")  # CS - deleted somewhere else while we were asking
+            return
         save_tickets_to_csv()
         print(f"comment added to ticket {ticket_id}.")
     else:
@@ -212,19 +222,29 @@ def delete_ticket_with_input(tickets):
     except ValueError:
         print("please enter a valid number")
         return
-    if ticket_id in tickets:
-        del tickets[ticket_id]
-        save_tickets_to_csv()
-        print(f"ticket {ticket_id} deleted successfully!")
-    else:
+    try:
+        delete_ticket_record(tickets, ticket_id)
+    except TicketNotFound:
         print("ticket id not found.")
+        return
+    save_tickets_to_csv()
+    print(f"ticket {ticket_id} deleted successfully!")
 
 # auto escalate function
+# the sla scheduler queues tickets as their deadline passes, so nothing rescans every ticket here
+sla_alerts = []
+
+def queue_sla_alert(ticket, deadline):
+    """keeping breached tickets until the menu can show them (printing mid-input would garble the prompt)"""
+    sla_alerts.append(ticket["ID"])
+
 def auto_escalate_high_severity():
-    """automatically escalate any open high severity tickets"""
-    for t in tickets.values():
-        if t['Severity'] == "High" and t['Status'] != "Closed":
-            print(f"ticket {t['ID']} is high severity and open! automatically suggesting escalation.")  # alerts user
+    """showing tickets that breached their sla since the last check"""
+    while sla_alerts:
+        ticket_id = sla_alerts.pop(0)
+        t = tickets.get(ticket_id)
+        if t and t['Status'] != "Closed":
+            print(f"ticket {t['ID']} ({t['Severity'].lower()} severity) is past its sla! suggesting escalation.")  # alerts user
 
 # menu display + loop
 def show_menu():
@@ -258,8 +278,8 @@ def view_ticket_details_with_alerts(ticket_dict):
     except ValueError:
         print("please enter a valid number")
         return
-    if ticket_id in ticket_dict:
-        t = ticket_dict[ticket_id]
+    t = ticket_dict.get(ticket_id) or archive.get_archived_ticket(ticket_id)  # old closed tickets live in the archive
+    if t:
         print(f"\n--- ticket {ticket_id} details ---")
         print(f"title       : {t['Title']}")
         print(f"description : {t['Description']}")
@@ -280,8 +300,16 @@ def view_ticket_details_with_alerts(ticket_dict):
 
 def main_menu():
     """showing menu repeatedly until exit"""
+    load_settings()
+    # warning if the key isn’t set
+    if not os.getenv("OPENAI_API_KEY"):
+        print("warning: OPENAI_API_KEY not set. AI suggestions will default to 'Software' category and 'Low' severity.")
     load_tickets_from_csv()  # load tickets at startup
+    sla.breach_handlers.append(queue_sla_alert)
+    if not sla.start():  # firing sla alerts in the background
+        print("sla alerts are shown by another helpdesk process using the same data file.")
     while True:
+        sync_store()  # picking up tickets saved by the web app or another cli since
         show_menu()
         choice = input("select an option (1-9): ").strip()
         if choice == "1":
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from urllib.parse import parse_qs
+
+from src.web.web_app import app, ensure_store_loaded
+from src.backend import changes
+from src.backend.helpdesk import change_listeners, store_lock
+
+# async serving mode - the same Flask routes and templates behind an ASGI server
+# page requests run on a thread pool so the event loop never blocks on templates or save_tickets,
+# while /events and /changes/stream connections are plain coroutines, so thousands of idle clients don't need a thread each
+#
+# run with: uvicorn src.web.asgi_app:asgi_app --port 5050
+
+THREADS = int(os.environ.get("HELPDESK_ASGI_THREADS", "32"))
+KEEPALIVE_SECONDS = 15  # comment line sent to idle /events clients so proxies keep the connection open
+EVENT_QUEUE_SIZE = 100  # CS - a client that stops reading can't make the server hold unlimited events
+
+# (event loop, queue) for every open /events connection
+subscribers = set()
+listener_lock = threading.Lock()
+started = False
+
+executor = None  # thread pool for page requests, made at lifespan startup (or by the first request if the server skips it)
+executor_lock = threading.Lock()
+
+
+def put_event(queue, message):
+    """Queue an event for one client, dropping it if that client has fallen too far behind"""
+    if not queue.full():
+        queue.put_nowait(message)
+
+
+def broadcast_change(kind, ticket_id, before, after):
+    """Send a ticket change to every /events client (runs in whichever thread made the change)"""
+    if not subscribers:
+        return
+    ticket = after or before
+    message = json.dumps({"kind": kind, "ticket_id": ticket_id, "version": ticket.get("Version")})
+    for loop, queue in list(subscribers):
+        loop.call_soon_threadsafe(put_event, queue, message)
+
+
+def ensure_started():
+    """Send ticket changes to /events clients (first call only - on lifespan startup, or the first client if the server skips lifespan)"""
+    global started
+    if started:
+        return
+    # CS - store lock before ours, the same order the change listener takes them in
+    with store_lock, listener_lock:
+        if started:
+            return
+        change_listeners.append(broadcast_change)
+        started = True
+
+
+def get_executor():
+    """The thread pool for page requests - a new one after a shutdown, so the app can be started again in the same process"""
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="helpdesk-asgi")
+        return executor
+
+
+def shutdown_executor():
+    """Let in-flight requests finish their saves and close the pool"""
+    global executor
+    with executor_lock:
+        pool, executor = executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def reset():
+    """Stop following ticket changes (used by tests)"""
+    global started
+    with store_lock, listener_lock:
+        if broadcast_change in change_listeners:
+            change_listeners.remove(broadcast_change)
+        started = False
+
+
+def build_environ(scope, body):
+    """Turn an ASGI http scope and request body into a WSGI environ for Flask"""
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),  # CS - PEP 3333, raw bytes as latin-1
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "SERVER_NAME": scope["server"][0] if scope.get("server") else "localhost",
+        "SERVER_PORT": str(scope["server"][1]) if scope.get("server") else "80",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    environ["CONTENT_LENGTH"] = str(len(body))  # the server has already de-chunked the body
+    return environ
+
+
+def run_flask(environ):
+    """Run one request through the Flask app (called on the thread pool)"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers]
+
+    chunks = app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+    return response["status"], response["headers"], body
+
+
+async def read_body(receive):
+    """Collect the full request body from the ASGI receive channel"""
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def stream_events(receive, send):
+    """Server-sent events feed of ticket changes - one coroutine per client, no thread"""
+    ensure_started()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+    })
+
+    queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    subscriber = (asyncio.get_running_loop(), queue)
+    subscribers.add(subscriber)
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_event.cancel()
+                await send({"type": "http.response.body", "body": b""})  # closing the response cleanly
+                break
+            if next_event in done:
+                chunk = f"event: ticket\ndata: {next_event.result()}\n\n"
+            else:
+                next_event.cancel()
+                chunk = ": keepalive\n\n"
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+    finally:
+        subscribers.discard(subscriber)
+        disconnected.cancel()
+
+
+def stream_cursor(scope):
+    """Where a /changes/stream client starts - ?cursor=N, then Last-Event-ID, then only new changes"""
+    cursor = parse_qs(scope["query_string"].decode("latin1")).get("cursor", [""])[0]
+    if not cursor.isdigit():
+        cursor = dict(scope.get("headers", [])).get(b"last-event-id", b"").decode("latin1")
+    return int(cursor) if cursor.isdigit() else changes.latest_sequence()
+
+
+async def stream_changes(scope, receive, send):
+    """The change feed as server-sent events - reads run on the pool, waiting costs no thread"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_executor(), ensure_store_loaded)  # CS - loading the store starts the feed
+    cursor = stream_cursor(scope)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+    })
+
+    wake = asyncio.Event()
+
+    def notify(event):
+        loop.call_soon_threadsafe(wake.set)
+
+    changes.feed_listeners.append(notify)
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        while True:
+            wake.clear()  # CS - cleared before reading, so an event written during the read still wakes us
+            events = await loop.run_in_executor(get_executor(), changes.read_changes, cursor)
+            if events:
+                cursor = events[-1]["seq"]
+                chunk = "".join(f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event)}\n\n" for event in events)
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+                continue
+
+            woken = asyncio.ensure_future(wake.wait())
+            done, _ = await asyncio.wait({woken, disconnected}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                woken.cancel()
+                await send({"type": "http.response.body", "body": b""})
+                break
+            if woken not in done:
+                woken.cancel()
+                await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+    finally:
+        changes.feed_listeners.remove(notify)
+        disconnected.cancel()
+
+
+async def lifespan(receive, send):
+    """Handle ASGI server startup and shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            get_executor()
+            ensure_started()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            shutdown_executor()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def asgi_app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return  # websockets are not supported
+
+    if scope["path"] == "/events" and scope["method"] == "GET":
+        await stream_events(receive, send)
+        return
+    if scope["path"] == "/changes/stream" and scope["method"] == "GET":
+        await stream_changes(scope, receive, send)
+        return
+
+    body = await read_body(receive)
+    if body is None:
+        return  # client went away before sending the whole request
+
+    loop = asyncio.get_running_loop()
+    status, headers, content = await loop.run_in_executor(get_executor(), run_flask, build_environ(scope, body))
+
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})
+
+
+# run the app in async mode
+if __name__ == "__main__":
+    import uvicorn  # only needed for async mode
+
+    print("Starting async Flask app at http://127.0.0.1:5050")
+    uvicorn.run(asgi_app, port=5050)
@@ -0,0 +1,140 @@
+import os
+import threading
+
+from flask import get_template_attribute, url_for
+
+from src.backend import helpdesk
+
+# display model for the ticket pages - what the templates show for a ticket (badge and status classes,
+# whether it can be closed or escalated, its link, its comments in one format) worked out once per
+# ticket version instead of in Jinja on every render
+#
+# the tickets table goes a step further: each row is rendered once (ticket_row.html) and the page joins
+# the cached rows, so a page of 10k tickets doesn't escape 10k x 15 values again on every request
+#
+# rows are cached against the ticket dict they were built from - the store swaps in a new dict on every
+# change, so a new version always gets a new row, and change_listeners drop rows of deleted tickets
+# (call from a request, links are built with url_for)
+
+SEVERITY_BADGES = {"Low": "badge-low", "Medium": "badge-medium", "High": "badge-high"}
+# CS - a cached row with its html is about 2 KB, past this many tickets rows are built on every render instead
+MAX_CACHED_ROWS = int(os.environ.get("HELPDESK_DISPLAY_CACHE_ROWS", "100000"))
+
+display_lock = threading.Lock()
+rows = {}  # ticket_id -> (ticket dict the row was built from, display row)
+started = False
+
+
+def severity_badge(severity):
+    """The label and badge class for a severity (anything unknown shows as High, as it always has)"""
+    label = str(severity or "").strip().title()
+    if label not in SEVERITY_BADGES:
+        label = "High"
+    return label, SEVERITY_BADGES[label]
+
+
+def format_comment(comment):
+    """One comment as {"content", "meta"}, whatever format it was saved in (old files have plain strings)"""
+    if not isinstance(comment, dict):
+        return {"content": str(comment), "meta": ""}
+    when = " ".join(str(comment[key]) for key in ("Date", "Time") if comment.get(key))
+    meta = " – ".join(part for part in (str(comment.get("Author") or ""), when) if part)
+    return {"content": comment.get("Content", ""), "meta": meta}
+
+
+def build_row(ticket):
+    """The display row for a ticket (comments and the table row html are added when a page needs them)"""
+    severity, badge = severity_badge(ticket.get("Severity"))
+    status = str(ticket.get("Status") or "")
+    return {
+        "ID": ticket["ID"],
+        "Title": ticket.get("Title", ""),
+        "Description": ticket.get("Description", ""),
+        "Assignee": ticket.get("Assignee", ""),
+        "Status": status,
+        "Category": ticket.get("Category", ""),
+        "Submitted": ticket.get("Submission DateTime", ""),
+        "Version": ticket.get("Version", 1),
+        "Severity": severity,
+        "badge": badge,
+        "severity_key": str(ticket.get("Severity") or "").lower(),
+        "status_class": status.lower().replace(" ", "-"),
+        "open": status.lower() != "closed",  # open tickets get the Close and Escalate buttons
+        "url": url_for("view_ticket_web", ticket_id=ticket["ID"]),
+        "comments": None,
+        "html": None,
+    }
+
+
+def on_ticket_change(kind, ticket_id, before, after):
+    """Change listener - dropping the row of a deleted or archived ticket (others are rebuilt when next shown)"""
+    if after is None:
+        with display_lock:
+            rows.pop(ticket_id, None)
+
+
+def ensure_started():
+    """Follow changes so rows of removed tickets don't stay cached (first call only)"""
+    global started
+    if started:
+        return
+    # CS - store lock before ours, the same order the change listener takes them in
+    with helpdesk.store_lock, display_lock:
+        if started:
+            return
+        helpdesk.change_listeners.append(on_ticket_change)
+        started = True
+
+
+def ticket_row(ticket, cache=True):
+    """The display row for a ticket, from the cache if this version has been shown before"""
+    cached = rows.get(ticket["ID"])
+    if cached is not None and cached[0] is ticket:
+        return cached[1]
+    row = build_row(ticket)
+    if cache and (cached is not None or len(rows) < MAX_CACHED_ROWS):
+        ensure_started()
+        with display_lock:
+            rows[ticket["ID"]] = (ticket, row)
+    return row
+
+
+def ticket_rows(tickets):
+    """Display rows for the tickets table, in the same order, each with its rendered html"""
+    render = None
+    found = []
+    for ticket in tickets:
+        row = ticket_row(ticket)
+        if row["html"] is None:
+            render = render or get_template_attribute("ticket_row.html", "ticket_row")
+            row["html"] = render(row)
+        found.append(row)
+    return found
+
+
+def ticket_detail(ticket, cache=True):
+    """The display row for the ticket page, with its comments formatted"""
+    row = ticket_row(ticket, cache)
+    if row["comments"] is None:
+        row["comments"] = [format_comment(comment) for comment in ticket.get("Comments") or []]
+    return row
+
+
+def ticket_counts(tickets):
+    """Totals for the stat cards on the tickets page"""
+    total = opened = high = 0
+    for ticket in tickets:
+        total += 1
+        opened += ticket["Status"] == "Open"
+        high += ticket["Severity"] == "High"
+    return {"total": total, "open": opened, "high": high}
+
+
+def reset():
+    """Forget the cached rows (used by tests)"""
+    global started
+    with helpdesk.store_lock, display_lock:
+        if on_ticket_change in helpdesk.change_listeners:
+            helpdesk.change_listeners.remove(on_ticket_change)
+        rows.clear()
+        started = False
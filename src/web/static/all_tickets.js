@@ -9,6 +9,7 @@ const modalMessage = document.getElementById('modalMessage');
 const modalForm = document.getElementById('modalForm');
 const confirmClose = confirmModal.querySelector('.close');
 const cancelBtn = document.getElementById('cancelModal');
+const closeVersion = document.getElementById('closeVersion');
 
 // Escalate Modal
 const escalateModal = document.getElementById('escalateModal');
@@ -16,18 +17,22 @@ const escalateForm = document.getElementById('escalateForm');
 const escalateTitle = document.getElementById('escalateTitle');
 const closeEscalate = document.getElementById('closeEscalate');
 const cancelEscalateBtn = document.getElementById('cancelEscalateBtn');
+const escalateVersion = document.getElementById('escalateVersion');
 
 // ---------------------------
 // Helper: Open / Close Modals
 // ---------------------------
-function openConfirmModal(ticketId) {
+// version = the ticket version this page was rendered with (server rejects stale changes)
+function openConfirmModal(ticketId, version) {
+    closeVersion.value = version;
     modalTitle.textContent = 'Close Ticket';
     modalMessage.textContent = `Are you sure you want to close ticket #${ticketId}?`;
     modalForm.action = `/close/${ticketId}`;
     confirmModal.style.display = 'flex';
 }
 
-function openEscalateModal(ticketId, ticketTitle) {
+function openEscalateModal(ticketId, ticketTitle, version) {
+    escalateVersion.value = version;
     escalateTitle.textContent = `Escalate Ticket #${ticketId} - ${ticketTitle}`;
     escalateForm.action = `/escalate/${ticketId}`;
     escalateModal.style.display = 'flex';
@@ -52,7 +57,7 @@ document.body.addEventListener('click', (e) => {
     const closeBtn = e.target.closest('button[data-action="close"]');
     if (closeBtn) {
         const ticketId = closeBtn.dataset.id;
-        openConfirmModal(ticketId);
+        openConfirmModal(ticketId, closeBtn.dataset.version);
         return;
     }
 
@@ -61,7 +66,7 @@ document.body.addEventListener('click', (e) => {
     if (escalateBtn) {
         const ticketId = escalateBtn.dataset.id;
         const ticketTitle = escalateBtn.dataset.title;
-        openEscalateModal(ticketId, ticketTitle);
+        openEscalateModal(ticketId, ticketTitle, escalateBtn.dataset.version);
         return;
     }
 
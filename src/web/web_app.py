@@ -1,22 +1,259 @@
-from flask import Flask, render_template, request, url_for, redirect, flash  
-from src.backend.helpdesk import tickets, save_tickets 
+from flask import Flask, Response, render_template, request, url_for, redirect, flash, make_response, g, current_app, before_render_template, template_rendered
+from src.backend.helpdesk import (
+    tickets, get_tickets, sync_store, save_tickets, snapshot_tickets, create_ticket, update_ticket_fields,
+    add_ticket_comment, delete_ticket_record, make_comment, TicketClosed, TicketNotFound, VersionConflict, CATEGORIES, DATETIME_FORMAT
+)
+from src.backend import archive, changes, metrics, reports, similarity, sla, views, workload
+from src.backend.helpdesk import BASE_DIR
+from src.web import display
 from datetime import datetime 
+from werkzeug.security import safe_join
 import json
 import os
 import csv
-
-# Creating a new web app
-app = Flask(__name__)
-
-# setting the secret key for sessions (needed for flash messages)
-# using environment variable if set, otherwise fallback to a dev key
-app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key")
-
-# home page - shows dashboard with stats and recent tickets
-@app.route("/")
-def home():
-    # convert tickets dict to a list and sort by ID descending
-    ticket_list = list(tickets.values())
+import cProfile
+import gzip
+import hashlib
+import time
+
+# routes are collected here and added to the app by create_app()
+routes = []
+
+def route(rule, **options):
+    def register(view):
+        routes.append((rule, view, options))
+        return view
+    return register
+
+# per-request profiling is opt-in because profile dumps can reveal internals
+PROFILING_ENABLED = os.environ.get("HELPDESK_PROFILING") == "1"
+PROFILE_DIR = BASE_DIR / "logs" / "profiles"
+
+# the SLA scheduler thread can be turned off with HELPDESK_SLA_SCHEDULER=0 (e.g. when another process runs it)
+SLA_SCHEDULER_ENABLED = os.environ.get("HELPDESK_SLA_SCHEDULER", "1") != "0"
+
+# response compression - gzip, or brotli when the optional brotli package is installed and the client accepts it
+COMPRESS_MIN_BYTES = 1024  # CS - smaller bodies barely shrink and the headers would eat the saving
+COMPRESSIBLE_TYPES = {"text/html", "text/css", "text/plain", "text/csv", "application/javascript", "text/javascript", "application/json"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # pages are compressed on every request, so a middle setting (static files use the best)
+
+# static files are served from URLs with a hash of their contents (?v=...), so browsers can keep them forever
+STATIC_MAX_AGE = 365 * 24 * 3600
+static_hashes = {}  # filename -> (modified time, hash)
+static_compressed = {}  # (filename, hash, encoding) -> compressed bytes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # gzip only
+
+CHANGE_STREAM_KEEPALIVE = 15  # seconds between keepalive comments on an idle /changes/stream
+# CS - a stream ties up a whole sync worker, so it ends after this long (under gunicorn's 30 second timeout) and
+# the browser reconnects from Last-Event-ID after CHANGE_STREAM_RETRY_MS - the ASGI app streams for as long as the client stays
+CHANGE_STREAM_SECONDS = 20
+CHANGE_STREAM_RETRY_MS = 1000
+
+# loading tickets (and starting the SLA scheduler) on the first request instead of at import, so workers boot quickly
+def ensure_store_loaded():
+    get_tickets()
+    sync_store()  # CS - other workers share the data file, showing what they saved since
+    if SLA_SCHEDULER_ENABLED and not sla.running:
+        sla.start()
+
+# timing every request and (when asked) profiling it
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if PROFILING_ENABLED and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+def record_request_metrics(response):
+    profiler = g.pop("profiler", None)
+    if profiler:
+        profiler.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        profile_file = PROFILE_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{request.endpoint}.prof"
+        profiler.dump_stats(profile_file)  # open with: python -m pstats <file>
+        response.headers["X-Profile-File"] = profile_file.name
+
+    # using the route pattern (not the real URL) so every ticket shares one series
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    if "request_start" in g:
+        metrics.observe("helpdesk_http_request_seconds", time.perf_counter() - g.request_start, route=route, method=request.method)
+    metrics.inc("helpdesk_http_requests_total", route=route, method=request.method, status=response.status_code)
+    return response
+
+# short hash of a static file's contents, worked out again only when the file changes
+def static_hash(filename):
+    path = safe_join(current_app.static_folder, filename)  # CS - never hashing files outside the static folder
+    if path is None or not os.path.isfile(path):
+        return None
+    modified = os.stat(path).st_mtime_ns
+    cached = static_hashes.get(filename)
+    if cached and cached[0] == modified:
+        return cached[1]
+    with open(path, "rb") as f:
+        file_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    static_hashes[filename] = (modified, file_hash)
+    return file_hash
+
+# adding the content hash to every url_for('static', ...) so templates pick up new versions by themselves
+def add_static_hash(endpoint, values):
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        file_hash = static_hash(values["filename"])
+        if file_hash:
+            values["v"] = file_hash
+
+# best encoding the client accepts (None if it only takes plain responses)
+def choose_encoding():
+    accepted = request.accept_encodings
+    if brotli and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+# caching hashed static files for a year and compressing text responses
+def finish_response(response):
+    file_hash = None
+    if request.endpoint == "static":
+        file_hash = static_hash(request.view_args.get("filename", ""))
+        if file_hash and request.args.get("v") == file_hash:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+
+    # CS - generator responses are left alone, they'd have to be buffered (static files are file wrappers, not generators)
+    if response.status_code != 200 or (response.is_streamed and not response.direct_passthrough):
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")  # CS - caches must keep the plain and compressed copies apart
+    encoding = choose_encoding()
+    if not encoding or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.direct_passthrough = False
+    plain = response.get_data()
+    plain_length = len(plain)
+    if file_hash:
+        # CS - static files are compressed once per version at the best setting, pages on every request
+        key = (request.view_args["filename"], file_hash, encoding)
+        if key not in static_compressed:
+            static_compressed[key] = compress(plain, encoding, best=True)
+        data = static_compressed[key]
+    else:
+        data = compress(plain, encoding)
+
+    if len(data) >= plain_length:
+        return response
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    if file_hash:
+        response.set_etag(f"{file_hash}-{encoding}")  # CS - each encoding is a different body, so a different tag
+        response.make_conditional(request)
+    # page ETags are left alone - on ticket pages it is the ticket version that If-Match sends back
+    metrics.inc("helpdesk_http_compressed_bytes_total", plain_length, encoding=encoding, stage="before")
+    metrics.inc("helpdesk_http_compressed_bytes_total", len(data), encoding=encoding, stage="after")
+    return response
+
+# timing template rendering separately from the rest of the request
+def start_render_timer(sender, template, context, **extra):
+    g.render_start = time.perf_counter()
+
+def record_render_time(sender, template, context, **extra):
+    if "render_start" in g:
+        metrics.observe("helpdesk_template_render_seconds", time.perf_counter() - g.pop("render_start"), template=template.name)
+
+# metrics for Prometheus (or anyone with curl)
+@route("/metrics")
+def metrics_page():
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+# reports as CSV or JSON, e.g. /reports?report=time-to-close&period=month&format=json
+@route("/reports")
+def reports_page():
+    report = request.args.get("report", "category")
+    period = request.args.get("period", "week")
+    output_format = request.args.get("format", "csv")
+    if report not in reports.REPORTS or period not in reports.PERIODS or output_format not in ("csv", "json"):
+        return "Unknown report, period or format", 400, {"Content-Type": "text/plain; charset=utf-8"}
+    text = reports.export(reports.report_rows(report, period), output_format)
+    content_type = "application/json" if output_format == "json" else "text/csv; charset=utf-8"
+    return text, 200, {"Content-Type": content_type, "Content-Disposition": f"inline; filename={report}-{period}.{output_format}"}
+
+# change feed - a batch of ticket changes after a cursor, e.g. /changes?cursor=1200&limit=100
+@route("/changes")
+def changes_page():
+    cursor = request.args.get("cursor", 0, type=int)
+    limit = min(request.args.get("limit", changes.BATCH_LIMIT, type=int), changes.BATCH_LIMIT)
+    events = changes.read_changes(cursor, max(limit, 1))
+    return {"changes": events, "cursor": events[-1]["seq"] if events else cursor}
+
+# the change feed as server-sent events - reconnecting clients resume from Last-Event-ID
+@route("/changes/stream")
+def changes_stream():
+    cursor = request.args.get("cursor", type=int)
+    if cursor is None:
+        last_id = request.headers.get("Last-Event-ID", "")
+        cursor = int(last_id) if last_id.isdigit() else changes.latest_sequence()
+
+    def generate(cursor):
+        yield f"retry: {CHANGE_STREAM_RETRY_MS}\n\n"
+        end = time.monotonic() + CHANGE_STREAM_SECONDS
+        while True:
+            events = changes.read_changes(cursor)
+            for event in events:
+                yield f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event)}\n\n"
+            if events:
+                cursor = events[-1]["seq"]
+                continue
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            if not changes.wait_for_changes(cursor, min(remaining, CHANGE_STREAM_KEEPALIVE)) and remaining > CHANGE_STREAM_KEEPALIVE:
+                yield ": keepalive\n\n"  # CS - keeps proxies from closing an idle stream
+
+    return Response(generate(cursor), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# reading the ticket version the client last saw (hidden form field or If-Match header)
+def get_expected_version():
+    version = request.form.get("version") or next(iter(request.if_match.as_set()), "")
+    return int(version) if str(version).isdigit() else None
+
+# telling the client their copy is out of date (409 Conflict)
+def conflict_response(ticket_id, message):
+    return render_template(
+        "message.html",
+        message=message,
+        back_url=url_for("view_ticket_web", ticket_id=ticket_id),
+        card_class="error",
+    ), 409
+
+# telling the client the ticket has gone since they opened it, e.g. deleted by another worker (404 Not Found)
+def not_found_response(ticket_id):
+    return render_template(
+        "message.html",
+        message=f"Ticket {ticket_id} not found. It may have been deleted by someone else.",
+        back_url=url_for("home"),
+        card_class="error",
+    ), 404
+
+# rejecting a form with values the backend does not allow (400 Bad Request)
+def invalid_response(message, back_url):
+    return render_template("message.html", message=message, back_url=back_url, card_class="error"), 400
+
+# the 5 newest tickets, most severe first - the recent ticket cards on the home and tickets pages
+def newest_tickets(snapshot):
+    # sort by ID descending
+    ticket_list = list(snapshot)
     ticket_list.sort(key=lambda t: int(t["ID"]), reverse=True)  # newest first
 
     # take the first 5 tickets
@@ -25,76 +262,130 @@ def home():
     severity_order = {"High": 0, "Medium": 1, "Low": 2}
     # sort the 5 tickets only
     recent_tickets.sort(key=lambda t: severity_order.get(t["Severity"], 3))
+    return recent_tickets
+
+# home page - shows dashboard with stats and recent tickets
+@route("/")
+def home():
+    # take a snapshot (safe while other requests write)
+    snapshot = snapshot_tickets(tickets)
 
     return render_template(
         "home.html",
-        tickets=tickets.values(),
-        recent_tickets=recent_tickets
+        tickets=snapshot,
+        recent_tickets=newest_tickets(snapshot)
     )
 
 # all tickets page 
-@app.route("/tickets")
+@route("/tickets")
 def all_tickets():
     filter_type = request.args.get("filter") 
-    tickets_list = list(tickets.values())
+    view_name = request.args.get("view", "")
+    query = request.args.get("q", "").strip()
+    snapshot = snapshot_tickets(tickets)
+    tickets_list = list(snapshot)
 
-    # apply filter if needed
+    # the stat card links are filters too
     if filter_type == "Open":
-        tickets_list = [t for t in tickets_list if t["Status"] == "Open"]
+        query = "status:open"
     elif filter_type == "High":
-        tickets_list = [t for t in tickets_list if t["Severity"] == "High"]
+        query = "severity:high"
+
+    # apply the saved view or query (see views.py for the filter syntax)
+    try:
+        if view_name:
+            tickets_list = views.open_view(view_name)
+            query = dict(views.get_views())[view_name]
+        elif query:
+            tickets_list = views.search(query)
+    except KeyError:
+        return invalid_response(f"There is no saved view called '{view_name}'.", url_for("all_tickets"))
+    except ValueError as e:
+        return invalid_response(f"The filter '{query}' {e}.", url_for("all_tickets"))
 
     assignees = get_assignees()
 
-    # always send full tickets for the stats cards
-    return render_template("all_tickets.html", tickets=tickets_list, filter_type=filter_type, all_tickets=tickets.values(), assignees=assignees)
+    # the stat cards count every ticket, the table shows display rows (see display.py)
+    return render_template(
+        "all_tickets.html", rows=display.ticket_rows(tickets_list), filter_type=filter_type, counts=display.ticket_counts(snapshot),
+        recent_rows=display.ticket_rows(newest_tickets(snapshot)), assignees=assignees, query=query, view_name=view_name, saved_views=views.get_views(),
+    )
+
+# saving or deleting a view of the tickets page
+@route("/views", methods=["POST"])
+def views_web():
+    name = request.form.get("name", "").strip()
+    if request.form.get("action") == "delete":
+        if views.delete_view(name):
+            flash(f"View '{name}' deleted.", "success")
+        return redirect(url_for("all_tickets"))
+    try:
+        views.save_view(name, request.form.get("query", ""))
+    except ValueError as e:
+        return invalid_response(f"View {e}.", url_for("all_tickets"))
+    flash(f"View '{name}' saved.", "success")
+    return redirect(url_for("all_tickets", view=name))
 
 # add a new ticket
-@app.route("/add", methods=["GET", "POST"])
+@route("/add", methods=["GET", "POST"])
 def add_ticket_web():
-    # using full valid assignee list
-    assignees = VALID_ASSIGNEES
+    # using the current roster
+    assignees = get_assignees()
 
     if request.method == "POST":
         title = request.form["title"]
         description = request.form["description"]
         assignee = request.form["assignee"]
+        # CS - showing likely duplicates first, the user can still submit again to add it anyway
+        if not request.form.get("confirm_duplicate"):
+            duplicates = [(tickets[ticket_id], score) for ticket_id, score in similarity.find_duplicates(title, description) if ticket_id in tickets]
+            if duplicates:
+                return render_template("add.html", assignees=assignees, duplicates=duplicates, form=request.form)
+
+        if assignee == workload.AUTO_ASSIGN:
+            assignee = workload.pick_assignee("Software") or "Unassigned"  # least loaded agent
         severity = request.form["severity"]
         status = request.form["status"]
 
-        ticket_id = str(max(map(int, tickets.keys()), default=100) + 1)
-
-        tickets[ticket_id] = {
-            "ID": ticket_id,
-            "Title": title,
-            "Description": description,
-            "Assignee": assignee,
-            "Severity": severity,
-            "Status": status,
-            "Category": "Software",
-            "Submission DateTime": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),  
-            "Comments": []
-        }
+        try:
+            ticket = create_ticket(tickets, {
+                "Title": title,
+                "Description": description,
+                "Assignee": assignee,
+                "Severity": severity,
+                "Status": status,
+                "Category": "Software",
+                "Submission DateTime": datetime.now().strftime(DATETIME_FORMAT)
+            })
+        except ValueError as e:
+            return invalid_response(f"Ticket {e}.", url_for("add_ticket_web"))
+        ticket_id = ticket["ID"]
 
         save_tickets(tickets)
         flash(f"Ticket {ticket_id} added successfully!", "success")
         return redirect(url_for("view_ticket_web", ticket_id=ticket_id))
 
-    return render_template("add.html", assignees=assignees)
+    return render_template("add.html", assignees=assignees, duplicates=[], form={})
 
 # view a ticket in detail
-@app.route("/ticket/<ticket_id>")
+@route("/ticket/<int:ticket_id>")
 def view_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
+    archived = False
+    if not ticket:
+        ticket = archive.get_archived_ticket(ticket_id)  # old closed tickets are read back from the archive
+        archived = ticket is not None
     if not ticket:
         return render_template("message.html", message=f"Ticket {ticket_id} not found.", back_url=url_for("home"))
 
-    comments = ticket.get("Comments", [])  # get the list of comments
+    row = display.ticket_detail(ticket, cache=not archived)  # shown values and formatted comments, worked out once per version
     assignees = get_assignees()
-    return render_template("view.html", ticket=ticket, comments=comments, assignees=assignees)
+    response = make_response(render_template("view.html", ticket=ticket, row=row, assignees=assignees, archived=archived))
+    response.set_etag(str(ticket["Version"]))  # lets API clients send it back as If-Match
+    return response
 
 # updating an existing ticket
-@app.route("/update/<ticket_id>", methods=["GET", "POST"])
+@route("/update/<int:ticket_id>", methods=["GET", "POST"])
 def update_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
     if not ticket:
@@ -104,15 +395,22 @@ def update_ticket_web(ticket_id):
     assignees = get_assignees()
 
     if request.method == "POST":
-        # update ticket fields
-        ticket.update({
-            "Title": request.form["title"],
-            "Description": request.form["description"],
-            "Assignee": request.form["assignee"],
-            "Severity": request.form["severity"],
-            "Status": request.form["status"],
-            "Category": request.form["category"]
-        })
+        # update ticket fields, merging with any edit saved since the form was loaded
+        try:
+            update_ticket_fields(tickets, ticket_id, {
+                "Title": request.form["title"],
+                "Description": request.form["description"],
+                "Assignee": request.form["assignee"],
+                "Severity": request.form["severity"],
+                "Status": request.form["status"],
+                "Category": request.form["category"]
+            }, get_expected_version())
+        except TicketNotFound:
+            return not_found_response(ticket_id)
+        except VersionConflict as e:
+            return conflict_response(ticket_id, f"{e} Conflicting fields: {', '.join(e.fields)}. Please reload and try again.")
+        except ValueError as e:
+            return invalid_response(f"Ticket {e}.", url_for("view_ticket_web", ticket_id=ticket_id))
         save_tickets(tickets)
 
         # flash success message and redirect to view_ticket
@@ -122,7 +420,7 @@ def update_ticket_web(ticket_id):
     return render_template("update.html", ticket=ticket, assignees=assignees)
 
 # delete a ticket
-@app.route("/delete_ticket/<ticket_id>", methods=["GET", "POST"])
+@route("/delete_ticket/<int:ticket_id>", methods=["GET", "POST"])
 def delete_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
     if not ticket:
@@ -133,7 +431,12 @@ def delete_ticket_web(ticket_id):
         confirm = request.form.get("confirm")
         if confirm == "yes":
             # Remove ticket and save
-            tickets.pop(ticket_id)
+            try:
+                delete_ticket_record(tickets, ticket_id, get_expected_version())
+            except TicketNotFound:
+                return not_found_response(ticket_id)
+            except VersionConflict:
+                return conflict_response(ticket_id, f"Ticket {ticket_id} was changed by someone else. Please review it before deleting.")
             save_tickets(tickets)
             flash(f"Ticket #{ticket_id} deleted successfully!", "success")
             return redirect(url_for("home"))
@@ -145,7 +448,7 @@ def delete_ticket_web(ticket_id):
     return render_template("delete.html", ticket=ticket)
 
 # add a comment to a ticket
-@app.route("/comment/<ticket_id>", methods=["GET", "POST"])
+@route("/comment/<int:ticket_id>", methods=["GET", "POST"])
 def comment_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
     if not ticket:
@@ -160,13 +463,10 @@ def comment_ticket_web(ticket_id):
     if request.method == "POST":
         comment_text = request.form.get("comment", "").strip()
         if comment_text:
-            ticket.setdefault("Comments", [])
-            ticket["Comments"].append({
-                "Author": "Web User", 
-                "Date": datetime.now().strftime("%d/%m/%Y"),
-                "Time": datetime.now().strftime("%H:%M:%S"),
-                "Content": comment_text
-            })
+            try:
+                add_ticket_comment(tickets, ticket_id, make_comment("Web User", comment_text))
+            except TicketNotFound:
+                return not_found_response(ticket_id)
             save_tickets(tickets)
             flash(f"Comment added to ticket {ticket_id}!", "success")
             return redirect(url_for("view_ticket_web", ticket_id=ticket_id))
@@ -174,7 +474,7 @@ def comment_ticket_web(ticket_id):
     return render_template("comment.html", ticket=ticket)
 
 # close a ticket (auto redirect after closing)
-@app.route("/close/<ticket_id>", methods=["POST"])
+@route("/close/<int:ticket_id>", methods=["POST"])
 def close_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
     if not ticket:
@@ -184,20 +484,47 @@ def close_ticket_web(ticket_id):
             back_url=url_for("home"),
             card_class="error",
         )
-    ticket["Status"] = "Closed"
+    try:
+        update_ticket_fields(tickets, ticket_id, {"Status": "Closed"}, get_expected_version())
+    except TicketNotFound:
+        return not_found_response(ticket_id)
+    except VersionConflict as e:
+        return conflict_response(ticket_id, f"{e} Please reload and try again.")
     save_tickets(tickets)
     flash(f"Ticket {ticket_id} closed successfully!", "success")
     return redirect(url_for("view_ticket_web", ticket_id=ticket_id))
 
-VALID_ASSIGNEES = ["Olivia Davis", "Ryan Collins", "Jacob Nguyen", "Benjamin Jackson"]
-
-# helper function to get all unique assignees
+# helper function to get all assignees (the roster can be changed on the /assignees page)
 def get_assignees():
-    # always return full valid assignee list
-    return VALID_ASSIGNEES
-    
+    return workload.get_roster()
+
+# assignee roster - who can be assigned tickets and their current load
+@route("/assignees", methods=["GET", "POST"])
+def assignees_web():
+    if request.method == "POST":
+        name = request.form.get("name", "").strip()
+        if request.form.get("action") == "remove":
+            if workload.remove_assignee(name):
+                flash(f"{name} removed from the roster.", "success")
+        else:
+            try:
+                workload.set_assignee(name, request.form.getlist("categories"))
+            except ValueError as e:
+                return invalid_response(f"Assignee {e}.", url_for("assignees_web"))
+            flash(f"{name} saved to the roster.", "success")
+        return redirect(url_for("assignees_web"))
+
+    return render_template("assignees.html", roster=workload.get_workload(), categories=CATEGORIES)
+
+# searching old closed tickets that have been moved to the archive
+@route("/archive")
+def archive_web():
+    query = request.args.get("q", "").strip()
+    results = archive.search_archive(query) if query else []
+    return render_template("archive.html", query=query, results=results, archived_count=len(archive.index))
+
 # escalate a ticket (assign + set severity)
-@app.route("/escalate/<ticket_id>", methods=["GET", "POST"])
+@route("/escalate/<int:ticket_id>", methods=["GET", "POST"])
 def escalate_ticket_web(ticket_id):
     ticket = tickets.get(ticket_id)
     if not ticket:
@@ -211,15 +538,50 @@ def escalate_ticket_web(ticket_id):
 
     if request.method == "POST":
         new_assignee = request.form["assignee"].strip()
+        if new_assignee == workload.AUTO_ASSIGN:
+            # least loaded agent other than the one who has it now
+            new_assignee = workload.pick_assignee(ticket["Category"], exclude={ticket["Assignee"]})
+            if not new_assignee:
+                return invalid_response(f"Nobody else on the roster takes {ticket['Category']} tickets.", url_for("view_ticket_web", ticket_id=ticket_id))
         if new_assignee:
-            ticket["Assignee"] = new_assignee
-            ticket["Severity"] = "High"
+            try:
+                # CS - checked under the store lock, the ticket may have been closed while the escalate form was open
+                update_ticket_fields(tickets, ticket_id, {"Assignee": new_assignee, "Severity": "High"}, get_expected_version(), require_open=True)
+            except TicketNotFound:
+                return not_found_response(ticket_id)
+            except TicketClosed:
+                return conflict_response(ticket_id, f"Ticket {ticket_id} has been closed and can no longer be escalated.")
+            except VersionConflict as e:
+                return conflict_response(ticket_id, f"{e} Please reload and try again.")
             save_tickets(tickets)
             flash(f"Ticket {ticket_id} escalated to {new_assignee}!", "success")
             return redirect(url_for("view_ticket_web", ticket_id=ticket_id))
 
     return render_template("escalate.html", ticket=ticket, assignees=assignees)  
 
+# creating a new web app (app factory - gunicorn can also use "src.web.web_app:create_app()")
+def create_app():
+    app = Flask(__name__)
+
+    # setting the secret key for sessions (needed for flash messages)
+    # using environment variable if set, otherwise fallback to a dev key
+    app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key")
+
+    app.before_request(start_request_timer)
+    app.before_request(ensure_store_loaded)
+    app.after_request(finish_response)
+    app.after_request(record_request_metrics)
+    app.url_defaults(add_static_hash)
+    before_render_template.connect(start_render_timer, app)
+    template_rendered.connect(record_render_time, app)
+
+    for rule, view, options in routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    return app
+
+app = create_app()
+
 # run the app
 if __name__ == "__main__":
     print("Starting Flask app at http://127.0.0.1:5050")
@@ -1,5 +1,23 @@
+import asyncio
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
 import unittest
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
 from unittest.mock import patch  # allows to fake user input()
+
+# pointing the ticket engine at a scratch file so test runs never rewrite data/helpdesk.csv
+os.environ.setdefault("HELPDESK_DATA_FILE", str(Path(tempfile.mkdtemp()) / "helpdesk.csv"))
+os.environ.setdefault("HELPDESK_SLA_SCHEDULER", "0")  # the SLA tests drive the scheduler with a fake clock
+
 from src.cli.cli_helpdesk import (
     tickets,
     add_ticket_ai,
@@ -153,6 +171,1440 @@ class TestCLIHelpdesk(unittest.TestCase):
         self.teardown_ticket(ticket_id)
 
 
+# class to group the shared ticket engine tests
+class TestTicketEngine(unittest.TestCase):
+
+    # TEST - rows written by the old CLI (str() comments, In-progress status) still load
+    def test_legacy_row_is_normalised(self):
+        from src.backend.helpdesk import parse_row
+        comment = {"Author": "Olivia", "Date": "01/01/2026", "Time": "12:00:00", "Content": "Looking"}
+        ticket = parse_row({
+            "ID": "150", "Title": "Old Ticket", "Description": "From the old CLI", "Assignee": "Olivia",
+            "Severity": "high", "Status": "In-progress", "Category": "Software",
+            "Submission DateTime": "01/01/2026 12:00:00", "Comments": str([comment]),
+        })
+        self.assertEqual(ticket["ID"], 150)
+        self.assertEqual(ticket["Severity"], "High")
+        self.assertEqual(ticket["Status"], "In Progress")
+        self.assertEqual(ticket["Comments"], [comment])
+        self.assertEqual(ticket["Version"], 1)
+
+    # TEST - the web form is rejected when the engine refuses a value
+    def test_web_rejects_invalid_severity(self):
+        from src.web.web_app import app
+        response = app.test_client().post("/add", data={
+            "title": "Bad", "description": "Bad severity", "assignee": "Olivia Davis",
+            "severity": "Urgent", "status": "Open",
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+# base class for the tests that change the store, saving into a temp file so the real data is never touched
+class HelpdeskTestCase(unittest.TestCase):
+
+    reset_modules = ()  # modules reset before and after each test
+
+    def setUp(self):
+        from src.backend import helpdesk
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = Path(self.temp_dir.name) / "helpdesk.csv"
+        self.data_patch = patch.object(helpdesk, "DATA_FILE", self.data_file)
+        self.data_patch.start()
+
+        self.helpdesk = helpdesk
+        self.created_ids = []
+        self.reset()
+
+    def tearDown(self):
+        for ticket_id in self.created_ids:
+            if ticket_id in self.helpdesk.tickets:
+                self.helpdesk.delete_ticket_record(self.helpdesk.tickets, ticket_id)
+        self.reset()
+        self.data_patch.stop()
+        self.temp_dir.cleanup()
+
+    # helper - resetting the modules the test uses
+    def reset(self):
+        for name in self.reset_modules:
+            importlib.import_module(name).reset()
+
+    # helper - adding a ticket through the engine and removing it again after the test
+    def create_ticket(self, fields):
+        ticket = self.helpdesk.create_ticket(self.helpdesk.tickets, fields)
+        self.created_ids.append(ticket["ID"])
+        return ticket
+
+
+# class to group the optimistic concurrency (ticket version) tests
+class TestTicketVersioning(HelpdeskTestCase):
+
+    def setUp(self):
+        from src.web.web_app import app
+
+        super().setUp()
+        self.client = app.test_client()
+        self.ticket_id = 999999
+        self.created_ids.append(self.ticket_id)
+        self.initial_ticket = {
+            "ID": self.ticket_id,
+            "Title": "Version Ticket",
+            "Description": "Initial description",
+            "Assignee": "Olivia Davis",
+            "Severity": "Low",
+            "Status": "Open",
+            "Category": "Software",
+            "Submission DateTime": "01/01/2026 12:00:00",
+            "Comments": [],
+            "Version": 1
+        }
+        self.helpdesk.insert_ticket(self.helpdesk.tickets, dict(self.initial_ticket))
+
+    def form(self, **changes):
+        ticket = self.helpdesk.tickets[self.ticket_id]
+        data = {
+            "title": ticket["Title"],
+            "description": ticket["Description"],
+            "assignee": ticket["Assignee"],
+            "severity": ticket["Severity"],
+            "status": ticket["Status"],
+            "category": ticket["Category"],
+        }
+        data.update(changes)
+        return data
+
+    # TEST - matching version saves and bumps the version
+    def test_update_bumps_version(self):
+        response = self.client.post(f"/update/{self.ticket_id}", data=self.form(title="New Title", version="1"))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Title"], "New Title")
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Version"], 2)
+
+    # TEST - stale edit to a different field is merged
+    def test_stale_update_merges_other_fields(self):
+        stale_form = self.form(description="Agent B description", version="1")
+        self.client.post(f"/update/{self.ticket_id}", data=self.form(title="Agent A title", version="1"))
+
+        response = self.client.post(f"/update/{self.ticket_id}", data=stale_form)
+
+        ticket = self.helpdesk.tickets[self.ticket_id]
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ticket["Title"], "Agent A title")
+        self.assertEqual(ticket["Description"], "Agent B description")
+        self.assertEqual(ticket["Version"], 3)
+
+    # TEST - stale edit to the same field is rejected with 409
+    def test_stale_update_same_field_conflicts(self):
+        self.client.post(f"/update/{self.ticket_id}", data=self.form(title="Agent A title", version="1"))
+
+        response = self.client.post(f"/update/{self.ticket_id}", data=self.form(title="Agent B title", version="1"))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Title"], "Agent A title")
+
+    # TEST - escalating a ticket closed in the meantime is rejected
+    def test_escalate_after_close_conflicts(self):
+        self.client.post(f"/close/{self.ticket_id}", data={"version": "1"})
+
+        response = self.client.post(f"/escalate/{self.ticket_id}", data={"assignee": "Ryan Collins", "version": "1"})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Assignee"], "Olivia Davis")
+
+    # TEST - closing is checked under the store lock, not just by the route
+    def test_require_open_refuses_closed_ticket(self):
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ticket_id, {"Status": "Closed"})
+
+        with self.assertRaises(self.helpdesk.TicketClosed):
+            self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ticket_id, {"Severity": "High"}, require_open=True)
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Severity"], "Low")
+
+    # helper - running a store call in another process (like another gunicorn worker) against the same file
+    def in_other_process(self, call):
+        self.helpdesk.get_tickets()
+        self.helpdesk.save_tickets(self.helpdesk.tickets)
+        code = f"from src.backend import helpdesk; tickets = helpdesk.get_tickets(); helpdesk.{call}"
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.helpdesk.DATA_FILE)}
+        subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, check=True, capture_output=True)
+
+    # TEST - an edit saved by another process (e.g. another gunicorn worker) is picked up, a stale one conflicts
+    def test_edit_from_other_process_conflicts(self):
+        self.in_other_process(f"update_ticket_fields(tickets, {self.ticket_id}, {{'Title': 'Other worker title'}}, 1)")
+
+        response = self.client.post(f"/update/{self.ticket_id}", data=self.form(title="Agent A title", version="1"))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.helpdesk.tickets[self.ticket_id]["Title"], "Other worker title")
+        self.assertEqual(self.helpdesk.load_tickets()[self.ticket_id]["Title"], "Other worker title")
+
+    # TEST - a stale edit to a field the other process left alone still merges
+    def test_edit_from_other_process_merges(self):
+        self.in_other_process(f"update_ticket_fields(tickets, {self.ticket_id}, {{'Description': 'Other worker description'}}, 1)")
+
+        response = self.client.post(f"/update/{self.ticket_id}", data=self.form(title="Agent A title", description="Initial description", version="1"))
+
+        ticket = self.helpdesk.tickets[self.ticket_id]
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual((ticket["Title"], ticket["Description"], ticket["Version"]), ("Agent A title", "Other worker description", 3))
+
+    # TEST - changing a ticket another process deleted raises TicketNotFound instead of a KeyError
+    def test_change_after_delete_in_other_process(self):
+        self.in_other_process(f"delete_ticket_record(tickets, {self.ticket_id})")
+
+        with self.assertRaises(self.helpdesk.TicketNotFound):
+            self.helpdesk.add_ticket_comment(self.helpdesk.tickets, self.ticket_id, self.helpdesk.make_comment("Agent A", "Still there?"))
+        with self.assertRaises(self.helpdesk.TicketNotFound):
+            self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ticket_id, {"Title": "Agent A title"}, 1)
+        self.assertNotIn(self.ticket_id, self.helpdesk.load_tickets())
+
+    # TEST - a ticket deleted between the route's check and its change gets a 404 page, not a 500
+    def test_routes_after_delete_in_other_process(self):
+        for path, data in [
+            (f"/comment/{self.ticket_id}", {"comment": "Still there?"}),
+            (f"/update/{self.ticket_id}", self.form(title="Agent A title", version="1")),  # CS - built while the ticket is still there
+            (f"/close/{self.ticket_id}", {"version": "1"}),
+            (f"/escalate/{self.ticket_id}", {"assignee": "Ryan Collins", "version": "1"}),
+            (f"/delete_ticket/{self.ticket_id}", {"confirm": "yes", "version": "1"}),
+        ]:
+            if self.ticket_id not in self.helpdesk.tickets:
+                self.helpdesk.insert_ticket(self.helpdesk.tickets, dict(self.initial_ticket))
+            self.in_other_process(f"delete_ticket_record(tickets, {self.ticket_id})")
+
+            with patch("src.web.web_app.sync_store"):  # CS - as if the delete landed after this request's sync
+                response = self.client.post(path, data=data)
+
+            self.assertEqual(response.status_code, 404, path)
+            self.assertNotIn(self.ticket_id, self.helpdesk.tickets)
+
+    # TEST - view page exposes the version as an ETag for If-Match
+    def test_if_match_header(self):
+        etag = self.client.get(f"/ticket/{self.ticket_id}").headers["ETag"]
+        self.client.post(f"/update/{self.ticket_id}", data=self.form(severity="High", version="1"))
+
+        response = self.client.post(f"/update/{self.ticket_id}", data=self.form(severity="Medium"), headers={"If-Match": etag})
+
+        self.assertEqual(response.status_code, 409)
+
+
+# class to group the thread safety tests for the shared ticket store
+class TestStoreConcurrency(HelpdeskTestCase):
+
+    def setUp(self):
+        from src.web.web_app import app
+
+        super().setUp()
+        self.app = app
+
+    # TEST - many threads adding, commenting and reading at once
+    def test_concurrent_requests(self):
+        threads_count = 8
+        requests_per_thread = 15
+        errors = []
+
+        def worker(worker_number):
+            client = self.app.test_client()  # one client per thread, like separate browsers
+            try:
+                response = client.post("/add", data={
+                    "title": f"Stress {worker_number}",
+                    "description": "Load test",
+                    "assignee": "Olivia Davis",
+                    "severity": "Low",
+                    "status": "Open",
+                    "confirm_duplicate": "1",  # CS - every worker adds a near identical ticket
+                })
+                ticket_id = int(response.headers["Location"].rsplit("/", 1)[-1])
+                self.created_ids.append(ticket_id)
+
+                for i in range(requests_per_thread):
+                    client.post(f"/comment/{ticket_id}", data={"comment": f"comment {i}"})
+                    for url in ("/", "/tickets", f"/ticket/{ticket_id}"):
+                        status = client.get(url).status_code
+                        if status != 200:
+                            errors.append(f"{url} returned {status}")
+            except Exception as e:
+                errors.append(repr(e))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(self.created_ids)), threads_count)  # CS - no duplicate IDs handed out
+
+        # every comment is in memory and in the saved file
+        saved = self.helpdesk.load_tickets()
+        for ticket_id in self.created_ids:
+            self.assertEqual(len(self.helpdesk.tickets[ticket_id]["Comments"]), requests_per_thread)
+            self.assertEqual(len(saved[ticket_id]["Comments"]), requests_per_thread)
+
+    # TEST - several processes (like gunicorn workers) adding tickets and comments to one data file
+    def test_concurrent_processes(self):
+        processes_count = 4
+        comments_per_process = 10
+        code = (
+            "from src.backend import helpdesk; store = helpdesk.get_tickets(); "
+            "ticket = helpdesk.create_ticket(store, {'Title': 'Process ticket', 'Description': 'Load test', 'Assignee': 'Olivia Davis', "
+            "'Severity': 'Low', 'Status': 'Open', 'Category': 'Software', 'Submission DateTime': '01/01/2026 12:00:00'}); "
+            f"[helpdesk.add_ticket_comment(store, ticket['ID'], helpdesk.make_comment('Worker', str(i))) for i in range({comments_per_process})]; "
+            "print(ticket['ID'])"
+        )
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.helpdesk.DATA_FILE)}
+        processes = [
+            subprocess.Popen([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for _ in range(processes_count)
+        ]
+        results = [process.communicate(timeout=120) + (process.returncode,) for process in processes]
+
+        self.assertEqual([(stderr, code) for _, stderr, code in results], [("", 0)] * processes_count)
+        ticket_ids = [int(stdout.split()[-1]) for stdout, _, _ in results]
+        self.assertEqual(len(set(ticket_ids)), processes_count)  # CS - no ID handed out by two processes
+
+        saved = self.helpdesk.load_tickets()
+        self.assertEqual(sorted(saved), sorted(ticket_ids))
+        for ticket_id in ticket_ids:
+            self.assertEqual(len(saved[ticket_id]["Comments"]), comments_per_process)
+        self.assertEqual(list(Path(self.temp_dir.name).glob("*.tmp")), [])
+
+
+# class to group the async (ASGI) serving mode tests
+class TestAsgiMode(HelpdeskTestCase):
+
+    def setUp(self):
+        from src.web import asgi_app
+
+        super().setUp()
+        self.asgi_app = asgi_app.asgi_app
+        self.ticket = self.create_ticket({
+            "Title": "Async Ticket",
+            "Description": "Testing the ASGI app",
+            "Assignee": "Ryan Collins",
+            "Severity": "Low",
+            "Status": "Open",
+            "Category": "Software",
+            "Submission DateTime": "01/01/2026 12:00:00"
+        })
+
+    # helper - calling the ASGI app like a server would and collecting what it sends
+    async def call(self, method, path, body=b"", query_string=b""):
+        scope = {
+            "type": "http", "method": method, "path": path, "query_string": query_string,
+            "headers": [(b"content-type", b"application/x-www-form-urlencoded")],
+        }
+        messages = [{"type": "http.request", "body": body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.asgi_app(scope, receive, send)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+    # TEST - normal pages are served through the ASGI app
+    def test_pages_served(self):
+        status, body = asyncio.run(self.call("GET", f"/ticket/{self.ticket['ID']}"))
+        self.assertEqual(status, 200)
+        self.assertIn(b"Async Ticket", body)
+
+    # TEST - /events streams a change made by another request
+    def test_events_stream(self):
+        async def scenario():
+            disconnect = asyncio.Event()
+            sent = []
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if message.get("body", b"").startswith(b"event: ticket"):
+                    disconnect.set()
+
+            scope = {"type": "http", "method": "GET", "path": "/events", "query_string": b"", "headers": []}
+            stream = asyncio.ensure_future(self.asgi_app(scope, receive, send))
+            await asyncio.sleep(0.05)  # let the stream subscribe
+            await self.call("POST", f"/comment/{self.ticket['ID']}", b"comment=hello")
+            await asyncio.wait_for(stream, timeout=5)
+            return sent
+
+        sent = asyncio.run(scenario())
+        event_body = next(m["body"] for m in sent if m.get("body", b"").startswith(b"event: ticket"))
+        event = json.loads(event_body.decode().split("data: ", 1)[1])
+        self.assertEqual(event["kind"], "commented")
+        self.assertEqual(event["ticket_id"], self.ticket["ID"])
+
+    # TEST - lifespan startup registers the /events listener once, and the app serves again after a shutdown
+    def test_listener_registered_on_startup(self):
+        from src.web import asgi_app
+        asgi_app.reset()
+
+        async def lifecycle():
+            messages = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message["type"])
+
+            lifespan = asyncio.ensure_future(self.asgi_app({"type": "lifespan"}, messages.get, send))
+            await messages.put({"type": "lifespan.startup"})
+            while not sent:
+                await asyncio.sleep(0.01)
+            status, _ = await self.call("GET", f"/ticket/{self.ticket['ID']}")
+            await messages.put({"type": "lifespan.shutdown"})
+            await asyncio.wait_for(lifespan, timeout=5)
+            return sent, status
+
+        self.assertNotIn(asgi_app.broadcast_change, self.helpdesk.change_listeners)
+        for _ in range(2):
+            self.assertEqual(asyncio.run(lifecycle()), (["lifespan.startup.complete", "lifespan.shutdown.complete"], 200))
+        self.assertEqual(self.helpdesk.change_listeners.count(asgi_app.broadcast_change), 1)
+
+    # TEST - raw query bytes outside ASCII are passed on as latin-1 (PEP 3333) instead of failing the request
+    def test_non_ascii_query_string(self):
+        from src.web import asgi_app
+
+        status, body = asyncio.run(self.call("GET", "/tickets", query_string="q=Async café".encode("utf-8")))
+        self.assertEqual(status, 200)
+        self.assertIn("Async café".encode("utf-8"), body)  # CS - Flask reads the latin-1 string back as the UTF-8 the client sent
+        self.assertEqual(asgi_app.stream_cursor({"query_string": b"q=\xff&cursor=7", "headers": []}), 7)
+
+
+# class to group the benchmark harness tests
+class TestBenchmarks(unittest.TestCase):
+
+    # TEST - a tiny benchmark run produces a JSON-ready report for every benchmark
+    def test_small_run(self):
+        from benchmarks.bench_helpdesk import run_benchmarks, compare_reports
+        from src.backend import helpdesk, sla
+        from src.web import web_app
+
+        loaded_before = helpdesk.store_loaded
+        with patch.object(web_app, "SLA_SCHEDULER_ENABLED", True):
+            report = run_benchmarks(sizes=[50], repeats=1)
+
+        # CS - the routes ran against a swapped in store, nothing was started in the benchmark's temp folder
+        self.assertFalse(sla.running)
+        self.assertEqual(helpdesk.store_loaded, loaded_before)
+
+        names = {result["benchmark"] for result in report["results"]}
+        self.assertIn("load_tickets", names)
+        self.assertIn("GET /tickets", names)
+        self.assertEqual(json.loads(json.dumps(report)), report)
+        self.assertEqual(compare_reports(report, report, 1.2), [])  # CS - same run is never a regression
+
+
+# class to group the load test harness tests
+class TestLoadHarness(unittest.TestCase):
+
+    # TEST - operation mixes are checked and latency percentiles use the nearest rank
+    def test_mix_and_percentiles(self):
+        from benchmarks.load_helpdesk import parse_mix, percentile
+
+        self.assertEqual(parse_mix("read=70, comment=30"), {"read": 70.0, "comment": 30.0})
+        with self.assertRaises(ValueError):
+            parse_mix("read=70,delete=30")
+        with self.assertRaises(ValueError):
+            parse_mix("read=0")
+        self.assertEqual(percentile(list(range(1, 101)), 50), 50)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile([], 99), 0)
+
+    # TEST - the fake OpenAI endpoint answers chat completions after its latency
+    def test_fake_openai(self):
+        import time
+        import urllib.request
+        from benchmarks.load_helpdesk import FAKE_AI_ANSWER, start_fake_openai
+
+        server = start_fake_openai(latency=0.2)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+            start = time.perf_counter()
+            with urllib.request.urlopen(urllib.request.Request(url, data=b"{}", method="POST")) as response:
+                body = json.loads(response.read())
+            self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+            self.assertEqual(body["choices"][0]["message"]["content"], FAKE_AI_ANSWER)
+            self.assertEqual(server.requests, 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    # TEST - the integrity check finds duplicate IDs and acknowledged comments missing from the file
+    def test_integrity_check(self):
+        from benchmarks.load_helpdesk import check_integrity
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_file = Path(temp_dir) / "helpdesk.csv"
+            with open(data_file, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["ID", "Title", "Comments"])
+                writer.writerow(["100", "Saved Ticket", json.dumps([{"Content": "load test comment 1"}])])
+                writer.writerow(["101", "Load Test Ticket 1", "[]"])
+                writer.writerow(["101", "Load Test Ticket 2", "[]"])
+
+            result = check_integrity(data_file, [(100, "load test comment 1"), (100, "load test comment 2")],
+                                     [(101, "Load Test Ticket 1"), (101, "Load Test Ticket 2"), (102, "Load Test Ticket 3")])
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["duplicate_ids"], ["101"])
+        self.assertEqual(result["ids_given_twice"], [101])
+        self.assertEqual(result["lost_comments"], [{"ticket_id": 100, "comment": "load test comment 2"}])
+        self.assertEqual([ticket["title"] for ticket in result["lost_tickets"]], ["Load Test Ticket 3"])
+
+    # TEST - a short run against two gunicorn workers sharing the data file reports every operation and loses nothing
+    def test_small_run(self):
+        from benchmarks.load_helpdesk import run_load_test
+
+        report = run_load_test(workers=2, concurrency=4, duration=1.5, tickets=50, mix={"read": 2, "comment": 2, "update": 1, "create": 1})
+
+        self.assertEqual(set(report["operations"]), {"read", "comment", "update", "create"})
+        self.assertGreater(report["total"]["requests"], 0)
+        self.assertEqual(report["total"]["errors"], 0)
+        self.assertTrue(report["integrity"]["ok"], report["integrity"])
+        self.assertEqual(json.loads(json.dumps(report)), report)
+
+    # TEST - the ai operation goes through the CLI's openai client to the fake endpoint, not the fallback
+    @unittest.skipUnless(importlib.util.find_spec("openai"), "openai is not installed")
+    def test_ai_reaches_fake_endpoint(self):
+        from benchmarks.load_helpdesk import run_load_test
+
+        report = run_load_test(workers=1, concurrency=2, duration=1, tickets=20, mix={"ai": 1}, ai_latency=0.01)
+
+        self.assertGreater(report["fake_openai_requests"], 0)
+        self.assertEqual(report["operations"]["ai"]["outcomes"], {"200": report["operations"]["ai"]["requests"]})
+
+
+# class to group the metrics and profiling tests
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        from src.backend import metrics
+        from src.web import web_app
+
+        metrics.reset()
+        self.metrics = metrics
+        self.web_app = web_app
+        self.client = web_app.app.test_client()
+
+    # TEST - counters and histograms render in the Prometheus text format
+    def test_render_format(self):
+        self.metrics.inc("helpdesk_store_bytes_written_total", 10)
+        self.metrics.observe("helpdesk_store_save_seconds", 0.02)
+
+        text = self.metrics.render()
+
+        self.assertIn("# TYPE helpdesk_store_save_seconds histogram", text)
+        self.assertIn("helpdesk_store_bytes_written_total 10", text)
+        self.assertIn('helpdesk_store_save_seconds_bucket{le="0.01"} 0', text)
+        self.assertIn('helpdesk_store_save_seconds_bucket{le="0.025"} 1', text)
+        self.assertIn("helpdesk_store_save_seconds_count 1", text)
+
+    # TEST - web requests and template renders show up on /metrics
+    def test_route_metrics(self):
+        self.client.get("/tickets")
+
+        text = self.client.get("/metrics").get_data(as_text=True)
+
+        self.assertIn('helpdesk_http_requests_total{method="GET",route="/tickets",status="200"} 1', text)
+        self.assertIn('helpdesk_template_render_seconds_count{template="all_tickets.html"} 1', text)
+
+    # TEST - profiling only happens when enabled and asked for
+    def test_request_profiler(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertNotIn("X-Profile-File", self.client.get("/?profile=1").headers)
+
+            with patch.object(self.web_app, "PROFILING_ENABLED", True), \
+                    patch.object(self.web_app, "PROFILE_DIR", Path(temp_dir)):
+                response = self.client.get("/", headers={"X-Profile": "1"})
+
+            self.assertTrue((Path(temp_dir) / response.headers["X-Profile-File"]).exists())
+
+
+# class to group the SLA scheduler tests
+class TestSlaScheduler(HelpdeskTestCase):
+
+    SUBMITTED = datetime(2026, 1, 1, 12, 0, 0)
+
+    def setUp(self):
+        from src.backend import sla
+
+        super().setUp()
+        self.sla = sla
+        self.now = self.SUBMITTED.timestamp()
+        self.breaches = []
+        self.add_ticket(999990, "Low")
+        self.add_ticket(999991, "High")
+        sla.breach_handlers.append(self.record_breach)
+        sla.start(clock_func=lambda: self.now, background=False)
+
+    def tearDown(self):
+        self.sla.stop()
+        self.sla.breach_handlers.remove(self.record_breach)
+        super().tearDown()
+
+    # helper - adding an open ticket submitted at SUBMITTED
+    def add_ticket(self, ticket_id, severity):
+        self.helpdesk.insert_ticket(self.helpdesk.tickets, {
+            "ID": ticket_id, "Title": "SLA Ticket", "Description": "Waiting", "Assignee": "Olivia Davis",
+            "Severity": severity, "Status": "Open", "Category": "Software",
+            "Submission DateTime": self.SUBMITTED.strftime(self.helpdesk.DATETIME_FORMAT), "Comments": [], "Version": 1
+        })
+        self.created_ids.append(ticket_id)
+        return ticket_id
+
+    def record_breach(self, ticket, deadline):
+        self.breaches.append(ticket["ID"])
+
+    def advance(self, hours):
+        self.now += hours * 3600
+        return self.sla.run_due()
+
+    # TEST - tickets fire when their deadline passes, earliest first, and only once
+    def test_fires_when_due(self):
+        self.assertEqual(self.advance(3), [])
+        self.assertEqual(self.advance(2), [999991])  # high severity - 4 hours
+        self.assertEqual(self.advance(72), [999990])  # low severity - 72 hours
+        self.assertEqual(self.advance(100), [])
+        self.assertEqual(self.breaches, [999991, 999990])
+
+    # TEST - changing severity moves the deadline, closing removes it
+    def test_changes_reschedule(self):
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, 999990, {"Severity": "High"})
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, 999991, {"Status": "Closed"})
+        self.assertEqual(self.advance(5), [999990])
+
+    # TEST - a restart doesn't fire the same ticket again
+    def test_state_survives_restart(self):
+        self.advance(5)
+        self.sla.stop()
+        self.sla.start(clock_func=lambda: self.now, background=False)
+        self.assertEqual(self.advance(100), [999990])
+        self.assertEqual(self.breaches, [999991, 999990])
+
+    # TEST - optional auto escalation raises a breached ticket to High
+    def test_escalate_breach(self):
+        self.sla.breach_handlers.append(self.sla.escalate_breach)
+        try:
+            self.advance(80)
+        finally:
+            self.sla.breach_handlers.remove(self.sla.escalate_breach)
+        self.assertEqual(self.helpdesk.tickets[999990]["Severity"], "High")
+        self.assertEqual(self.advance(1), [])  # CS - escalating doesn't make it fire again
+
+    # TEST - only one process runs the scheduler for a data file, another takes over once it stops
+    def test_one_scheduler_per_data_file(self):
+        self.sla.stop()
+        other_process = self.helpdesk.open_lock_file(self.sla.lock_file())  # CS - a separate open conflicts like another process
+        try:
+            self.assertFalse(self.sla.start(clock_func=lambda: self.now, background=False))
+            self.assertFalse(self.sla.running)
+            self.assertEqual(self.advance(100), [])
+        finally:
+            other_process.close()
+
+        self.assertFalse(self.sla.start(clock_func=lambda: self.now, background=False))  # CS - waits before trying again
+        with patch.object(self.sla, "next_takeover", 0):
+            self.assertTrue(self.sla.start(clock_func=lambda: self.now, background=False))
+        self.assertEqual(self.advance(1), [999991, 999990])
+
+
+# class to group the assignee workload tests
+class TestWorkloadBalancing(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.workload",)
+
+    def setUp(self):
+        from src.backend import workload
+        from src.web.web_app import app
+
+        super().setUp()
+        self.workload = workload
+        self.client = app.test_client()
+        workload.set_assignee("Agent A")
+        workload.set_assignee("Agent B")
+        workload.set_assignee("Agent C", ["Network"])
+
+    # helper - adding an open ticket for an agent
+    def add_ticket(self, assignee, severity="Low", category="Software"):
+        ticket = self.create_ticket({
+            "Title": "Workload Ticket", "Description": "Balancing", "Assignee": assignee, "Severity": severity,
+            "Status": "Open", "Category": category, "Submission DateTime": "01/01/2026 12:00:00",
+        })
+        return ticket["ID"]
+
+    # TEST - the least loaded eligible agent is picked, weighted by severity
+    def test_pick_least_loaded(self):
+        self.add_ticket("Agent A", "High")
+        self.add_ticket("Agent B", "Low")
+        self.add_ticket("Agent B", "Low")
+        self.assertEqual(self.workload.pick_assignee("Software"), "Agent B")  # 2 beats 3
+        self.assertEqual(self.workload.pick_assignee("Network"), "Agent C")  # only C has nothing yet
+        self.assertEqual(self.workload.pick_assignee("Network", exclude={"Agent C"}), "Agent B")
+
+    # TEST - closing and reassigning tickets moves the load
+    def test_load_follows_changes(self):
+        ticket_id = self.add_ticket("Agent A", "High")
+        self.add_ticket("Agent B", "Medium")
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, ticket_id, {"Status": "Closed"})
+        self.assertEqual(self.workload.pick_assignee("Software"), "Agent A")
+        loads = {agent["Name"]: agent["Load"] for agent in self.workload.get_workload()}
+        self.assertEqual(loads, {"Agent A": 0, "Agent B": 2, "Agent C": 0})
+
+    # TEST - the roster can change at runtime and is saved
+    def test_roster_is_configurable(self):
+        response = self.client.post("/assignees", data={"name": "Agent D"})
+        self.assertEqual(response.status_code, 302)
+        self.client.post("/assignees", data={"name": "Agent A", "action": "remove"})
+        self.assertEqual(self.workload.load_roster(), {"Agent B": [], "Agent C": ["Network"], "Agent D": []})
+        self.assertIn(b"Agent D", self.client.get("/assignees").data)
+
+    # TEST - auto-assign on the web add form uses the least loaded agent
+    def test_web_auto_assign(self):
+        self.add_ticket("Agent A", "Medium")
+        self.add_ticket("Agent B", "Low")
+        self.add_ticket("Agent C", "Low", "Network")
+        response = self.client.post("/add", data={
+            "title": "Auto", "description": "Pick someone", "assignee": "auto", "severity": "Low", "status": "Open",
+        })
+        ticket_id = int(response.headers["Location"].rsplit("/", 1)[-1])
+        self.created_ids.append(ticket_id)
+        self.assertEqual(self.helpdesk.tickets[ticket_id]["Assignee"], "Agent B")  # C only takes Network
+
+    # TEST - a roster change saved by another process (like another gunicorn worker) is used here and never undone
+    def test_roster_shared_between_processes(self):
+        code = 'from src.backend import workload; workload.set_assignee("Agent D"); workload.remove_assignee("Agent A")'
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.data_file)}
+        subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, check=True, capture_output=True)
+
+        self.assertEqual(self.workload.pick_assignee("Software", exclude={"Agent B", "Agent C"}), "Agent D")
+        self.workload.set_assignee("Agent E", ["Hardware"])
+        self.assertEqual(self.workload.load_roster(), {"Agent B": [], "Agent C": ["Network"], "Agent D": [], "Agent E": ["Hardware"]})
+
+
+# class to group the duplicate ticket detection tests
+class TestDuplicateDetection(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.similarity",)
+
+    def setUp(self):
+        from src.backend import similarity
+        from src.web.web_app import app
+
+        super().setUp()
+        self.similarity = similarity
+        self.client = app.test_client()
+        self.vpn_id = self.add_ticket("Cannot Connect to VPN", "VPN client times out when connecting from home")
+        self.vpn_again_id = self.add_ticket("Cannot connect to the VPN", "The VPN client times out connecting from home today")
+        self.printer_id = self.add_ticket("Broken Printer", "Printer on the second floor jams every page")
+
+    # helper - adding an open ticket
+    def add_ticket(self, title, description):
+        ticket = self.create_ticket({
+            "Title": title, "Description": description, "Assignee": "Olivia Davis", "Severity": "Medium",
+            "Status": "Open", "Category": "Network", "Submission DateTime": "01/01/2026 12:00:00",
+        })
+        return ticket["ID"]
+
+    # TEST - near identical open tickets are found, unrelated and closed ones are not
+    def test_find_duplicates(self):
+        matches = self.similarity.find_duplicates("VPN cannot connect", "VPN client times out from home")
+        self.assertEqual({ticket_id for ticket_id, _ in matches}, {self.vpn_id, self.vpn_again_id})
+
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.vpn_id, {"Status": "Closed"})
+        matches = self.similarity.find_duplicates("VPN cannot connect", "VPN client times out from home")
+        self.assertEqual([ticket_id for ticket_id, _ in matches], [self.vpn_again_id])
+
+    # TEST - the backlog is grouped into clusters of likely duplicates
+    def test_cluster_open_tickets(self):
+        self.assertEqual(self.similarity.cluster_open_tickets(), [sorted([self.vpn_id, self.vpn_again_id])])
+
+    # TEST - the web form shows possible duplicates before adding, and adds when confirmed
+    def test_web_add_warns_about_duplicates(self):
+        form = {
+            "title": "VPN cannot connect", "description": "VPN client times out from home",
+            "assignee": "Olivia Davis", "severity": "Medium", "status": "Open",
+        }
+        response = self.client.post("/add", data=form)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Possible duplicates", response.data)
+        self.assertIn(f"#{self.vpn_id}".encode(), response.data)
+
+        response = self.client.post("/add", data={**form, "confirm_duplicate": "1"})
+        self.assertEqual(response.status_code, 302)
+        self.created_ids.append(int(response.headers["Location"].rsplit("/", 1)[-1]))
+
+
+# class to group the reporting tests
+class TestReports(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.reports",)
+
+    def setUp(self):
+        from src.backend import reports
+        from src.web.web_app import app
+
+        super().setUp()
+        self.reports = reports
+        self.client = app.test_client()
+
+    # TEST - a file with mixed date formats is rolled up by week and month
+    def test_build_from_csv(self):
+        with open(self.data_file, "w", newline="", encoding="utf-8") as f:
+            f.write("ID,Title,Description,Assignee,Severity,Status,Category,Submission DateTime,Comments,Version,Closed DateTime\n")
+            f.write("101,A,a,Olivia Davis,High,Closed,Network,05/01/2026 09:00:00,[],1,05/01/2026 13:00:00\n")
+            f.write("102,B,b,Olivia Davis,low,Closed,Network,2026-01-06 10:00:00,[],1,06/01/2026 12:00:00\n")
+            f.write("103,C,c,Ryan Collins,Medium,In-progress,Software,14/01/2026 08:30,[],1,\n")
+            f.write("103,Duplicate,c,Ryan Collins,Medium,Open,Software,14/01/2026 08:30,[],1,\n")
+            f.write("104,D,d,Ryan Collins,Urgent,Open,Software,14/01/2026 08:30:00,[],1,\n")
+
+        tables = self.reports.build_from_csv()
+
+        self.assertEqual(self.reports.report_rows("category", "week", tables), [
+            {"period": "2026-W02", "category": "Network", "opened": 2, "closed": 2},
+            {"period": "2026-W03", "category": "Software", "opened": 1, "closed": 0},
+        ])
+        self.assertEqual(self.reports.report_rows("time-to-close", "month", tables), [
+            {"period": "2026-01", "assignee": "Olivia Davis", "closed": 2, "mean_hours_to_close": 3.0},
+        ])
+        self.assertEqual(len(self.reports.report_rows("severity", "hour", tables)), 3)
+
+    # TEST - live reports follow new and closed tickets
+    def test_incremental_updates(self):
+        ticket = self.create_ticket({
+            "Title": "Report Ticket", "Description": "Counted", "Assignee": "Agent Report", "Severity": "Low",
+            "Status": "Open", "Category": "Hardware", "Submission DateTime": "01/01/2026 12:00:00",
+        })
+        rows = self.reports.report_rows("severity", "day")
+        self.assertIn({"period": "2026-01-01", "severity": "Low", "opened": 1}, rows)
+
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, ticket["ID"], {"Status": "Closed"})
+        rows = self.reports.report_rows("time-to-close", "month")
+        self.assertEqual([row["assignee"] for row in rows if row["assignee"] == "Agent Report"], ["Agent Report"])
+
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, ticket["ID"], {"Status": "Open"})
+        rows = self.reports.report_rows("time-to-close", "month")
+        self.assertEqual([row for row in rows if row["assignee"] == "Agent Report"], [])
+
+    # TEST - reports can be downloaded as JSON and CSV
+    def test_web_export(self):
+        response = self.client.get("/reports?report=severity&period=month&format=json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(json.loads(response.data), list)
+
+        response = self.client.get("/reports?report=category&period=week&format=csv")
+        self.assertEqual(response.headers["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(self.client.get("/reports?period=year").status_code, 400)
+
+
+# class to group the parallel load tests
+class TestParallelLoad(HelpdeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        # quoted line breaks and commas, bad rows and a duplicate ID spread through the file
+        with open(self.data_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.helpdesk.FIELDNAMES)
+            writer.writeheader()
+            for i in range(200):
+                writer.writerow({
+                    "ID": 100 + i if i != 150 else 120, "Title": f"Ticket {i}",
+                    "Description": f'Line one, "quoted"\nline two of ticket {i}' if i % 3 else "Single line",
+                    "Assignee": "Olivia Davis", "Severity": "Urgent" if i % 40 == 7 else "Low",
+                    "Status": "Open", "Category": "Software", "Submission DateTime": "01/01/2026 12:00:00",
+                    "Comments": json.dumps([{"Author": "A", "Content": "multi\nline"}]) if i % 5 == 0 else "[]", "Version": 1,
+                })
+            f.write("not-a-number,Broken,,,,,,,,,\n")
+
+    # helper - loading with a worker count and capturing the logged errors
+    def load(self, workers):
+        with patch.object(self.helpdesk, "log_errors") as log_errors:
+            tickets = self.helpdesk.load_tickets(workers=workers)
+        return tickets, log_errors.call_args[0][0]
+
+    # TEST - chunks split on record boundaries give exactly the single process result
+    def test_parallel_matches_sequential(self):
+        sequential, sequential_errors = self.load(1)
+        parallel, parallel_errors = self.load(3)
+
+        self.assertEqual(len(sequential), 194)  # 5 bad severities, 1 duplicate
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(list(parallel), list(sequential))
+        self.assertEqual(parallel_errors, sequential_errors)
+        self.assertEqual(len(parallel_errors), 7)
+        self.assertEqual(parallel[120]["Title"], "Ticket 20")  # CS - the first copy of a duplicated ID wins
+
+    # TEST - split points never fall inside a quoted field
+    def test_record_boundaries(self):
+        data = self.data_file.read_bytes()
+        boundaries = self.helpdesk.find_record_boundaries(data, 16)
+        self.assertEqual(boundaries[-1], len(data))
+        for boundary in boundaries:
+            self.assertEqual(data.count(b'"', 0, boundary) % 2, 0)
+
+
+# class to group the archive tier tests
+class TestArchive(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.archive", "src.backend.reports")
+
+    def setUp(self):
+        from src.backend import archive, reports
+        from src.web.web_app import app
+
+        super().setUp()
+        self.archive = archive
+        self.reports = reports
+        self.client = app.test_client()
+
+        # two tickets closed long ago and one still open
+        for title, status in [("Old Printer Jam", "Closed"), ("Old VPN Outage", "Closed"), ("Current Laptop Issue", "Open")]:
+            self.create_ticket({
+                "Title": title, "Description": "Archive test", "Assignee": "Agent Archive", "Severity": "Low",
+                "Status": status, "Category": "Hardware", "Submission DateTime": "01/01/2020 09:00:00",
+            })
+
+    # helper - archiving tickets closed more than 90 days before mid 2020
+    def archive_old(self):
+        return self.archive.archive_closed_tickets(self.helpdesk.tickets, 90, now=datetime(2020, 6, 1))
+
+    # TEST - old closed tickets leave the hot store and the CSV but can still be read
+    def test_archive_pass(self):
+        moved = self.archive_old()
+
+        self.assertEqual(sorted(moved), self.created_ids[:2])
+        self.assertNotIn(self.created_ids[0], self.helpdesk.tickets)
+        self.assertIn(self.created_ids[2], self.helpdesk.tickets)
+        self.assertNotIn("Old Printer Jam", self.data_file.read_text(encoding="utf-8"))
+        self.assertEqual(self.archive.get_archived_ticket(self.created_ids[0])["Title"], "Old Printer Jam")
+        self.assertEqual(self.archive_old(), [])  # CS - nothing left to move
+
+        # a fresh process only has the index to go on
+        self.archive.reset()
+        self.assertEqual(self.archive.get_ticket(self.created_ids[1])["Title"], "Old VPN Outage")
+        self.assertIn(self.created_ids[1], self.helpdesk.archived_ids)
+
+    # TEST - loading the store (e.g. opening the app) never archives, only an explicit pass does
+    def test_loading_does_not_archive(self):
+        self.helpdesk.write_ticket_file(self.data_file, [self.helpdesk.tickets[ticket_id] for ticket_id in self.created_ids])
+        saved = self.data_file.read_bytes()
+        code = "from src.backend import helpdesk; print(len(helpdesk.get_tickets()))"
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.data_file)}
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, check=True, capture_output=True, text=True)
+
+        self.assertEqual(result.stdout.split()[-1], "3")
+        self.assertEqual(self.data_file.read_bytes(), saved)
+        self.assertFalse(self.archive.archive_file().exists())
+
+    # TEST - archived IDs are never handed out again
+    def test_ids_not_reused(self):
+        self.helpdesk.delete_ticket_record(self.helpdesk.tickets, self.created_ids[2])
+        self.archive_old()
+
+        ticket = self.create_ticket({
+            "Title": "New Ticket", "Description": "After archiving", "Assignee": "Agent Archive", "Severity": "Low",
+            "Status": "Open", "Category": "Hardware", "Submission DateTime": "01/06/2020 09:00:00",
+        })
+        self.assertGreater(ticket["ID"], max(self.created_ids[:2]))
+        with self.assertRaises(ValueError):
+            self.helpdesk.insert_ticket(self.helpdesk.tickets, {**ticket, "ID": self.created_ids[0]})
+
+    # TEST - archived tickets can be searched and viewed (read only) on the web
+    def test_web_search_and_view(self):
+        self.archive_old()
+
+        response = self.client.get("/archive?q=vpn")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Old VPN Outage", response.data)
+        self.assertNotIn(b"Old Printer Jam", response.data)
+
+        response = self.client.get(f"/ticket/{self.created_ids[0]}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Old Printer Jam", response.data)
+        self.assertNotIn(b"Add Comment", response.data)
+
+    # TEST - reports still count tickets after they move to the archive
+    def test_reports_include_archive(self):
+        before = self.reports.report_rows("category", "month")
+        self.archive_old()
+        self.assertEqual(self.reports.report_rows("category", "month"), before)
+
+        self.reports.reset()
+        self.assertEqual(self.reports.report_rows("category", "month"), before)
+        self.assertEqual(self.reports.report_rows("category", "month", self.reports.build_from_csv()), before)
+
+
+# class to group the sharded store tests
+class TestShardedStore(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.shards",)
+
+    def setUp(self):
+        from src.backend import shards
+
+        super().setUp()
+        self.shard_patches = [patch.object(shards, "SHARD_BY", "id"), patch.object(shards, "SHARD_SIZE", 100)]
+        for shard_patch in self.shard_patches:
+            shard_patch.start()
+        self.shards = shards
+
+        # an existing single CSV with tickets 100-349, split into three shards of 100 IDs
+        self.store = {}
+        for i in range(250):
+            ticket = {
+                "ID": 100 + i, "Title": f"Ticket {i}", "Description": "Shard test", "Assignee": "Olivia Davis",
+                "Severity": "High" if i >= 200 else "Low", "Status": "Open" if i % 2 else "Closed",
+                "Category": "Network", "Submission DateTime": "01/01/2026 12:00:00", "Comments": [], "Version": 1,
+                "Closed DateTime": "",
+            }
+            self.store[ticket["ID"]] = ticket
+        self.helpdesk.write_ticket_file(self.data_file, self.store.values())
+
+    def tearDown(self):
+        super().tearDown()
+        for shard_patch in self.shard_patches:
+            shard_patch.stop()
+
+    # helper - loading the store and following its changes, as get_tickets does
+    def load(self):
+        self.shards.reset()
+        store = self.helpdesk.load_tickets(workers=1)
+        self.shards.start(store)
+        return store
+
+    # TEST - the first sharded load splits the CSV into shard files with an index
+    def test_split_existing_file(self):
+        store = self.load()
+        self.assertEqual([path.name for path in self.shards.shard_files()], ["id-000000100.csv", "id-000000200.csv", "id-000000300.csv"])
+        with open(self.shards.index_file(), encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(index["shards"]["id-000000300"]["rows"], 50)
+        self.assertEqual(self.load(), store)  # CS - read back from the shards this time
+        self.assertEqual(self.helpdesk.load_tickets(workers=3), store)  # one shard per worker process
+
+    # TEST - a change only rewrites the shard it is in
+    def test_save_only_dirty_shards(self):
+        store = self.load()
+        with patch.object(self.helpdesk, "write_ticket_file", wraps=self.helpdesk.write_ticket_file) as write:
+            self.helpdesk.update_ticket_fields(store, 150, {"Title": "Changed"})
+            self.helpdesk.save_tickets(store)
+            self.assertEqual([call.args[0].name for call in write.call_args_list], ["id-000000100.csv"])
+
+            write.reset_mock()
+            self.helpdesk.save_tickets(store)
+            write.assert_not_called()  # nothing is dirty
+
+            self.helpdesk.delete_ticket_record(store, 120)
+            self.helpdesk.create_ticket(store, {
+                "Title": "New", "Description": "Shard test", "Assignee": "Olivia Davis", "Severity": "Low",
+                "Status": "Open", "Category": "Network", "Submission DateTime": "01/01/2026 12:00:00",
+            })
+            self.helpdesk.save_tickets(store)
+            self.assertEqual(sorted(call.args[0].name for call in write.call_args_list), ["id-000000100.csv", "id-000000300.csv"])
+
+        reloaded = self.load()
+        self.assertEqual(reloaded[150]["Title"], "Changed")
+        self.assertNotIn(120, reloaded)
+        self.assertIn(350, reloaded)
+
+    # TEST - queries skip shards whose summary can't match
+    def test_query_skips_shards(self):
+        store = self.load()
+        self.assertEqual(self.shards.matching_shards({"Severity": "High"}), ["id-000000300"])
+        high = self.helpdesk.find_tickets(store, {"Severity": "High", "Status": "Open"})
+        self.assertEqual([ticket["ID"] for ticket in high], list(range(301, 350, 2)))
+
+        self.helpdesk.update_ticket_fields(store, 101, {"Severity": "High"})
+        self.assertEqual(self.shards.matching_shards({"Severity": "High"}), ["id-000000100", "id-000000300"])
+        self.assertEqual(self.shards.matching_shards({}, since=datetime(2027, 1, 1)), [])
+
+
+# class to group the change feed tests
+class TestChangeFeed(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.changes",)
+
+    def setUp(self):
+        from src.backend import changes
+        from src.web.web_app import app
+
+        super().setUp()
+        changes.start()
+        self.changes = changes
+        self.client = app.test_client()
+
+    # helper - adding a ticket through the web form
+    def add_ticket(self, title):
+        self.client.post("/add", data={
+            "title": title, "description": f"{title} for the change feed", "assignee": "Olivia Davis",
+            "severity": "Low", "status": "Open", "confirm_duplicate": "1",
+        })
+        ticket_id = max(self.helpdesk.tickets)
+        self.created_ids.append(ticket_id)
+        return ticket_id
+
+    # TEST - every web change is recorded in order, and readers only get what is after their cursor
+    def test_web_changes_recorded(self):
+        ticket_id = self.add_ticket("Feed Ticket")
+        self.client.post(f"/comment/{ticket_id}", data={"comment": "first"})
+        self.client.post(f"/close/{ticket_id}")
+        self.client.post(f"/delete_ticket/{ticket_id}", data={"confirm": "yes"})
+
+        events = self.changes.read_changes(0)
+        self.assertEqual([event["kind"] for event in events], ["created", "commented", "updated", "deleted"])
+        self.assertEqual([event["seq"] for event in events], [1, 2, 3, 4])
+        self.assertIn("Status", events[2]["changed"])
+        self.assertIsNone(events[3]["ticket"])
+
+        self.assertEqual([event["seq"] for event in self.changes.read_changes(2)], [3, 4])
+        self.assertEqual([event["seq"] for event in self.changes.read_changes(0, limit=1)], [1])
+        response = self.client.get("/changes?cursor=3")
+        self.assertEqual(response.get_json(), {"changes": [events[3]], "cursor": 4})
+
+    # TEST - CLI changes go to the same feed
+    def test_cli_changes_recorded(self):
+        from src.cli.cli_helpdesk import comment_ticket
+
+        ticket_id = self.add_ticket("CLI Feed Ticket")
+        with patch("builtins.input", side_effect=[str(ticket_id), "Agent CLI", "cli comment"]):
+            comment_ticket(self.helpdesk.tickets)
+        event = self.changes.read_changes(1)[0]
+        self.assertEqual((event["kind"], event["ticket_id"]), ("commented", ticket_id))
+        self.assertEqual(event["ticket"]["Comments"][-1]["Content"], "cli comment")
+
+    # TEST - a change whose save fails isn't in the feed, it is recorded when a later save writes it
+    def test_failed_save_not_recorded(self):
+        ticket_id = self.add_ticket("Unsaved Feed Ticket")
+        with patch.object(self.helpdesk, "write_ticket_file", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, self.helpdesk.make_comment("Test", "not saved yet"))
+        self.assertEqual([event["kind"] for event in self.changes.read_changes(0)], ["created"])
+        self.assertEqual(self.changes.last_seq, 1)
+
+        self.helpdesk.save_tickets(self.helpdesk.tickets)
+        self.assertEqual(self.helpdesk.load_tickets()[ticket_id]["Comments"][-1]["Content"], "not saved yet")
+        self.assertEqual([event["kind"] for event in self.changes.read_changes(0)], ["created", "commented"])
+
+    # TEST - the feed picks up after a restart (dropping a half written event) and rolls over to new files
+    def test_restart_and_segments(self):
+        with patch.object(self.changes, "SEGMENT_EVENTS", 3):
+            ticket_id = self.add_ticket("Segment Ticket")
+            for i in range(4):
+                self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, self.helpdesk.make_comment("Test", f"comment {i}"))
+            self.assertEqual(self.changes.segment_starts(), [1, 4])
+
+            self.changes.reset()
+            with open(self.changes.segment_file(4), "a", encoding="utf-8") as f:
+                f.write('{"seq": 6, "kind": "upd')  # CS - the app stopped part way through a write
+            self.changes.start()
+            self.assertEqual(self.changes.last_seq, 5)
+
+            for text in ["after restart", "in a new file"]:
+                self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, self.helpdesk.make_comment("Test", text))
+            self.assertEqual(self.changes.segment_starts(), [1, 4, 7])  # CS - seq 6 finished off the last run's file
+        events = self.changes.read_changes(3)
+        self.assertEqual([event["seq"] for event in events], [4, 5, 6, 7])
+        self.assertEqual(events[2]["ticket"]["Comments"][-1]["Content"], "after restart")
+
+    # TEST - the stream resumes from Last-Event-ID and the CLI tail prints the same events
+    def test_stream_and_tail(self):
+        ticket_id = self.add_ticket("Stream Ticket")
+        self.client.post(f"/comment/{ticket_id}", data={"comment": "streamed"})
+
+        response = self.client.get("/changes/stream", headers={"Last-Event-ID": "1"})
+        chunks = response.response
+        self.assertEqual(next(chunks), b"retry: 1000\n\n")  # CS - how soon the browser reconnects once the stream ends
+        chunk = next(chunks)
+        response.close()
+        self.assertTrue(chunk.startswith(b"id: 2\nevent: change\n"))
+
+        with patch("sys.stdout", new_callable=io.StringIO) as output:
+            self.assertEqual(self.changes.main(["--cursor", "0"]), 0)
+        self.assertEqual([json.loads(line)["seq"] for line in output.getvalue().splitlines()], [1, 2])
+
+
+    # TEST - a stream on a sync worker ends after its window instead of holding the worker
+    def test_stream_is_bounded(self):
+        from src.web import web_app
+        ticket_id = self.add_ticket("Bounded Stream Ticket")
+
+        with patch.object(web_app, "CHANGE_STREAM_SECONDS", 0.2):
+            response = self.client.get("/changes/stream?cursor=0")
+            chunks = list(response.response)  # CS - returns once the stream closes
+        self.assertEqual(len(chunks), 2)
+        self.assertIn(f'"ticket_id": {ticket_id}'.encode(), chunks[1])
+
+    # TEST - processes sharing the feed (like gunicorn workers) never write the same or an out of order seq
+    def test_sequence_across_processes(self):
+        ticket_id = self.add_ticket("Shared Feed Ticket")
+        code = (
+            "from src.backend import helpdesk; store = helpdesk.get_tickets(); "
+            f"[helpdesk.add_ticket_comment(store, {ticket_id}, helpdesk.make_comment('Worker', str(i))) for i in range(5)]"
+        )
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.helpdesk.DATA_FILE)}
+        processes = [
+            subprocess.Popen([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, stdout=subprocess.DEVNULL)
+            for _ in range(3)
+        ]
+        self.assertEqual([process.wait(timeout=120) for process in processes], [0, 0, 0])
+        self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, self.helpdesk.make_comment("Test", "after the others"))
+
+        events = self.changes.read_changes(0)
+        self.assertEqual([event["seq"] for event in events], list(range(1, 18)))
+        self.assertEqual([event["kind"] for event in events], ["created"] + ["commented"] * 16)
+        self.assertEqual(events[-1]["ticket"]["Comments"][-1]["Content"], "after the others")
+
+
+# class to group the filter query and saved view tests
+class TestSavedViews(HelpdeskTestCase):
+
+    reset_modules = ("src.backend.views",)
+
+    def setUp(self):
+        from src.backend import views
+        from src.web.web_app import app
+
+        super().setUp()
+        self.views = views
+        self.client = app.test_client()
+        self.ids = {}
+        for title, severity, status, submitted in [
+            ("View VPN Down", "High", "Open", "05/01/2026 09:00:00"),
+            ("View VPN Slow", "Low", "Open", "20/01/2026 09:00:00"),
+            ("View Printer Jam", "High", "Closed", "05/01/2026 10:00:00"),
+            ("View Laptop Broken", "High", "In Progress", "10/02/2026 09:00:00"),
+        ]:
+            ticket = self.create_ticket({
+                "Title": title, "Description": "Saved view test", "Assignee": "Agent Views", "Severity": severity,
+                "Status": status, "Category": "Network", "Submission DateTime": submitted,
+            })
+            self.ids[title] = ticket["ID"]
+
+    # helper - titles of the tickets a query finds
+    def titles(self, text):
+        return [ticket["Title"] for ticket in self.views.search(text)]
+
+    # TEST - filters combine, with dates, several values and free text
+    def test_query_language(self):
+        self.assertEqual(self.titles('assignee:"agent views" severity:high status:open,in-progress'), ["View VPN Down", "View Laptop Broken"])
+        self.assertEqual(self.titles("assignee:'Agent Views' vpn"), ["View VPN Down", "View VPN Slow"])
+        self.assertEqual(self.titles("assignee:'Agent Views' since:2026-01-05 until:2026-01-31 status:open"), ["View VPN Down", "View VPN Slow"])
+        self.assertEqual(self.titles("assignee:'Agent Views' until:05/01/2026"), ["View VPN Down", "View Printer Jam"])
+        self.assertIn("check words", self.views.explain(self.views.compile_query("severity:high vpn")))
+
+        for bad in ["priority:high", "severity:urgent", "since:yesterday", 'title:"unfinished']:
+            with self.assertRaises(ValueError):
+                self.views.compile_query(bad)
+        self.assertEqual(self.client.get("/tickets?q=severity:urgent").status_code, 400)
+
+    # TEST - the indexes follow changes and the old stat card filters still work
+    def test_indexes_follow_changes(self):
+        self.assertIn("View Printer Jam", self.titles("status:closed assignee:'Agent Views'"))
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ids["View Printer Jam"], {"Status": "Open"})
+        self.assertNotIn("View Printer Jam", self.titles("status:closed assignee:'Agent Views'"))
+
+        table = self.client.get("/tickets?filter=High").get_data(as_text=True).split("<tbody>")[1]
+        self.assertIn("View Laptop Broken", table)
+        self.assertNotIn("View VPN Slow", table)
+
+    # TEST - busy saved views keep their results up to date instead of querying again
+    def test_materialised_view(self):
+        response = self.client.post("/views", data={"name": "My open High tickets", "query": "assignee:'Agent Views' status:open severity:high"})
+        self.assertEqual(response.status_code, 302)
+        for _ in range(self.views.MATERIALISE_AFTER):
+            response = self.client.get("/tickets?view=My open High tickets")
+        self.assertIn("My open High tickets", self.views.materialised)
+
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ids["View VPN Slow"], {"Severity": "High"})
+        self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.ids["View VPN Down"], {"Status": "Closed"})
+        with patch.object(self.views, "run") as run:
+            found = self.views.open_view("My open High tickets")
+            run.assert_not_called()
+        self.assertEqual([ticket["Title"] for ticket in found], ["View VPN Slow"])
+
+        # saved to disk, so a restart still has the view (and knows it is busy)
+        self.views.reset()
+        self.assertEqual(self.views.get_views(), [("My open High tickets", "assignee:'Agent Views' status:open severity:high")])
+        self.assertEqual(self.client.get("/tickets?view=Nothing").status_code, 400)
+
+    # helper - changing the saved views from another process (like another gunicorn worker) using the same data file
+    def in_other_process(self, call):
+        code = f"from src.backend import views; views.{call}"
+        env = {**os.environ, "HELPDESK_DATA_FILE": str(self.data_file)}
+        subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, check=True, capture_output=True)
+
+    # TEST - a view saved by another process is seen here, and saving here doesn't drop it
+    def test_views_shared_between_processes(self):
+        self.views.save_view("Mine", "severity:high")
+        self.in_other_process('save_view("Other worker view", "severity:low")')
+
+        self.views.save_view("Third", "status:open")  # CS - no read in between, the save itself must pick the other view up
+        with open(self.views.views_file(), encoding="utf-8") as f:
+            self.assertEqual(sorted(json.load(f)["views"]), ["Mine", "Other worker view", "Third"])
+        self.assertEqual([name for name, _ in self.views.get_views()], ["Mine", "Other worker view", "Third"])
+
+        for _ in range(self.views.MATERIALISE_AFTER):
+            self.views.open_view("Mine")
+        self.in_other_process('delete_view("Mine")')
+        self.assertEqual([name for name, _ in self.views.get_views()], ["Other worker view", "Third"])
+        self.assertNotIn("Mine", self.views.materialised)
+
+
+# class to group the display model tests
+class TestDisplayModel(HelpdeskTestCase):
+
+    reset_modules = ("src.web.display",)
+
+    def setUp(self):
+        from src.web import display
+        from src.web.web_app import app
+
+        super().setUp()
+        self.display = display
+        self.client = app.test_client()
+        for title, severity, status in [("Display <Printer> Jam", "medium", "Open"), ("Display Old Ticket", "High", "Closed")]:
+            self.create_ticket({
+                "Title": title, "Description": "Display test", "Assignee": "Agent Display", "Severity": severity,
+                "Status": status, "Category": "Hardware", "Submission DateTime": "01/02/2026 09:00:00",
+            })
+
+    # TEST - rows carry the badge, buttons and escaped text the templates used to work out
+    def test_rows(self):
+        response = self.client.get("/tickets")
+        page = response.get_data(as_text=True)
+        self.assertIn("Display &lt;Printer&gt; Jam", page)
+        self.assertNotIn("Display <Printer> Jam", page)
+
+        open_row, closed_row = (self.display.rows[ticket_id][1] for ticket_id in self.created_ids)
+        self.assertEqual((open_row["Severity"], open_row["badge"], open_row["open"]), ("Medium", "badge-medium", True))
+        self.assertIn('data-action="close"', open_row["html"])
+        self.assertEqual((closed_row["status_class"], closed_row["open"]), ("closed", False))
+        self.assertNotIn('data-action="close"', closed_row["html"])
+        self.assertEqual(self.display.severity_badge("urgent"), ("High", "badge-high"))
+
+    # TEST - a row is built once per ticket version and dropped when the ticket goes
+    def test_cached_per_version(self):
+        self.client.get("/tickets")
+        with patch.object(self.display, "build_row", wraps=self.display.build_row) as build_row:
+            self.client.get("/tickets")
+            build_row.assert_not_called()
+
+            self.helpdesk.update_ticket_fields(self.helpdesk.tickets, self.created_ids[0], {"Title": "Display Printer Fixed"})
+            page = self.client.get("/tickets").get_data(as_text=True)
+            self.assertEqual([call.args[0]["ID"] for call in build_row.call_args_list], [self.created_ids[0]])
+        self.assertIn("Display Printer Fixed", page)
+
+        self.helpdesk.delete_ticket_record(self.helpdesk.tickets, self.created_ids[1])
+        self.assertNotIn(self.created_ids[1], self.display.rows)
+
+    # TEST - the recent ticket cards show the newest tickets, whatever the table is filtered to
+    def test_recent_cards(self):
+        page = self.client.get("/tickets", query_string={"q": "no-ticket-matches-this"}).get_data(as_text=True)
+        cards = page.split('<section class="recent-tickets">')[1].split("</section>")[0]
+        self.assertIn("Display &lt;Printer&gt; Jam", cards)
+        self.assertIn("Display Old Ticket", cards)
+        self.assertEqual(cards.count('class="ticket-card"'), min(5, len(self.helpdesk.tickets)))
+        self.assertNotIn("<tr", page.split("<tbody>")[1].split("</tbody>")[0])
+
+    # TEST - comments in every saved format show the same way on the ticket page
+    def test_comment_formats(self):
+        ticket_id = self.created_ids[0]
+        self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, self.helpdesk.make_comment("Agent Display", "New style comment"))
+        self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, "Old plain comment")
+        self.helpdesk.add_ticket_comment(self.helpdesk.tickets, ticket_id, {"Author": "Old CLI", "Content": "No date comment"})
+
+        page = self.client.get(f"/ticket/{ticket_id}").get_data(as_text=True)
+        self.assertIn("New style comment", page)
+        self.assertIn("Old plain comment", page)
+        self.assertIn("<small class=\"comment-meta\">Old CLI</small>", page)
+        self.assertEqual(self.display.format_comment("Old plain comment"), {"content": "Old plain comment", "meta": ""})
+
+
+# class to group the compression and static caching tests
+class TestResponseCompression(unittest.TestCase):
+
+    def setUp(self):
+        from src.web import web_app
+
+        self.web_app = web_app
+        self.client = web_app.app.test_client()
+
+    # helper - the hashed static URL a page links to
+    def static_url(self, filename):
+        with self.web_app.app.test_request_context():
+            return self.web_app.url_for("static", filename=filename)
+
+    # TEST - pages are gzipped for clients that accept it and left plain for those that don't
+    def test_gzip_pages(self):
+        response = self.client.get("/tickets", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertIn(b"<html", gzip.decompress(response.data))
+
+        response = self.client.get("/tickets")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn(b"<html", response.data)
+
+    # TEST - small responses aren't worth compressing
+    def test_minimum_size(self):
+        response = self.client.get("/reports?period=year", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    # TEST - static URLs carry a content hash and are cached forever, compressed once
+    def test_hashed_static_files(self):
+        url = self.static_url("style.css")
+        self.assertRegex(url, r"/static/style\.css\?v=[0-9a-f]{12}$")
+        self.assertIn(url.encode(), self.client.get("/").data)
+
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        css = (Path(self.web_app.app.static_folder) / "style.css").read_bytes()
+        self.assertEqual(gzip.decompress(response.data), css)
+
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        # an old or missing hash still gets the file, but browsers must check it again
+        response = self.client.get("/static/style.css?v=000000000000")
+        self.assertNotIn("immutable", response.headers.get("Cache-Control", ""))
+        self.assertEqual(response.data, css)
+
+
+# class to group the import time tests (workers and test runs pay this on every start - the timings are in the benchmark suite)
+class TestImportTime(unittest.TestCase):
+
+    # libraries each module must leave unimported until they are used
+    DEFERRED_IMPORTS = {
+        "src.backend.helpdesk": ["flask", "jinja2", "openai", "dotenv"],
+        "src.cli.cli_helpdesk": ["flask", "jinja2", "openai", "dotenv"],
+        "src.web.web_app": ["openai", "dotenv", "uvicorn"],
+    }
+
+    # helper - running code in a fresh interpreter from the project root
+    def run_fresh(self, code):
+        project_root = Path(__file__).resolve().parent.parent
+        result = subprocess.run([sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True, check=True)
+        return result.stdout.strip().splitlines()
+
+    # TEST - importing does no work: nothing printed, no tickets loaded, no AI libraries
+    def test_import_is_lazy(self):
+        output = self.run_fresh(
+            "import sys; import src.cli.cli_helpdesk, src.web.web_app, src.web.asgi_app; from src.backend import helpdesk; "
+            "print(helpdesk.store_loaded, len(helpdesk.tickets), len(helpdesk.change_listeners), 'openai' in sys.modules, 'dotenv' in sys.modules)"
+        )
+        self.assertEqual(output, ["False 0 0 False False"])
+
+    # TEST - each module only imports the libraries it needs straight away (the CLI never loads the web stack)
+    def test_deferred_imports(self):
+        for module, deferred in self.DEFERRED_IMPORTS.items():
+            loaded = self.run_fresh(f"import sys, {module}; print(*[name for name in {deferred!r} if name in sys.modules])")
+            self.assertEqual(loaded, [], f"importing {module} loaded {loaded}")
+
+
 # allowing the file to run directly
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file